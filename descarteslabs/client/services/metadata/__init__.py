@@ -13,9 +13,11 @@
 # limitations under the License.
 
 from .metadata import Metadata
+from .cache import ResponseCache
+from .table import Categorical, FeatureTable
 from descarteslabs.common.property_filtering import GenericProperties
 
 
 properties = GenericProperties()
 
-__all__ = ["Metadata", "properties"]
+__all__ = ["Metadata", "ResponseCache", "FeatureTable", "Categorical", "properties"]
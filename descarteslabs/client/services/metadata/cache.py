@@ -0,0 +1,183 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from cachetools import LRUCache
+
+
+class CacheEntry(object):
+    "A cached response body, its ETag, and when it was stored or last revalidated"
+
+    __slots__ = ("text", "etag", "stored")
+
+    def __init__(self, text, etag, stored):
+        self.text = text
+        self.etag = etag
+        self.stored = stored
+
+
+class ResponseCache(object):
+    """
+    A cache of responses from the read-only catalog endpoints of the Metadata service,
+    such as :py:func:`Metadata.products` and :py:func:`Metadata.get_band`.
+
+    Responses are reused for ``ttl`` seconds. After that, they're revalidated: the
+    request is made again with the response's ETag, and if the catalog hasn't changed
+    the service answers without a body and the cached response is reused for another ``ttl``.
+
+    Up to ``maxsize`` responses are kept in memory, least recently used first out.
+    If a ``directory`` is given, responses are also stored there, so they're shared
+    between processes and sessions.
+
+    Example::
+
+        >>> from descarteslabs.client.services.metadata import Metadata, ResponseCache
+        >>> metadata = Metadata(cache=ResponseCache(ttl=3600, directory="~/.descarteslabs/metadata"))
+        >>> product = metadata.get_product("landsat:LC08:PRE:TOAR")  # doctest: +SKIP
+        >>> product = metadata.get_product("landsat:LC08:PRE:TOAR")  # doctest: +SKIP
+        >>> metadata.cache.hit_rate  # doctest: +SKIP
+        0.5
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(self, maxsize=128, ttl=600, directory=None):
+        """
+        :param int maxsize: Maximum number of responses to keep in memory.
+        :param float ttl: Number of seconds for which a response is reused without revalidating it.
+        :param str directory: Directory in which to also store responses; it's created if it doesn't exist.
+            If None (default), responses are only kept in memory.
+        """
+        self.ttl = ttl
+        self.directory = None if directory is None else os.path.abspath(os.path.expanduser(directory))
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        self._entries = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+        if self.directory is not None:
+            try:
+                os.makedirs(self.directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    @staticmethod
+    def key(*parts):
+        "A key for a request, from the JSON-serializable values that identify it"
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    @property
+    def hit_rate(self):
+        "The fraction of lookups answered from the cache, including revalidated responses"
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def get(self, key):
+        """
+        The `CacheEntry` for `key`, fresh or not, or None if there isn't one.
+        Doesn't count as a hit or miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.directory is not None:
+            entry = self._read(key)
+            if entry is not None:
+                with self._lock:
+                    self._entries[key] = entry
+        return entry
+
+    def is_fresh(self, entry):
+        "Whether `entry` can be used without revalidating it"
+        return time.time() - entry.stored < self.ttl
+
+    def put(self, key, text, etag=None):
+        "Store the response body `text` for `key`, with its ETag if it has one"
+        entry = CacheEntry(text, etag, time.time())
+        with self._lock:
+            self._entries[key] = entry
+        if self.directory is not None:
+            self._write(key, entry)
+
+    def revalidated(self, key, entry):
+        "Mark `entry` as fresh again, after the service confirmed it hasn't changed"
+        self.put(key, entry.text, entry.etag)
+        with self._lock:
+            self.revalidations += 1
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        "Remove all responses, and reset the counters"
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(self.SUFFIX):
+                    _remove(os.path.join(self.directory, name))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _read(self, key):
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+            return CacheEntry(stored["text"], stored["etag"], stored["stored"])
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, key, entry):
+        # write to a temporary file and rename it, so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"text": entry.text, "etag": entry.etag, "stored": entry.stored}, f)
+            try:
+                os.rename(tmp_path, self._path(key))
+            except OSError:
+                # Windows won't rename over an existing file
+                _remove(self._path(key))
+                os.rename(tmp_path, self._path(key))
+        except Exception:
+            _remove(tmp_path)
+            raise
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
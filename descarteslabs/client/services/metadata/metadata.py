@@ -12,17 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import datetime
+import heapq
 import json
+import logging
 import os
+import re
 from warnings import warn, simplefilter
 from six import string_types
+from descarteslabs.client.addons import concurrent
 from descarteslabs.client.services.service import Service
 from descarteslabs.client.services.places import Places
 from descarteslabs.client.auth import Auth
 from descarteslabs.client.deprecation import check_deprecated_kwargs
 from descarteslabs.client.services.raster import Raster
+from descarteslabs.client.services.metadata.table import FeatureTable
 from descarteslabs.common.property_filtering.filtering import AndExpression, GenericProperties
 from descarteslabs.common.dotdict import DotDict, DotList
+from descarteslabs.common.jsonstream import iter_array
+from descarteslabs.common.threading.prefetch import interleave, prefetch as prefetch_iter
 
 
 SOURCES_DEPRECATION_MESSAGE = (
@@ -31,6 +40,13 @@ SOURCES_DEPRECATION_MESSAGE = (
     "Metadata.available_products() or Metadata.products() instead. "
 )
 
+# size of the pieces in which streamed search responses are read and parsed
+STREAM_CHUNK_SIZE = 2**16
+
+# number of ids per request, and maximum concurrent requests, for get_by_ids
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_WORKERS = 8
+
 
 class Metadata(Service):
     """
@@ -46,10 +62,14 @@ class Metadata(Service):
 
     properties = GenericProperties()
 
-    def __init__(self, url=None, auth=None):
+    def __init__(self, url=None, auth=None, cache=None):
         """The parent Service class implements authentication and exponential
         backoff/retry. Override the url parameter to use a different instance
         of the backing service.
+
+        Pass a :py:class:`ResponseCache` as ``cache`` to cache the responses of the catalog
+        endpoints (:py:func:`products`, :py:func:`bands`, :py:func:`get_product` and so on).
+        By default nothing is cached, so changes made to the catalog are seen right away.
         """
         if auth is None:
             auth = Auth()
@@ -62,11 +82,40 @@ class Metadata(Service):
         super(Metadata, self).__init__(url, auth=auth)
         self._raster = Raster(auth=self.auth)
 
+        self.cache = cache
+
+    def _cached_json(self, method, path, **kwargs):
+        """
+        The parsed JSON response of a request to a read-only endpoint, from the cache
+        if it's fresh, or if the service confirms (by its ETag) that it hasn't changed.
+        """
+        if self.cache is None:
+            return self.session.request(method, path, **kwargs).json()
+
+        key = self.cache.key(self.base_url, getattr(self.auth, 'client_id', None), method, path, kwargs.get('json'))
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.count(hit=True)
+            return json.loads(entry.text)
+
+        headers = {}
+        if entry is not None and entry.etag is not None:
+            headers['If-None-Match'] = entry.etag
+        r = self.session.request(method, path, headers=headers, **kwargs)
+
+        if r.status_code == 304 and entry is not None:
+            self.cache.count(hit=True)
+            self.cache.revalidated(key, entry)
+            return json.loads(entry.text)
+
+        self.cache.count(hit=False)
+        self.cache.put(key, r.text, r.headers.get('ETag'))
+        return json.loads(r.text)
+
     def sources(self):
         warn(SOURCES_DEPRECATION_MESSAGE, DeprecationWarning)
 
-        r = self.session.get('/sources')
-        return DotList(r.json())
+        return DotList(self._cached_json('GET', '/sources'))
 
     def bands(
         self,
@@ -100,8 +149,7 @@ class Metadata(Service):
             if args[param] is not None
         })
 
-        r = self.session.post('/bands/search', json=kwargs)
-        return DotList(r.json())
+        return DotList(self._cached_json('POST', '/bands/search', json=kwargs))
 
     def derived_bands(self, bands=None, require_bands=None, limit=None, offset=None, **kwargs):
         """Search for predefined derived bands that you have access to.
@@ -124,8 +172,7 @@ class Metadata(Service):
             if args[param] is not None
         })
 
-        r = self.session.post('/bands/derived/search', json=kwargs)
-        return DotList(r.json())
+        return DotList(self._cached_json('POST', '/bands/derived/search', json=kwargs))
 
     def get_bands_by_id(self, id_):
         """
@@ -172,9 +219,7 @@ class Metadata(Service):
         })
         check_deprecated_kwargs(kwargs, {"band": "bands"})
 
-        r = self.session.post('/products/search', json=kwargs)
-
-        return DotList(r.json())
+        return DotList(self._cached_json('POST', '/products/search', json=kwargs))
 
     def available_products(self):
         """Get the list of product identifiers you have access to.
@@ -186,9 +231,7 @@ class Metadata(Service):
             ['landsat:LC08:PRE:TOAR']
 
         """
-        r = self.session.get('/products')
-
-        return DotList(r.json())
+        return DotList(self._cached_json('GET', '/products'))
 
     def summary(self, products=None, sat_ids=None, date='acquired', interval=None,
                 place=None, geom=None, start_datetime=None, end_datetime=None, cloud_fraction=None,
@@ -318,7 +361,7 @@ class Metadata(Service):
                geom=None, start_datetime=None, end_datetime=None, cloud_fraction=None,
                cloud_fraction_0=None, fill_fraction=None, q=None, limit=100,
                fields=None, dltile=None, sort_field=None, sort_order="asc", randomize=None,
-               continuation_token=None, **kwargs):
+               continuation_token=None, stream=False, **kwargs):
         """Search metadata given a spatio-temporal query. All parameters are
         optional. For accessing more than 10000 results, see :py:func:`features`.
 
@@ -339,6 +382,9 @@ class Metadata(Service):
         :param str sort_field: Property to sort on.
         :param str sort_order: Order of sort.
         :param bool randomize: Randomize the results. You may also use an `int` or `str` as an explicit seed.
+        :param bool stream: If :py:obj:`True`, the ``features`` of the result are a generator, which parses
+            each feature as soon as it's received, rather than a list of all of them. The generator
+            must be consumed, or closed, to release the connection.
 
         return: GeoJSON ``FeatureCollection``
 
@@ -428,9 +474,14 @@ class Metadata(Service):
         if continuation_token is not None:
             kwargs['continuation_token'] = continuation_token
 
-        r = self.session.post('/search', json=kwargs)
+        if stream:
+            r = self.session.post('/search', json=kwargs, stream=True)
+            features = _stream_features(r)
+        else:
+            r = self.session.post('/search', json=kwargs)
+            features = r.json()
 
-        fc = {'type': 'FeatureCollection', "features": r.json()}
+        fc = {'type': 'FeatureCollection', "features": features}
 
         if 'x-continuation-token' in r.headers:
             fc['properties'] = {
@@ -491,10 +542,16 @@ class Metadata(Service):
                  geom=None, start_datetime=None, end_datetime=None, cloud_fraction=None,
                  cloud_fraction_0=None, fill_fraction=None, q=None, fields=None,
                  batch_size=1000, dltile=None, sort_field=None, sort_order='asc',
-                 randomize=None, **kwargs):
+                 randomize=None, prefetch=0, stream=False, **kwargs):
         """Generator that efficiently scrolls through the search results.
 
         :param int batch_size: Number of features to fetch per request.
+        :param int prefetch: Number of pages (of ``batch_size`` features) to request ahead,
+            in a background thread, while the features of the current page are being consumed.
+            If 0 (default), each page is requested only once the previous page has been consumed.
+        :param bool stream: If :py:obj:`True`, each feature is parsed and yielded as soon as it's received,
+            instead of once its whole page has been received, so that at most about one feature
+            (plus ``prefetch`` pages) is held in memory at a time.
 
         :return: Generator of GeoJSON ``Feature`` objects.
 
@@ -512,26 +569,147 @@ class Metadata(Service):
             31898
         """
 
+        pages = self._pages(sat_ids=sat_ids, products=products,
+                            date=date, place=place, geom=geom,
+                            start_datetime=start_datetime, end_datetime=end_datetime,
+                            cloud_fraction=cloud_fraction,
+                            cloud_fraction_0=cloud_fraction_0,
+                            fill_fraction=fill_fraction, q=q,
+                            fields=fields, limit=batch_size, dltile=dltile,
+                            sort_field=sort_field, sort_order=sort_order,
+                            randomize=randomize, stream=stream, **kwargs)
+        features = (feature for page in pages for feature in page)
+
+        if prefetch:
+            if stream:
+                # a streamed page is only read as it's consumed, so prefetch features instead
+                features = prefetch_iter(features, depth=prefetch * batch_size)
+            else:
+                pages = prefetch_iter(pages, depth=prefetch)
+                features = (feature for page in pages for feature in page)
+
+        for feature in features:
+            yield feature
+
+    def features_table(self, *args, **kwargs):
+        """Scroll through the search results like :py:func:`features`, and collect them
+        in a :py:class:`FeatureTable`, which stores each property as a NumPy array
+        for vectorized filtering and sorting. Requires NumPy.
+
+        Takes the same parameters as :py:func:`features`.
+
+        :return: :py:class:`FeatureTable` of the results.
+
+        Example::
+
+            >>> from descarteslabs.client.services import Metadata
+            >>> table = Metadata().features_table("landsat:LC08:PRE:TOAR", \
+                            start_datetime='2016-01-01', \
+                            end_datetime="2016-03-01")
+            >>> clear = table[table["cloud_fraction"] < 0.1]
+            >>> len(clear) # doctest: +SKIP
+            5273
+        """
+        return FeatureTable.from_features(self.features(*args, **kwargs))
+
+    def features_parallel(self, products=None, sat_ids=None, date='acquired', place=None,
+                          geom=None, start_datetime=None, end_datetime=None, cloud_fraction=None,
+                          cloud_fraction_0=None, fill_fraction=None, q=None, fields=None,
+                          batch_size=1000, dltile=None, sort_field=None, sort_order='asc',
+                          shards=4, **kwargs):
+        """Generator that scrolls through the search results of several time windows
+        concurrently, for faster access to large result sets.
+
+        The ``start_datetime`` to ``end_datetime`` window is split into ``shards`` disjoint
+        windows of equal length, and the results of each are scrolled through in their own
+        thread, as with :py:func:`features`.
+
+        :param str start_datetime: Desired starting timestamp, as a `datetime` or an ISO 8601 string.
+            Required.
+        :param str end_datetime: Desired ending timestamp, as a `datetime` or an ISO 8601 string.
+            Required.
+        :param int batch_size: Number of features to fetch per request.
+        :param str sort_field: Property to sort on. If given, the results of the windows are merged
+            in order of this property; otherwise features are returned in the order they arrive.
+        :param str sort_order: Order of sort.
+        :param int shards: Number of windows to search concurrently.
+
+        See :py:func:`search` for the other parameters.
+
+        :return: Generator of GeoJSON ``Feature`` objects.
+
+        Example::
+
+            >>> from descarteslabs.client.services import Metadata
+            >>> features = Metadata().features_parallel("landsat:LC08:PRE:TOAR", \
+                            start_datetime='2016-01-01', \
+                            end_datetime="2016-03-01", shards=8)
+            >>> total = 0
+            >>> for f in features: \
+                    total += 1
+
+            >>> total # doctest: +SKIP
+            31898
+        """
+        if start_datetime is None or end_datetime is None:
+            raise ValueError("features_parallel requires both start_datetime and end_datetime")
+        if shards < 1:
+            raise ValueError("shards must be at least 1, not {}".format(shards))
+
+        if place:
+            # look up the place once, rather than once per shard
+            places = Places()
+            places.auth = self.auth
+            shape = places.shape(place, geom='low')
+            geom = json.dumps(shape['geometry'])
+
+        windows = _split_datetimes(start_datetime, end_datetime, shards)
+        pages = [
+            self._pages(sat_ids=sat_ids, products=products,
+                        date=date, geom=geom,
+                        start_datetime=start, end_datetime=end,
+                        cloud_fraction=cloud_fraction,
+                        cloud_fraction_0=cloud_fraction_0,
+                        fill_fraction=fill_fraction, q=q,
+                        fields=fields, limit=batch_size, dltile=dltile,
+                        sort_field=sort_field, sort_order=sort_order, **kwargs)
+            for start, end in windows
+        ]
+
+        if sort_field is None:
+            for page in interleave(pages, depth=len(pages)):
+                for feature in page:
+                    yield feature
+        else:
+            descending = sort_order is not None and sort_order.lower() == 'desc'
+            streams = [
+                _merge_entries(prefetch_iter(shard_pages), shard, sort_field, descending)
+                for shard, shard_pages in enumerate(pages)
+            ]
+            for entry in heapq.merge(*streams):
+                yield entry.feature
+
+    def _pages(self, **search_kwargs):
+        "Generator of the features in each page of search results: lists, or iterators if streaming"
         continuation_token = None
 
         while True:
-            result = self.search(sat_ids=sat_ids, products=products,
-                                 date=date, place=place, geom=geom,
-                                 start_datetime=start_datetime, end_datetime=end_datetime,
-                                 cloud_fraction=cloud_fraction,
-                                 cloud_fraction_0=cloud_fraction_0,
-                                 fill_fraction=fill_fraction, q=q,
-                                 fields=fields, limit=batch_size, dltile=dltile,
-                                 sort_field=sort_field, sort_order=sort_order,
-                                 randomize=randomize, continuation_token=continuation_token, **kwargs)
-
-            if not result['features']:
-                break
+            result = self.search(continuation_token=continuation_token, **search_kwargs)
 
-            for feature in result['features']:
-                yield feature
+            features = result['features']
+            if isinstance(features, list):
+                if not features:
+                    break
+            else:
+                # a stream: only know whether the page is empty once it's been read
+                features = _CountingIterator(features)
+
+            yield features
+
+            if isinstance(features, _CountingIterator) and not features.count:
+                break
 
-            continuation_token = result['properties'].get('continuation_token')
+            continuation_token = result.get('properties', {}).get('continuation_token')
             if not continuation_token:
                 break
 
@@ -557,18 +735,91 @@ class Metadata(Service):
         r = self.session.get('/get/{}'.format(image_id))
         return DotDict(r.json())
 
-    def get_by_ids(self, ids, fields=None, ignore_not_found=True, **kwargs):
+    def get_by_ids(self, ids, fields=None, ignore_not_found=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                   max_workers=DEFAULT_MAX_WORKERS, **kwargs):
         """Get metadata for multiple images by id. The response contains found images in the
         order of the given ids.
 
+        Long lists of ids are split into requests of ``chunk_size`` ids, which are made
+        concurrently. See :py:func:`iter_by_ids` to process the images as they arrive.
+
         :param list(str) ids: Image identifiers.
         :param list(str) fields: Properties to return.
         :param bool ignore_not_found: For image id lookups that fail: if :py:obj:`True`, ignore;
                                       if :py:obj:`False`, raise :py:exc:`NotFoundError`. Default is :py:obj:`True`.
+        :param int chunk_size: Maximum number of ids per request.
+        :param int max_workers: Maximum number of requests to make concurrently.
 
         :return: List of image metadata.
         :rtype: list(dict)
         """
+        if len(ids) <= chunk_size:
+            return self._get_by_ids(ids, fields=fields, ignore_not_found=ignore_not_found, **kwargs)
+
+        return DotList(self.iter_by_ids(ids, fields=fields, ignore_not_found=ignore_not_found,
+                                        chunk_size=chunk_size, max_workers=max_workers, **kwargs))
+
+    def iter_by_ids(self, ids, fields=None, ignore_not_found=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                    max_workers=DEFAULT_MAX_WORKERS, **kwargs):
+        """Generator of the metadata of multiple images by id, in the order of the given ids.
+
+        The ids are requested in chunks of ``chunk_size``, with up to ``max_workers`` requests
+        in flight at a time. The images of each chunk are yielded as soon as it (and every chunk
+        before it) has arrived, so memory use is bounded by ``max_workers`` chunks, not the number of ids.
+
+        :param list(str) ids: Image identifiers.
+        :param list(str) fields: Properties to return.
+        :param bool ignore_not_found: For image id lookups that fail: if :py:obj:`True`, ignore;
+                                      if :py:obj:`False`, raise :py:exc:`NotFoundError`. Default is :py:obj:`True`.
+        :param int chunk_size: Maximum number of ids per request.
+        :param int max_workers: Maximum number of requests to make concurrently.
+
+        :return: Generator of image metadata.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1, not {}".format(chunk_size))
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1, not {}".format(max_workers))
+
+        ids = list(ids)
+        chunks = (ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size))
+
+        def get_chunk(chunk):
+            return self._get_by_ids(chunk, fields=fields, ignore_not_found=ignore_not_found, **kwargs)
+
+        try:
+            futures = concurrent.futures
+        except ImportError:
+            logging.warning(
+                "Failed to import concurrent.futures. get_by_ids calls will be serial"
+            )
+            for chunk in chunks:
+                for image in get_chunk(chunk):
+                    yield image
+            return
+
+        pending = collections.deque()
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(executor.submit(get_chunk, chunk))
+
+            try:
+                for _ in range(max_workers):
+                    submit_next()
+
+                while pending:
+                    images = pending.popleft().result()
+                    submit_next()
+                    for image in images:
+                        yield image
+            finally:
+                # if the caller stopped early, don't wait for chunks it won't use
+                for future in pending:
+                    future.cancel()
+
+    def _get_by_ids(self, ids, fields=None, ignore_not_found=True, **kwargs):
         kwargs['ids'] = ids
         kwargs['ignore_not_found'] = ignore_not_found
         if fields is not None:
@@ -583,8 +834,7 @@ class Metadata(Service):
         :param str product_id: Product Identifier.
 
         """
-        r = self.session.get('/products/{}'.format(product_id))
-        return DotDict(r.json())
+        return DotDict(self._cached_json('GET', '/products/{}'.format(product_id)))
 
     def get_band(self, band_id):
         """Get information about a single band.
@@ -592,8 +842,7 @@ class Metadata(Service):
         :param str band_id: Band Identifier.
 
         """
-        r = self.session.get('/bands/{}'.format(band_id))
-        return DotDict(r.json())
+        return DotDict(self._cached_json('GET', '/bands/{}'.format(band_id)))
 
     def get_derived_band(self, derived_band_id):
         """Get information about a single product.
@@ -601,5 +850,120 @@ class Metadata(Service):
         :param str derived_band_id: Derived band identifier.
 
         """
-        r = self.session.get('/bands/derived/{}'.format(derived_band_id))
-        return DotDict(r.json())
+        return DotDict(self._cached_json('GET', '/bands/derived/{}'.format(derived_band_id)))
+
+
+_ISO_DATETIME = re.compile(
+    r"^(?P<datetime>\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?)"
+    r"(?:(?P<utc>Z)|(?P<sign>[+-])(?P<hours>\d{2}):?(?P<minutes>\d{2}))?$"
+)
+_DATETIME_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+
+
+def _parse_datetime(value):
+    "A naive UTC `datetime` from a `datetime`, `date` or ISO 8601 string"
+    if isinstance(value, datetime.datetime):
+        if value.utcoffset() is not None:
+            value = value.replace(tzinfo=None) - value.utcoffset()
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+
+    match = _ISO_DATETIME.match(value.strip()) if isinstance(value, string_types) else None
+    if match is None:
+        raise ValueError("Expected a datetime or an ISO 8601 timestamp, not {!r}".format(value))
+
+    text = match.group('datetime').replace(' ', 'T')
+    for fmt in _DATETIME_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(text, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError("Expected a datetime or an ISO 8601 timestamp, not {!r}".format(value))
+
+    if match.group('sign'):
+        offset = datetime.timedelta(hours=int(match.group('hours')), minutes=int(match.group('minutes')))
+        parsed = parsed - offset if match.group('sign') == '+' else parsed + offset
+    return parsed
+
+
+def _split_datetimes(start_datetime, end_datetime, n):
+    """
+    Split the window from `start_datetime` to `end_datetime` into up to `n` disjoint
+    windows of equal length, as ``(start, end)`` pairs of ISO 8601 strings. Each window
+    ends a microsecond before the next begins, as search windows include their end.
+    """
+    start = _parse_datetime(start_datetime)
+    end = _parse_datetime(end_datetime)
+    if end < start:
+        raise ValueError("end_datetime {!r} is before start_datetime {!r}".format(end_datetime, start_datetime))
+
+    resolution = datetime.timedelta(microseconds=1)
+    step = (end - start) // n
+    if step < resolution:
+        return [(_format_datetime(start), _format_datetime(end))]
+
+    bounds = [start + i * step for i in range(n)] + [end + resolution]
+    return [(_format_datetime(lower), _format_datetime(upper - resolution)) for lower, upper in zip(bounds, bounds[1:])]
+
+
+def _format_datetime(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _MergeEntry(object):
+    """
+    A feature in a merge of search results sorted on a property, ordered by the
+    property's value, with missing values last, then by the shard it came from.
+    """
+
+    __slots__ = ("missing", "value", "shard", "descending", "feature")
+
+    def __init__(self, feature, shard, sort_field, descending):
+        self.value = feature.get('properties', {}).get(sort_field)
+        self.missing = self.value is None
+        self.shard = shard
+        self.descending = descending
+        self.feature = feature
+
+    def __lt__(self, other):
+        if self.missing != other.missing:
+            return other.missing
+        if not self.missing and self.value != other.value:
+            return other.value < self.value if self.descending else self.value < other.value
+        return self.shard < other.shard
+
+
+def _merge_entries(pages, shard, sort_field, descending):
+    for page in pages:
+        for feature in page:
+            yield _MergeEntry(feature, shard, sort_field, descending)
+
+
+def _stream_features(response):
+    "Generator of the features of a streamed search response, which it closes when done"
+    try:
+        for feature in iter_array(response.iter_content(STREAM_CHUNK_SIZE)):
+            yield DotDict(feature)
+    finally:
+        response.close()
+
+
+class _CountingIterator(object):
+    "Iterator that counts the items it has produced"
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+    next = __next__
@@ -0,0 +1,380 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import numbers
+import re
+
+import six
+
+from descarteslabs.client.addons import numpy as np
+from descarteslabs.common.dotdict import DotDict
+
+# timestamps the service returns in UTC, which datetime64 can parse once the zone is removed
+_UTC_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|\+00:?00)?$")
+_UTC_SUFFIX = re.compile(r"(Z|\+00:?00)$")
+
+
+class Categorical(object):
+    """
+    A column of strings, stored as integer ``codes`` into a sorted array of
+    distinct ``categories``. Missing values have the code -1.
+
+    Comparing a `Categorical` to a string gives a boolean array, so it can be
+    used to filter a `FeatureTable`::
+
+        >>> table[table["product"] == "landsat:LC08:PRE:TOAR"]  # doctest: +SKIP
+    """
+
+    def __init__(self, codes, categories):
+        """
+        :param ndarray codes: Integer index into ``categories`` of each value, or -1 if missing.
+        :param ndarray categories: Sorted distinct values.
+        """
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_values(cls, values):
+        "A `Categorical` of a sequence of strings, where None is a missing value"
+        present = np.array([value is not None for value in values], dtype=bool)
+        codes = np.full(len(values), -1, dtype=np.int32)
+        if present.any():
+            strings = np.array([value for value in values if value is not None], dtype=object)
+            categories, inverse = np.unique(strings.astype(six.text_type), return_inverse=True)
+            codes[present] = inverse
+        else:
+            categories = np.array([], dtype=six.text_type)
+        return cls(codes, categories.astype(object))
+
+    @property
+    def values(self):
+        "The values of the column, as an object array with None for missing values"
+        values = np.empty(len(self.codes), dtype=object)
+        present = self.codes >= 0
+        values[present] = self.categories[self.codes[present]]
+        return values
+
+    def take(self, indices):
+        "The values at `indices`, as a `Categorical` with the same categories"
+        return Categorical(self.codes[indices], self.categories)
+
+    def isin(self, values):
+        "Boolean array of whether each value is one of `values`"
+        codes = [code for code in (self._code(value) for value in values) if code is not None]
+        return np.isin(self.codes, codes)
+
+    def _code(self, value):
+        "The code of `value`, or None if it's not one of the categories"
+        if not isinstance(value, six.string_types):
+            return None
+        code = np.searchsorted(self.categories, value)
+        if code < len(self.categories) and self.categories[code] == value:
+            return code
+        return None
+
+    def __eq__(self, other):
+        code = self._code(other)
+        if code is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == code
+
+    def __ne__(self, other):
+        return ~(self == other)
+
+    __hash__ = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, numbers.Integral):
+            code = self.codes[index]
+            return self.categories[code] if code >= 0 else None
+        return self.take(index)
+
+    def __repr__(self):
+        return "Categorical({!r}, categories={})".format(self.values.tolist(), len(self.categories))
+
+
+class FeatureTable(object):
+    """
+    Search results stored by column, for vectorized filtering and sorting
+    of large numbers of features.
+
+    Each property is stored as one NumPy array:
+
+    * numbers as ``float64`` (with NaN for missing values), or ``int64`` if every value is an integer;
+    * booleans as ``bool``;
+    * UTC timestamps (such as ``acquired``) as ``datetime64[us]``, with NaT for missing values
+      (their original strings are kept too, so `to_features` returns them unchanged);
+    * other strings (such as ``product``) as a `Categorical`;
+    * anything else (lists, dicts, or a mix of types) as an ``object`` array.
+
+    Geometries (Polygons and MultiPolygons) are packed into a single ``(n, 2)`` array of
+    ``coordinates``, with offset arrays marking where each geometry, polygon and ring starts.
+
+    Indexing a table with a string returns that column; indexing with an integer array,
+    boolean mask or slice returns a new table of those rows::
+
+        >>> table = Metadata().features_table("landsat:LC08:PRE:TOAR", \\
+                        start_datetime="2017-01-01", end_datetime="2017-02-01")  # doctest: +SKIP
+        >>> clear = table[table["cloud_fraction"] < 0.1].sort("acquired")  # doctest: +SKIP
+        >>> clear.ids[:3]  # doctest: +SKIP
+    """
+
+    def __init__(self, ids, columns, coordinates, ring_offsets, polygon_offsets, geometry_offsets,
+                 timestamp_strings=None):
+        """
+        :param ndarray ids: Feature identifiers.
+        :param OrderedDict columns: Property name -> ndarray or `Categorical`, each the length of ``ids``.
+        :param ndarray coordinates: ``(n, 2)`` array of all the geometries' coordinates.
+        :param ndarray ring_offsets: Start of each ring in ``coordinates``, then the end of the last ring.
+        :param ndarray polygon_offsets: Start of each polygon's rings in ``ring_offsets``,
+            then the end of the last polygon.
+        :param ndarray geometry_offsets: Start of each feature's polygons in ``polygon_offsets``,
+            then the end of the last feature.
+        :param dict timestamp_strings: Name -> object array of the original strings (or None) of
+            each ``datetime64`` column. Columns without one are formatted as ISO 8601 in UTC.
+        """
+        self.ids = ids
+        self.columns = columns
+        self.coordinates = coordinates
+        self.ring_offsets = ring_offsets
+        self.polygon_offsets = polygon_offsets
+        self.geometry_offsets = geometry_offsets
+        self.timestamp_strings = timestamp_strings if timestamp_strings is not None else {}
+
+    @classmethod
+    def from_features(cls, features):
+        """
+        Build a table from an iterable of GeoJSON features, such as the results of
+        :py:func:`Metadata.features`.
+
+        :raises ValueError: If a geometry is not a Polygon or MultiPolygon.
+        """
+        ids = []
+        properties = collections.OrderedDict()
+        coordinates = []
+        ring_offsets = [0]
+        polygon_offsets = [0]
+        geometry_offsets = [0]
+
+        for n, feature in enumerate(features):
+            ids.append(dict.get(feature, "id"))
+            for name, value in six.iteritems(dict.get(feature, "properties") or {}):
+                column = properties.get(name)
+                if column is None:
+                    column = properties[name] = [None] * n
+                column.append(value)
+            for column in six.itervalues(properties):
+                if len(column) == n:
+                    column.append(None)
+
+            for polygon in _polygons(dict.get(feature, "geometry")):
+                for ring in polygon:
+                    coordinates.extend(ring)
+                    ring_offsets.append(len(coordinates))
+                polygon_offsets.append(len(ring_offsets) - 1)
+            geometry_offsets.append(len(polygon_offsets) - 1)
+
+        columns = collections.OrderedDict((name, _column(values)) for name, values in six.iteritems(properties))
+        # datetime64 doesn't keep the precision or zone suffix of the strings it's parsed from
+        timestamp_strings = {
+            name: _object_array(properties[name]) for name, column in six.iteritems(columns)
+            if not isinstance(column, Categorical) and column.dtype.kind == "M"
+        }
+        return cls(
+            np.array(ids, dtype=object),
+            columns,
+            np.array(coordinates, dtype=float).reshape(-1, 2),
+            np.array(ring_offsets, dtype=np.int64),
+            np.array(polygon_offsets, dtype=np.int64),
+            np.array(geometry_offsets, dtype=np.int64),
+            timestamp_strings,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, six.string_types):
+            return self.columns[key]
+        return self.take(key)
+
+    def take(self, indices):
+        "A new table of the rows at `indices`: an integer array, boolean mask or slice"
+        indices = np.arange(len(self))[indices]
+        if indices.ndim == 0:
+            indices = indices[np.newaxis]
+
+        polygons, geometry_offsets = _take_ranges(self.geometry_offsets, indices)
+        rings, polygon_offsets = _take_ranges(self.polygon_offsets, polygons)
+        points, ring_offsets = _take_ranges(self.ring_offsets, rings)
+
+        columns = collections.OrderedDict(
+            (name, column.take(indices) if isinstance(column, Categorical) else column[indices])
+            for name, column in six.iteritems(self.columns)
+        )
+        timestamp_strings = {name: strings[indices] for name, strings in six.iteritems(self.timestamp_strings)}
+        return FeatureTable(
+            self.ids[indices], columns, self.coordinates[points], ring_offsets, polygon_offsets, geometry_offsets,
+            timestamp_strings,
+        )
+
+    def sort(self, name, reverse=False):
+        """
+        A new table with the rows ordered by column `name`. The sort is stable,
+        and missing values (NaN, NaT or None) come last.
+        """
+        column = self.columns[name]
+        if isinstance(column, Categorical):
+            # categories are sorted, so their codes are too
+            keys = column.codes.astype(float)
+            keys[column.codes < 0] = np.nan
+        else:
+            keys = column
+
+        missing = _missing(keys)
+        keys = keys[~missing]
+        if reverse:
+            # stable descending order: ties keep their original order
+            order = len(keys) - 1 - np.argsort(keys[::-1], kind="mergesort")[::-1]
+        else:
+            order = np.argsort(keys, kind="mergesort")
+        return self.take(np.concatenate([np.flatnonzero(~missing)[order], np.flatnonzero(missing)]))
+
+    @property
+    def bounds(self):
+        "``(len(self), 4)`` array of the ``(minx, miny, maxx, maxy)`` of each geometry; NaN if it has none"
+        bounds = np.full((len(self), 4), np.nan)
+        starts = self.ring_offsets[self.polygon_offsets[self.geometry_offsets]]
+        has_points = starts[1:] > starts[:-1]
+        if has_points.any():
+            first = starts[:-1][has_points]
+            bounds[has_points, :2] = np.minimum.reduceat(self.coordinates, first)
+            bounds[has_points, 2:] = np.maximum.reduceat(self.coordinates, first)
+        return bounds
+
+    def geometry(self, index):
+        "The GeoJSON geometry of the feature at `index`, or None if it has none"
+        polygons = []
+        start, stop = self.geometry_offsets[index], self.geometry_offsets[index + 1]
+        for p in range(start, stop):
+            rings = range(self.polygon_offsets[p], self.polygon_offsets[p + 1])
+            polygons.append([
+                self.coordinates[self.ring_offsets[r]:self.ring_offsets[r + 1]].tolist() for r in rings
+            ])
+
+        if not polygons:
+            return None
+        if len(polygons) == 1:
+            return {"type": "Polygon", "coordinates": polygons[0]}
+        return {"type": "MultiPolygon", "coordinates": polygons}
+
+    def to_features(self):
+        "The rows as a list of GeoJSON features, in the format returned by :py:func:`Metadata.search`"
+        columns = [
+            (name, self.timestamp_strings[name] if name in self.timestamp_strings else _python_values(column))
+            for name, column in six.iteritems(self.columns)
+        ]
+        features = []
+        for i, id_ in enumerate(self.ids):
+            properties = {name: values[i] for name, values in columns if values[i] is not None}
+            features.append(DotDict(
+                type="Feature", id=id_, geometry=self.geometry(i), properties=properties
+            ))
+        return features
+
+    def __repr__(self):
+        return "FeatureTable({} features, columns={})".format(len(self), list(self.columns))
+
+
+def _polygons(geometry):
+    if not geometry:
+        return []
+    kind = geometry.get("type")
+    if kind == "Polygon":
+        return [geometry["coordinates"]]
+    if kind == "MultiPolygon":
+        return geometry["coordinates"]
+    raise ValueError("FeatureTable supports Polygon and MultiPolygon geometries, not {!r}".format(kind))
+
+
+def _column(values):
+    "The array for a list of property values, which may contain None for missing values"
+    present = [value for value in values if value is not None]
+    types = set(type(value) for value in present)
+
+    if types == {bool}:
+        if len(present) == len(values):
+            return np.array(values, dtype=bool)
+    elif types and all(issubclass(t, numbers.Number) and t is not bool for t in types):
+        if len(present) == len(values) and all(issubclass(t, numbers.Integral) for t in types):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+    elif types and all(issubclass(t, six.string_types) for t in types):
+        if all(_UTC_TIMESTAMP.match(value) for value in present):
+            return np.array(
+                ["NaT" if value is None else _UTC_SUFFIX.sub("", value) for value in values],
+                dtype="datetime64[us]",
+            )
+        return Categorical.from_values(values)
+
+    return _object_array(values)
+
+
+def _object_array(values):
+    "An object array of `values`, without NumPy treating any lists among them as dimensions"
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _missing(column):
+    if column.dtype.kind == "f":
+        return np.isnan(column)
+    if column.dtype.kind == "M":
+        return np.isnat(column)
+    if column.dtype.kind == "O":
+        return np.array([value is None for value in column], dtype=bool)
+    return np.zeros(len(column), dtype=bool)
+
+
+def _python_values(column):
+    "The values of a column as Python objects, with None for missing values"
+    if isinstance(column, Categorical):
+        return column.values
+    if column.dtype.kind == "M":
+        return [None if np.isnat(value) else str(value) + "Z" for value in column]
+    missing = _missing(column)
+    return [None if m else value for m, value in zip(missing, column.tolist())]
+
+
+def _take_ranges(offsets, indices):
+    """
+    Select the ranges ``offsets[i]:offsets[i + 1]`` for each of `indices`.
+
+    Returns the concatenated positions in those ranges, and the offsets of the
+    selected ranges within them.
+    """
+    starts = offsets[indices]
+    lengths = offsets[indices + 1] - starts
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1] - starts, lengths)
+    return positions, new_offsets
@@ -12,10 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
 import itertools
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
-from descarteslabs.client.services.metadata import Metadata
+import responses
+from mock import patch
+
+from descarteslabs.client.auth import Auth
+from descarteslabs.client.services.metadata import Metadata, ResponseCache
 from descarteslabs.client.exceptions import NotFoundError
 
 
@@ -253,5 +262,280 @@ class TestMetadata(unittest.TestCase):
         self.assertGreater(summary_r['count'], 0)
 
 
+@patch.object(Auth, 'token', 'token')
+class TestMetadataFeatures(unittest.TestCase):
+    url = "https://example.com/metadata/v1"
+
+    def setUp(self):
+        self.instance = Metadata(url=self.url)
+        self.pages = [
+            [{"id": "scene{}".format(page * 3 + i)} for i in range(3)]
+            for page in range(4)
+        ]
+
+    def add_search_callback(self, rsps):
+        def callback(request):
+            token = json.loads(request.body.decode("utf-8")).get("continuation_token")
+            page = int(token) if token else 0
+            headers = {"x-continuation-token": str(page + 1)} if page + 1 < len(self.pages) else {}
+            return 200, headers, json.dumps(self.pages[page])
+
+        rsps.add_callback(responses.POST, self.url + "/search", callback=callback)
+
+    def test_features(self):
+        expected = [feature["id"] for page in self.pages for feature in page]
+        for prefetch in [0, 1, 3]:
+            with responses.RequestsMock() as rsps:
+                self.add_search_callback(rsps)
+                ids = [f["id"] for f in self.instance.features(products="foo", batch_size=3, prefetch=prefetch)]
+                self.assertEqual(len(rsps.calls), len(self.pages))
+            self.assertEqual(ids, expected)
+
+    def test_features_stream(self):
+        expected = [feature["id"] for page in self.pages for feature in page]
+        for prefetch in [0, 2]:
+            with responses.RequestsMock() as rsps:
+                self.add_search_callback(rsps)
+                features = self.instance.features(products="foo", batch_size=3, prefetch=prefetch, stream=True)
+                ids = [f.id for f in features]
+                self.assertEqual(len(rsps.calls), len(self.pages))
+            self.assertEqual(ids, expected)
+
+    def test_search_stream(self):
+        with responses.RequestsMock() as rsps:
+            self.add_search_callback(rsps)
+            result = self.instance.search(products="foo", limit=3, stream=True)
+            self.assertEqual(result.properties.continuation_token, "1")
+            features = result.features
+            self.assertNotIsInstance(features, list)
+            self.assertEqual([f.id for f in features], ["scene0", "scene1", "scene2"])
+
+    def test_features_prefetch_error(self):
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/search", status=404, body="not found")
+            with self.assertRaises(NotFoundError):
+                list(self.instance.features(products="foo", prefetch=2))
+
+
+@patch.object(Auth, 'token', 'token')
+class TestMetadataFeaturesParallel(unittest.TestCase):
+    url = "https://example.com/metadata/v1"
+
+    def setUp(self):
+        self.instance = Metadata(url=self.url)
+        # one scene per day of January, with decreasing cloud fraction
+        self.features = [
+            {"id": "scene{:02d}".format(day), "properties": {
+                "acquired": "2017-01-{:02d}T12:00:00.000000Z".format(day),
+                "cloud_fraction": (31 - day) / 31.0,
+            }}
+            for day in range(1, 32)
+        ]
+
+    def add_search_callback(self, rsps, page_size=2):
+        def callback(request):
+            body = json.loads(request.body.decode("utf-8"))
+            matches = [
+                f for f in self.features
+                if body["start_datetime"] <= f["properties"]["acquired"] <= body["end_datetime"]
+            ]
+            if body.get("sort_field"):
+                matches.sort(key=lambda f: f["properties"][body["sort_field"]],
+                             reverse=body.get("sort_order") == "desc")
+            offset = int(body.get("continuation_token") or 0)
+            headers = {}
+            if offset + page_size < len(matches):
+                headers["x-continuation-token"] = str(offset + page_size)
+            return 200, headers, json.dumps(matches[offset:offset + page_size])
+
+        rsps.add_callback(responses.POST, self.url + "/search", callback=callback)
+
+    def test_shards(self):
+        with responses.RequestsMock() as rsps:
+            self.add_search_callback(rsps)
+            ids = [f["id"] for f in self.instance.features_parallel(
+                products="foo", start_datetime="2017-01-01", end_datetime="2017-02-01", shards=4,
+            )]
+            windows = set(
+                (body["start_datetime"], body["end_datetime"])
+                for body in (json.loads(call.request.body.decode("utf-8")) for call in rsps.calls)
+            )
+
+        self.assertEqual(sorted(ids), sorted(f["id"] for f in self.features))
+        self.assertEqual(sorted(windows), [
+            ("2017-01-01T00:00:00.000000Z", "2017-01-08T17:59:59.999999Z"),
+            ("2017-01-08T18:00:00.000000Z", "2017-01-16T11:59:59.999999Z"),
+            ("2017-01-16T12:00:00.000000Z", "2017-01-24T05:59:59.999999Z"),
+            ("2017-01-24T06:00:00.000000Z", "2017-02-01T00:00:00.000000Z"),
+        ])
+
+    def test_sorted_merge(self):
+        for sort_order in ["asc", "desc"]:
+            expected = sorted(self.features, key=lambda f: f["properties"]["cloud_fraction"],
+                              reverse=sort_order == "desc")
+            with responses.RequestsMock() as rsps:
+                self.add_search_callback(rsps)
+                ids = [f["id"] for f in self.instance.features_parallel(
+                    products="foo", start_datetime="2017-01-01", end_datetime="2017-02-01",
+                    sort_field="cloud_fraction", sort_order=sort_order, shards=3,
+                )]
+            self.assertEqual(ids, [f["id"] for f in expected])
+
+    def test_datetimes(self):
+        with responses.RequestsMock() as rsps:
+            self.add_search_callback(rsps)
+            ids = [f["id"] for f in self.instance.features_parallel(
+                products="foo", start_datetime="2017-01-10T02:00:00+02:00",
+                end_datetime=datetime.datetime(2017, 1, 11), shards=2,
+            )]
+        self.assertEqual(ids, ["scene10"])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            next(self.instance.features_parallel(products="foo", start_datetime="2017-01-01"))
+        with self.assertRaises(ValueError):
+            next(self.instance.features_parallel(products="foo", start_datetime="2017-01-01",
+                                                 end_datetime="next tuesday"))
+
+    def test_error(self):
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/search", status=404, body="not found")
+            with self.assertRaises(NotFoundError):
+                list(self.instance.features_parallel(products="foo", start_datetime="2017-01-01",
+                                                     end_datetime="2017-02-01"))
+
+
+@patch.object(Auth, 'token', 'token')
+class TestMetadataGetByIds(unittest.TestCase):
+    url = "https://example.com/metadata/v1"
+
+    def setUp(self):
+        self.instance = Metadata(url=self.url)
+        self.ids = ["scene{}".format(i) for i in range(25)]
+
+    def add_batch_callback(self, rsps, missing=()):
+        def callback(request):
+            body = json.loads(request.body.decode("utf-8"))
+            if not body["ignore_not_found"] and any(id_ in missing for id_ in body["ids"]):
+                return 404, {}, "not found"
+            images = [{"id": id_, "properties": {}} for id_ in body["ids"] if id_ not in missing]
+            return 200, {}, json.dumps(images)
+
+        rsps.add_callback(responses.POST, self.url + "/batch/images", callback=callback)
+
+    def test_single_request(self):
+        with responses.RequestsMock() as rsps:
+            self.add_batch_callback(rsps)
+            images = self.instance.get_by_ids(self.ids, fields=["id"])
+            self.assertEqual(len(rsps.calls), 1)
+            self.assertEqual(json.loads(rsps.calls[0].request.body.decode("utf-8"))["fields"], ["id"])
+
+        self.assertEqual([image.id for image in images], self.ids)
+
+    def test_chunked(self):
+        with responses.RequestsMock() as rsps:
+            self.add_batch_callback(rsps, missing={"scene3", "scene17"})
+            images = self.instance.get_by_ids(self.ids, chunk_size=4, max_workers=3)
+            self.assertEqual(len(rsps.calls), 7)
+            self.assertTrue(all(
+                len(json.loads(call.request.body.decode("utf-8"))["ids"]) <= 4 for call in rsps.calls
+            ))
+
+        self.assertEqual([image.id for image in images], [id_ for id_ in self.ids if id_ not in ("scene3", "scene17")])
+
+    def test_iter_by_ids(self):
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self.add_batch_callback(rsps)
+            images = self.instance.iter_by_ids(self.ids, chunk_size=2, max_workers=2)
+            first = [next(images)["id"] for _ in range(3)]
+            images.close()
+
+        self.assertEqual(first, self.ids[:3])
+
+    def test_chunked_not_found(self):
+        with responses.RequestsMock() as rsps:
+            self.add_batch_callback(rsps, missing={"scene17"})
+            with self.assertRaises(NotFoundError):
+                self.instance.get_by_ids(self.ids, ignore_not_found=False, chunk_size=4)
+
+
+@patch.object(Auth, 'token', 'token')
+class TestMetadataCache(unittest.TestCase):
+    url = "https://example.com/metadata/v1"
+
+    def setUp(self):
+        self.product = {"id": "foo", "title": "Foo"}
+        self.etag = '"v1"'
+
+    def add_product_callback(self, rsps):
+        def callback(request):
+            if request.headers.get("If-None-Match") == self.etag:
+                return 304, {"ETag": self.etag}, ""
+            return 200, {"ETag": self.etag}, json.dumps(self.product)
+
+        rsps.add_callback(responses.GET, self.url + "/products/foo", callback=callback)
+
+    def test_cached(self):
+        metadata = Metadata(url=self.url, cache=ResponseCache(ttl=600))
+        with responses.RequestsMock() as rsps:
+            self.add_product_callback(rsps)
+            product = metadata.get_product("foo")
+            product.title = "changed"
+            self.assertEqual(metadata.get_product("foo"), self.product)
+            self.assertEqual(len(rsps.calls), 1)
+
+        self.assertEqual((metadata.cache.hits, metadata.cache.misses), (1, 1))
+        self.assertEqual(metadata.cache.hit_rate, 0.5)
+
+    def test_revalidate(self):
+        metadata = Metadata(url=self.url, cache=ResponseCache(ttl=0))
+        with responses.RequestsMock() as rsps:
+            self.add_product_callback(rsps)
+            metadata.get_product("foo")
+            self.assertEqual(metadata.get_product("foo"), self.product)
+            self.assertEqual(len(rsps.calls), 2)
+            self.assertEqual(rsps.calls[1].request.headers["If-None-Match"], self.etag)
+
+            # a changed product is fetched again
+            self.etag = '"v2"'
+            self.product["title"] = "Foo v2"
+            self.assertEqual(metadata.get_product("foo").title, "Foo v2")
+
+        self.assertEqual(metadata.cache.revalidations, 1)
+        self.assertEqual((metadata.cache.hits, metadata.cache.misses), (1, 2))
+
+    def test_search_params(self):
+        metadata = Metadata(url=self.url, cache=ResponseCache())
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/products/search", body=json.dumps([self.product]))
+            metadata.products(limit=1)
+            metadata.products(limit=1)
+            metadata.products(limit=2)
+            self.assertEqual(len(rsps.calls), 2)
+
+    def test_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with responses.RequestsMock() as rsps:
+            self.add_product_callback(rsps)
+            Metadata(url=self.url, cache=ResponseCache(directory=directory)).get_product("foo")
+            metadata = Metadata(url=self.url, cache=ResponseCache(directory=directory))
+            self.assertEqual(metadata.get_product("foo"), self.product)
+            self.assertEqual(len(rsps.calls), 1)
+
+        metadata.cache.clear()
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_disabled_by_default(self):
+        metadata = Metadata(url=self.url)
+        with responses.RequestsMock() as rsps:
+            self.add_product_callback(rsps)
+            metadata.get_product("foo")
+            metadata.get_product("foo")
+            self.assertEqual(len(rsps.calls), 2)
+            self.assertNotIn("If-None-Match", rsps.calls[1].request.headers)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,121 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from descarteslabs.client.addons import numpy as np
+from descarteslabs.client.services.metadata import Categorical, FeatureTable
+
+
+def square(x, y, size=1):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+class TestFeatureTable(unittest.TestCase):
+
+    def setUp(self):
+        self.features = [
+            {
+                "id": "a",
+                "geometry": {"type": "Polygon", "coordinates": [square(0, 0)]},
+                "properties": {
+                    "product": "landsat:LC08:PRE:TOAR", "cloud_fraction": 0.5, "bands": ["red"],
+                    "acquired": "2017-01-02T10:00:00.5Z", "tile_id": 3,
+                },
+            },
+            {
+                "id": "b",
+                "geometry": {"type": "MultiPolygon", "coordinates": [[square(10, 10)], [square(20, 20, 2)]]},
+                "properties": {
+                    "product": "sentinel-2:L1C", "cloud_fraction": 0.1, "bands": ["red", "green"],
+                    "acquired": "2017-01-01T10:00:00Z", "tile_id": 1,
+                },
+            },
+            {
+                "id": "c",
+                "geometry": None,
+                "properties": {"product": "landsat:LC08:PRE:TOAR", "tile_id": 2, "processed": True},
+            },
+        ]
+        self.table = FeatureTable.from_features(self.features)
+
+    def test_columns(self):
+        table = self.table
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.ids.tolist(), ["a", "b", "c"])
+
+        np.testing.assert_array_equal(table["cloud_fraction"], [0.5, 0.1, np.nan])
+        self.assertEqual(table["tile_id"].dtype, np.int64)
+        self.assertEqual(table["acquired"].dtype, np.dtype("datetime64[us]"))
+        self.assertEqual(table["acquired"][0], np.datetime64("2017-01-02T10:00:00.500000"))
+        self.assertTrue(np.isnat(table["acquired"][2]))
+        self.assertEqual(table["bands"].dtype, object)
+        self.assertEqual(table["processed"].tolist(), [None, None, True])
+
+        product = table["product"]
+        self.assertIsInstance(product, Categorical)
+        self.assertEqual(product.categories.tolist(), ["landsat:LC08:PRE:TOAR", "sentinel-2:L1C"])
+        self.assertEqual(product.codes.tolist(), [0, 1, 0])
+        self.assertEqual(product[1], "sentinel-2:L1C")
+
+    def test_filter(self):
+        landsat = self.table[self.table["product"] == "landsat:LC08:PRE:TOAR"]
+        self.assertEqual(landsat.ids.tolist(), ["a", "c"])
+        self.assertEqual(self.table[self.table["product"] == "other"].ids.tolist(), [])
+        self.assertEqual(self.table[self.table["product"].isin(["sentinel-2:L1C", "other"])].ids.tolist(), ["b"])
+
+        clear = self.table[self.table["cloud_fraction"] < 0.3]
+        self.assertEqual(clear.ids.tolist(), ["b"])
+        self.assertEqual(clear.geometry(0), self.features[1]["geometry"])
+
+    def test_sort(self):
+        self.assertEqual(self.table.sort("acquired").ids.tolist(), ["b", "a", "c"])
+        self.assertEqual(self.table.sort("cloud_fraction", reverse=True).ids.tolist(), ["a", "b", "c"])
+        self.assertEqual(self.table.sort("tile_id").ids.tolist(), ["b", "c", "a"])
+        self.assertEqual(self.table.sort("product", reverse=True).ids.tolist(), ["b", "a", "c"])
+
+        reordered = self.table.sort("tile_id")
+        for i, feature in enumerate(self.features[j] for j in [1, 2, 0]):
+            self.assertEqual(reordered.geometry(i), feature["geometry"])
+
+    def test_bounds(self):
+        np.testing.assert_array_equal(self.table.bounds, [[0, 0, 1, 1], [10, 10, 22, 22], [np.nan] * 4])
+        np.testing.assert_array_equal(self.table[[1]].bounds, [[10, 10, 22, 22]])
+
+    def test_to_features(self):
+        features = self.table.to_features()
+        self.assertEqual([f.id for f in features], ["a", "b", "c"])
+        self.assertEqual(features[0].geometry, self.features[0]["geometry"])
+        self.assertEqual(features[0].properties.acquired, "2017-01-02T10:00:00.5Z")
+        self.assertEqual(features[1].properties.bands, ["red", "green"])
+        self.assertEqual(features[2].properties, {"product": "landsat:LC08:PRE:TOAR", "tile_id": 2, "processed": True})
+
+    def test_to_features_round_trip(self):
+        features = [dict(feature, type="Feature") for feature in self.features]
+        self.assertEqual(self.table.to_features(), features)
+        self.assertEqual(self.table.sort("tile_id").to_features(), [features[j] for j in [1, 2, 0]])
+        self.assertEqual(self.table[self.table["cloud_fraction"] < 0.3].to_features(), features[1:2])
+
+    def test_empty(self):
+        table = FeatureTable.from_features([])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.bounds.shape, (0, 4))
+
+    def test_unsupported_geometry(self):
+        with self.assertRaises(ValueError):
+            FeatureTable.from_features([{"id": "a", "geometry": {"type": "Point", "coordinates": [0, 0]}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
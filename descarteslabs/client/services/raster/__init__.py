@@ -1,3 +1,4 @@
 from .raster import Raster
+from .cache import TileCache
 
-__all__ = ["Raster"]
+__all__ = ["Raster", "TileCache"]
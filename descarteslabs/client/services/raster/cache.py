@@ -0,0 +1,244 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from descarteslabs.client.addons import numpy as np
+
+
+class TileCache(object):
+    """
+    A size-bounded, on-disk cache of raster service responses, shared between processes
+    and sessions that use the same ``directory``.
+
+    Entries are keyed on a hash of the raster service URL, the client ID of the user,
+    and the canonical (JSON-encoded) request parameters, so users and services
+    sharing a directory never get each other's responses.
+    Arrays from `Raster.ndarray` are stored as ``.npy`` files, and returned as
+    copy-on-write memory maps of those files, so only the parts of an array that are
+    used are read from disk. Responses from `Raster.raster` are stored as-is.
+
+    When the total size of the entries exceeds ``max_size`` bytes, the least
+    recently used entries are removed. The cache is safe to use from multiple threads.
+
+    Example::
+
+        >>> from descarteslabs.client.services.raster import Raster, TileCache
+        >>> raster = Raster(cache=TileCache("~/.descarteslabs/tiles", max_size=10 * 2**30))
+        >>> arr, meta = raster.ndarray(...)  # downloaded
+        >>> arr, meta = raster.ndarray(...)  # read from disk
+        >>> raster.cache.hits, raster.cache.misses
+        (1, 1)
+    """
+
+    ARRAY_SUFFIX = ".npy"
+    METADATA_SUFFIX = ".json"
+    RASTER_SUFFIX = ".raster"
+
+    def __init__(self, directory, max_size=2**30):
+        """
+        :param str directory: Directory in which to store entries; it's created if it doesn't exist.
+        :param int max_size: Maximum total size of the entries in bytes. Default: 1 GiB.
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # key -> size in bytes, from least to most recently used
+        self._entries = collections.OrderedDict()
+        self._size = 0
+
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        self._load_index()
+
+    @staticmethod
+    def key(*parts):
+        """
+        The key of a request to the raster service: a hex digest of the canonical
+        JSON encoding of the values that identify it, such as the service URL,
+        client ID, endpoint and request parameters.
+        """
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    @property
+    def size(self):
+        "Total size of the entries in the cache, in bytes"
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_array(self, key):
+        """
+        The ``(array, metadata)`` stored for `key`, or None if it's not in the cache.
+        The array is a copy-on-write memory map of the cached ``.npy`` file.
+        """
+        if not self._touch(key):
+            return None
+
+        try:
+            with open(self._path(key, self.METADATA_SUFFIX)) as f:
+                metadata = json.load(f)
+            array = np.load(self._path(key, self.ARRAY_SUFFIX), mmap_mode="c")
+        except (IOError, OSError, ValueError):
+            # removed or replaced by another process since we indexed it
+            self._forget(key)
+            return None
+
+        return array, metadata
+
+    def put_array(self, key, array, metadata):
+        "Store `array` and its `metadata` (a JSON-serializable dict) for `key`"
+        size = self._write(key, self.ARRAY_SUFFIX, lambda f: np.save(f, array))
+        size += self._write(key, self.METADATA_SUFFIX, lambda f: f.write(json.dumps(metadata).encode("utf-8")))
+        self._add(key, size)
+
+    def get_bytes(self, key):
+        "The bytes stored for `key`, or None if it's not in the cache"
+        if not self._touch(key):
+            return None
+
+        try:
+            with open(self._path(key, self.RASTER_SUFFIX), "rb") as f:
+                return f.read()
+        except (IOError, OSError):
+            self._forget(key)
+            return None
+
+    def put_bytes(self, key, data):
+        "Store `data` (bytes) for `key`"
+        self._add(key, self._write(key, self.RASTER_SUFFIX, lambda f: f.write(data)))
+
+    def clear(self):
+        "Remove all entries, and reset the hit and miss counters"
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+        for key in keys:
+            self._remove_files(key)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _load_index(self):
+        "Index the entries already in the directory, least recently used first"
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, suffix = os.path.splitext(name)
+            if suffix not in (self.ARRAY_SUFFIX, self.METADATA_SUFFIX, self.RASTER_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            size, mtime = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+
+        for key, (size, mtime) in sorted(entries.items(), key=lambda item: item[1][1]):
+            self._entries[key] = size
+            self._size += size
+
+        self._evict()
+
+    def _touch(self, key):
+        "Mark `key` as most recently used, and count a hit or miss"
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is None:
+                self.misses += 1
+                return False
+            self._entries[key] = size
+            self.hits += 1
+
+        # so that recency survives reindexing by a new session
+        for suffix in (self.METADATA_SUFFIX, self.RASTER_SUFFIX):
+            try:
+                os.utime(self._path(key, suffix), None)
+            except OSError:
+                pass
+        return True
+
+    def _write(self, key, suffix, write):
+        """
+        Write a file for `key` with ``write(f)``, atomically replacing any existing file
+        so concurrent readers never see a partial file. Returns the size of the file.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            size = os.path.getsize(tmp_path)
+            path = self._path(key, suffix)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Windows won't rename over an existing file
+                self._remove(path)
+                os.rename(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        return size
+
+    def _add(self, key, size):
+        with self._lock:
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        self._evict()
+
+    def _forget(self, key):
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+
+    def _evict(self):
+        "Remove least recently used entries until the cache fits in ``max_size``"
+        evicted = []
+        with self._lock:
+            while self._size > self.max_size and self._entries:
+                key, size = self._entries.popitem(last=False)
+                self._size -= size
+                evicted.append(key)
+        for key in evicted:
+            self._remove_files(key)
+
+    def _remove_files(self, key):
+        for suffix in (self.ARRAY_SUFFIX, self.METADATA_SUFFIX, self.RASTER_SUFFIX):
+            self._remove(self._path(key, suffix))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -12,24 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import copy
+import functools
 import json
 import os
 import struct
 from io import BytesIO
 import logging
+import threading
 
 import six
 
 from descarteslabs.client.addons import ThirdParty, blosc, concurrent, numpy as np
 from descarteslabs.client.auth import Auth
 from descarteslabs.client.services.places import Places
+from descarteslabs.client.services.raster.cache import TileCache
 from descarteslabs.client.services.service.service import Service
 from descarteslabs.client.exceptions import ServerError
+from descarteslabs.common import dltile as dltile_grid
 from descarteslabs.common.dotdict import DotDict
 
 
 DEFAULT_MAX_WORKERS = 8
 
+# size of the reads used to copy a raster file from a response to its destination
+COPY_CHUNK_SIZE = 2**20
+
 
 def as_json_string(str_or_dict):
     if not str_or_dict:
@@ -40,25 +49,266 @@ def as_json_string(str_or_dict):
         return str_or_dict
 
 
-def read_blosc_buffer(data):
-    header = data.read(16)
-
-    _, size, _, compressed_size = struct.unpack('<IIII', header)
-    body = data.read(compressed_size - 16)
-
-    return size, header + body
+BLOSC_HEADER_SIZE = 16
+
+
+def _readinto_exactly(data, view):
+    """
+    Fill the writable buffer `view` from the file-like `data`,
+    reading as many times as needed.
+    """
+    received = 0
+    size = len(view)
+    while received < size:
+        n = data.readinto(view[received:])
+        if not n:
+            raise ServerError("Unexpected end of stream (got {}, expected {} bytes)".format(received, size))
+        received += n
+
+
+def _copy_exactly(data, dest, length, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Copy `length` bytes from the file-like `data` to the writable file-like `dest`,
+    holding at most `chunk_size` bytes in memory at a time.
+    """
+    view = memoryview(bytearray(min(length, chunk_size)))
+    remaining = length
+    while remaining > 0:
+        chunk = view[:min(remaining, len(view))]
+        _readinto_exactly(data, chunk)
+        dest.write(chunk)
+        remaining -= len(chunk)
+
+
+def _read_blosc_chunk(data, buffer):
+    """
+    Read one blosc chunk's header and body from the file-like `data` into `buffer`,
+    replacing it with a larger `bytearray` if the chunk doesn't fit.
+
+    Returns ``(raw_size, buffer, chunk)``, where ``chunk`` is a memoryview of the
+    compressed chunk within the (possibly new) ``buffer``.
+    """
+    view = memoryview(buffer)
+    _readinto_exactly(data, view[:BLOSC_HEADER_SIZE])
+    _, raw_size, _, compressed_size = struct.unpack_from('<IIII', buffer)
+
+    if compressed_size < BLOSC_HEADER_SIZE:
+        raise ServerError("Invalid blosc chunk header (compressed size {})".format(compressed_size))
+
+    if compressed_size > len(buffer):
+        header = view[:BLOSC_HEADER_SIZE].tobytes()
+        buffer = bytearray(compressed_size)
+        buffer[:BLOSC_HEADER_SIZE] = header
+        view = memoryview(buffer)
+
+    _readinto_exactly(data, view[BLOSC_HEADER_SIZE:compressed_size])
+    return raw_size, buffer, view[:compressed_size]
+
+
+def iter_blosc_chunks(metadata, data):
+    """
+    Read the blosc chunks described by `metadata` from the file-like `data`.
+
+    Each chunk's header and body are read straight into a single reusable
+    `bytearray`, which is grown only when a chunk doesn't fit. Yields
+    ``(raw_size, chunk)`` tuples, where ``chunk`` is a memoryview of the
+    compressed chunk that's only valid until the next chunk is read.
+    """
+    buffer = bytearray(BLOSC_HEADER_SIZE)
 
+    for _ in metadata['chunks']:
+        raw_size, buffer, chunk = _read_blosc_chunk(data, buffer)
+        yield raw_size, chunk
+
+
+def _decompress_blosc_chunks(metadata, data, ptr, nbytes):
+    received = 0
+
+    for raw_size, chunk in iter_blosc_chunks(metadata, data):
+        if received + raw_size > nbytes:
+            raise ServerError("Received more data than expected for array of {} bytes".format(nbytes))
+        blosc.decompress_ptr(chunk, ptr + received)
+        received += raw_size
+
+    return received
+
+
+class _ReleaseBloscGIL(object):
+    """
+    Has blosc release the GIL (and use its thread-safe context API) while any threaded
+    decompression is in progress, restoring blosc's previous setting once the last one ends.
+
+    Older releases of python-blosc, without ``set_releasegil``, always hold the GIL,
+    so chunks are still decompressed correctly, just not in parallel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._previous = None
+
+    def __enter__(self):
+        with self._lock:
+            if self._active == 0 and hasattr(blosc, "set_releasegil"):
+                self._previous = blosc.set_releasegil(True)
+            self._active += 1
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0 and self._previous is not None:
+                blosc.set_releasegil(self._previous)
+                self._previous = None
+
+
+_release_blosc_gil = _ReleaseBloscGIL()
+
+
+def _threaded_decompress_blosc_chunks(futures, metadata, data, ptr, nbytes, max_workers):
+    """
+    Read chunks from `data` on the calling thread while a pool of `max_workers` threads
+    decompresses them into disjoint offsets of the output.
+
+    At most ``2 * max_workers`` compressed chunks are held in memory at once;
+    their buffers are recycled as the decompressions complete.
+    """
+    pending = collections.deque()
+    free_buffers = []
+    received = 0
+
+    # leaving the executor's context waits for all submitted decompressions,
+    # so nothing is still writing into the output once we return or raise
+    with _release_blosc_gil, futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in metadata['chunks']:
+            if len(pending) >= 2 * max_workers:
+                future, buffer = pending.popleft()
+                future.result()
+                free_buffers.append(buffer)
+
+            buffer = free_buffers.pop() if free_buffers else bytearray(BLOSC_HEADER_SIZE)
+            raw_size, buffer, chunk = _read_blosc_chunk(data, buffer)
+            if received + raw_size > nbytes:
+                raise ServerError("Received more data than expected for array of {} bytes".format(nbytes))
+
+            pending.append((executor.submit(blosc.decompress_ptr, chunk, ptr + received), buffer))
+            received += raw_size
+
+        for future, _ in pending:
+            future.result()
+
+    return received
+
+
+def _assign_flat(dest, start, values):
+    """
+    Assign the 1-D `values` to the elements of `dest` (which may be any strided view)
+    from position `start` onwards, in C order, with a few slice assignments.
+    """
+    if len(values) == 0:
+        return
+    if dest.ndim == 1:
+        dest[start:start + len(values)] = values
+        return
+
+    inner = int(np.prod(dest.shape[1:]))
+    i, offset = divmod(start, inner)
+    done = 0
+    if offset:
+        # the rest of a partly-filled leading sub-array
+        done = min(inner - offset, len(values))
+        _assign_flat(dest[i], offset, values[:done])
+        i += 1
+
+    whole = (len(values) - done) // inner
+    if whole:
+        dest[i:i + whole] = values[done:done + whole * inner].reshape((whole,) + dest.shape[1:])
+        done += whole * inner
+        i += whole
+
+    if done < len(values):
+        _assign_flat(dest[i], 0, values[done:])
+
+
+def _scatter_blosc_chunks(metadata, data, output, dtype):
+    """
+    Decompress each chunk into a small scratch buffer, and copy its elements of `dtype`
+    into their places in `output`, which may be strided or of a different dtype.
+    A chunk may end partway through an element, so leftover bytes carry over to the next.
+    """
+    nbytes = output.size * dtype.itemsize
+    scratch = np.empty(0, dtype=np.uint8)
+    carry = 0
+    received = 0
+
+    for raw_size, chunk in iter_blosc_chunks(metadata, data):
+        if received + raw_size > nbytes:
+            raise ServerError("Received more data than expected for array of {} bytes".format(nbytes))
+        if carry + raw_size > len(scratch):
+            grown = np.empty(carry + raw_size, dtype=np.uint8)
+            grown[:carry] = scratch[:carry]
+            scratch = grown
+
+        blosc.decompress_ptr(chunk, scratch.__array_interface__['data'][0] + carry)
+        available = carry + raw_size
+        complete = available - available % dtype.itemsize
+        _assign_flat(output, (received - carry) // dtype.itemsize, scratch[:complete].view(dtype))
+
+        carry = available - complete
+        scratch[:carry] = scratch[complete:available].copy()
+        received += raw_size
+
+    return received
+
+
+def read_blosc_array(metadata, data, max_workers=None, out=None):
+    """
+    Decode the blosc chunks described by `metadata` from the file-like `data`
+    into a new ndarray, or into `out` if given.
+
+    If `max_workers` is greater than 1, chunks are decompressed by a pool of that
+    many threads while the following chunks are still being read from `data`.
+
+    `out` must be a writeable array (or view) with the shape given in `metadata`.
+    If it's C-contiguous with the dtype given in `metadata`, chunks are decompressed
+    straight into it; otherwise (such as for a transposed view) each chunk is
+    decompressed into a buffer the size of a chunk and copied into place, serially.
+    """
+    shape = tuple(metadata['shape'])
+    dtype = np.dtype(metadata['dtype'])
+
+    if out is None:
+        output = np.empty(shape, dtype=dtype)
+    else:
+        if out.shape != shape:
+            raise ValueError("`out` must have shape {}, not {}".format(shape, out.shape))
+        if not out.flags.writeable:
+            raise ValueError("`out` must be writeable")
+        output = out
+
+    if not output.flags.c_contiguous or output.dtype != dtype:
+        bytes_received = _scatter_blosc_chunks(metadata, data, output, dtype)
+        if bytes_received != output.size * dtype.itemsize:
+            raise ServerError("Did not receive complete array (got {}, expected {})".format(
+                bytes_received, output.size * dtype.itemsize))
+        return output
 
-def read_blosc_array(metadata, data):
-    output = np.empty(metadata['shape'], dtype=np.dtype(metadata['dtype']))
     ptr = output.__array_interface__['data'][0]
 
-    for _ in metadata['chunks']:
-        raw_size, buffer = read_blosc_buffer(data)
-        blosc.decompress_ptr(buffer, ptr)
-        ptr += raw_size
+    bytes_received = None
+    if max_workers is not None and max_workers > 1:
+        try:
+            futures = concurrent.futures
+        except ImportError:
+            logging.warning(
+                "Failed to import concurrent.futures. Decompression will be serial"
+            )
+        else:
+            bytes_received = _threaded_decompress_blosc_chunks(
+                futures, metadata, data, ptr, output.nbytes, max_workers
+            )
 
-    bytes_received = ptr - output.__array_interface__['data'][0]
+    if bytes_received is None:
+        bytes_received = _decompress_blosc_chunks(metadata, data, ptr, output.nbytes)
 
     if bytes_received != output.nbytes:
         raise ServerError("Did not receive complete array (got {}, expected {})".format(
@@ -68,23 +318,135 @@ def read_blosc_array(metadata, data):
 
 
 def read_blosc_string(metadata, data):
-    output = b''
+    output = bytearray()
 
-    for _ in metadata['chunks']:
-        _, buffer = read_blosc_buffer(data)
-        output += blosc.decompress(buffer)
+    for _, chunk in iter_blosc_chunks(metadata, data):
+        output += blosc.decompress(chunk)
 
-    return output
+    return bytes(output)
+
+
+def _gdal_order_out(out, shape, dtype, order):
+    """
+    Resolve the `out` argument of `Raster.ndarray` for a result of the given (band, row, column)
+    `shape` and `dtype`, returning a view of it in that order.
+    """
+    shape = tuple(shape)
+    image_order = len(shape) > 2 and order == 'image'
+    out_shape = shape[1:] + shape[:1] if image_order else shape
+
+    if callable(out):
+        out = out(out_shape, np.dtype(dtype))
+
+    if out.shape != out_shape:
+        raise ValueError("`out` must have shape {}, not {}".format(out_shape, out.shape))
+
+    return out.transpose((2, 0, 1)) if image_order else out
+
+
+class _InFlightRequest(object):
+    "The eventual result of a request to the raster service, shared by identical concurrent calls"
+
+    def __init__(self):
+        self.waiters = 0
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def set_result(self, result):
+        self._result = result
+        self._done.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._done.set()
+
+    def result(self):
+        self._done.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+def _copy_to_out(out, array, order):
+    "Copy a ``(band, row, column)`` array into `out`, returning the band-first view of `out`"
+    target = _gdal_order_out(out, array.shape, array.dtype, order)
+    target[...] = array
+    return target
+
+
+class StackAllocator(object):
+    """
+    Allocates the array for a stack of `length` rasters once the shape and
+    dtype of the first one is known, and hands out views of each level in it.
+
+    The stack is a C-contiguous array with the bands along `bands_axis` of each level
+    (0 or -1 for the usual "gdal" and "image" orders). Every level is decoded into
+    directly: with the bands along axis 0, chunks are decompressed straight into it,
+    otherwise each chunk is decompressed into a small buffer and copied into place.
+    Levels which are 2-D (a single band) are given a band axis of length 1 in the stack.
+
+    If `filename` is given, the stack is allocated as a memory-mapped ``.npy``
+    file at that path, so it can be reopened later with ``np.load(filename, mmap_mode="r")``.
+    """
+
+    def __init__(self, length, bands_axis=0, filename=None):
+        if not (-3 <= bands_axis < 3):
+            raise ValueError("Invalid bands_axis; axis {} would not exist in a 3D array".format(bands_axis))
+        self.length = length
+        self.bands_axis = bands_axis % 3
+        self.filename = filename
+        self.stack = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def empty(shape, dtype, filename=None):
+        "A new array, memory-mapped to a new ``.npy`` file if `filename` is given"
+        if filename is None:
+            return np.empty(shape, dtype=dtype)
+        else:
+            return np.lib.format.open_memmap(filename, mode="w+", dtype=dtype, shape=shape)
+
+    def out(self, i):
+        "A callable for the ``out`` parameter of `Raster.ndarray`, allocating level `i` of the stack"
+        return functools.partial(self.level, i)
+
+    def level(self, i, shape, dtype):
+        "Return a view of level `i` of the stack, allocating the stack if needed"
+        shape = tuple(shape)
+        if len(shape) == 2:
+            level_shape = shape[:self.bands_axis] + (1,) + shape[self.bands_axis:]
+        else:
+            level_shape = shape
+
+        with self._lock:
+            if self.stack is None:
+                self.stack = self.empty((self.length,) + level_shape, dtype, self.filename)
+            elif self.stack.shape[1:] != level_shape:
+                raise ValueError("Shape {} of a raster in the stack differs from shape {} of the others".format(
+                    level_shape, self.stack.shape[1:]))
+
+        level = self.stack[i]
+        if len(shape) == 2:
+            level = np.moveaxis(level, self.bands_axis, 0)[0]
+        return level
 
 
 class Raster(Service):
     """Raster"""
     TIMEOUT = (9.5, 300)
 
-    def __init__(self, url=None, auth=None):
+    def __init__(self, url=None, auth=None, cache=None):
         """The parent Service class implements authentication and exponential
         backoff/retry. Override the url parameter to use a different instance
         of the backing service.
+
+        Pass a :class:`TileCache <descarteslabs.client.services.raster.TileCache>` as
+        `cache` to store the results of `ndarray` and `raster` calls on disk, and reuse
+        them for identical calls instead of requesting them again.
+
+        Identical `ndarray` calls made concurrently from different threads share
+        a single request to the raster service, and each gets a copy of the result.
         """
         if auth is None:
             auth = Auth()
@@ -93,6 +455,11 @@ class Raster(Service):
             url = os.environ.get("DESCARTESLABS_RASTER_URL", "https://platform.descarteslabs.com/raster/v1")
 
         super(Raster, self).__init__(url, auth=auth)
+        self.cache = cache
+
+        # identical ndarray requests in progress, so concurrent calls can share one response
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
 
     def dltiles_from_shape(self, resolution, tilesize, pad, shape):
         """
@@ -161,7 +528,7 @@ class Raster(Service):
         r = self.session.post('/dlkeys/from_shape', json=params)
         return DotDict(r.json())
 
-    def dltile_from_latlon(self, lat, lon, resolution, tilesize, pad):
+    def dltile_from_latlon(self, lat, lon, resolution, tilesize, pad, local=False):
         """
         Return a DLTile GeoJSON Feature that covers a latitude/longitude
 
@@ -170,6 +537,8 @@ class Raster(Service):
         :param float resolution: Resolution of DLTile
         :param int tilesize: Number of valid pixels per DLTile
         :param int pad: Number of ghost pixels per DLTile (overlap among tiles)
+        :param bool local: If True, compute the DLTile locally instead of requesting it
+            from the raster service. Requires numpy.
 
         :return: A DLTile GeoJSON Feature
 
@@ -213,6 +582,9 @@ class Raster(Service):
               'type': 'Feature'
             }
         """
+        if local:
+            return DotDict(dltile_grid.dltile_from_latlon(lat, lon, resolution, tilesize, pad))
+
         params = {
             'resolution': resolution,
             'tilesize': tilesize,
@@ -223,11 +595,13 @@ class Raster(Service):
 
         return DotDict(r.json())
 
-    def dltile(self, key):
+    def dltile(self, key, local=False):
         """
         Given a DLTile key, return a DLTile GeoJSON Feature
 
         :param str key: A DLTile key that identifies a DLTile
+        :param bool local: If True, compute the DLTile locally instead of requesting it
+            from the raster service. Requires numpy.
 
         :return: A DLTile GeoJSON Feature
 
@@ -275,6 +649,9 @@ class Raster(Service):
         if not key:
             raise ValueError('Invalid key')
 
+        if local:
+            return DotDict(dltile_grid.dltile_from_key(key))
+
         r = self.session.get('/dlkeys/%s' % key)
 
         return DotDict(r.json())
@@ -299,6 +676,7 @@ class Raster(Service):
             processing_level=None,
             save=False,
             outfile_basename=None,
+            dest=None,
             **pass_through_params
     ):
         """Given a list of :class:`Metadata <descarteslabs.services.Metadata>` identifiers,
@@ -351,11 +729,15 @@ class Raster(Service):
         :param bool save: Write resulting files to disk. Default: False
         :param str outfile_basename: If 'save' is True, override default filename using
             this string as a base.
+        :param dest: Path, or writable file-like object, to which to write the file as
+            it's received, in chunks, instead of holding the whole file in memory. Use this
+            for outputs larger than memory. `save` is ignored when `dest` is given.
 
         :return: A dictionary with two keys, ``files`` and ``metadata``. The value for
             ``files`` is a dictionary mapping file names to binary data for files (at the
             moment there will always be only a single file with the appropriate file
-            extension based on the ``output_format`` requested). The value for ``metadata``
+            extension based on the ``output_format`` requested), or to `dest` if it was given.
+            The value for ``metadata``
             is a dictionary containing details about the raster operation that happened.
             These details can be useful for debugging but shouldn't otherwise be relied on
             (there are no guarantees that certain keys will be present).
@@ -392,20 +774,31 @@ class Raster(Service):
             else:
                 params['dltile'] = dltile
 
-        r = self.session.post('/raster', json=params)
-
-        raw = BytesIO(r.content)
+        if dest is not None:
+            # the response is never held in memory, so it isn't cached either
+            raw = self.session.post('/raster', json=params, stream=True).raw
+        elif self.cache is not None:
+            cache_key = self._cache_key('/raster', params)
+            content = self.cache.get_bytes(cache_key)
+            if content is None:
+                content = self.session.post('/raster', json=params).content
+                self.cache.put_bytes(cache_key, content)
+            raw = BytesIO(content)
+        else:
+            raw = BytesIO(self.session.post('/raster', json=params).content)
 
         json_resp = json.loads(raw.readline().decode('utf-8').strip())
 
         num_files = json_resp['files']
         json_resp['files'] = {}
 
+        if dest is not None and num_files != 1:
+            raise ServerError("Expected a single file to write to {}, but the response has {}".format(dest, num_files))
+
         for _ in range(num_files):
             file_meta = json.loads(raw.readline().decode('utf-8').strip())
 
             fn = file_meta['name']
-            data = raw.read(file_meta['length'])
 
             if outfile_basename:
                 outfilename = "{}.{}".format(
@@ -415,9 +808,17 @@ class Raster(Service):
             else:
                 outfilename = fn
 
-            json_resp['files'][outfilename] = data
+            if dest is None:
+                json_resp['files'][outfilename] = raw.read(file_meta['length'])
+            elif isinstance(dest, six.string_types) or (hasattr(os, "PathLike") and isinstance(dest, os.PathLike)):
+                with open(dest, "wb") as f:
+                    _copy_exactly(raw, f, file_meta['length'])
+                json_resp['files'][outfilename] = dest
+            else:
+                _copy_exactly(raw, dest, file_meta['length'])
+                json_resp['files'][outfilename] = dest
 
-        if save:
+        if save and dest is None:
             for filename, data in six.iteritems(json_resp['files']):
                 with open(filename, "wb") as f:
                     f.write(data)
@@ -442,6 +843,8 @@ class Raster(Service):
             order='image',
             dltile=None,
             processing_level=None,
+            decompress_workers=None,
+            out=None,
             **pass_through_params
     ):
         """Retrieve a raster as a NumPy array.
@@ -491,9 +894,23 @@ class Raster(Service):
             should be adjusted, one of ``toa`` (top of atmosphere) and ``surface``. For
             products that support it, ``surface`` applies Descartes Labs' general surface
             reflectance algorithm to the output.
+        :param int decompress_workers: Number of threads with which to decompress the
+            array as it's received. Chunks are decompressed in parallel while further
+            chunks are read from the network. If `None` (default) or 1, chunks are decompressed
+            one at a time on the calling thread. Only used when the blosc package is installed.
+            While chunks are decompressed in parallel, blosc is set to release the GIL
+            (see ``blosc.set_releasegil``), and its previous setting is restored afterwards.
+        :param out: Array into which to write the result, such as a slice of a larger
+            array or a ``np.memmap``. It must have the same shape as the returned array would
+            (taking ``order`` into account). When its memory layout matches the ``(band, row, column)``
+            order in which data is received (as it does for a C-contiguous array with ``order='gdal'``),
+            data is decompressed straight into it. Otherwise each chunk is decompressed into a small
+            buffer and copied into place, serially, so the whole array is still never held twice.
+            May also be a callable ``out(shape, dtype)`` that returns such an array, which is called
+            once the shape and dtype of the result are known.
 
         :return: A tuple of ``(np_array, metadata)``. The first element (``np_array``) is
-            the rastered scene as a NumPy array. The second element (``metadata``) is a
+            the rastered scene as a NumPy array (a view of ``out``, if given). The second element (``metadata``) is a
             dictionary containing details about the raster operation that happened. These
             details can be useful for debugging but shouldn't otherwise be relied on (there
             are no guarantees that certain keys will be present).
@@ -528,34 +945,107 @@ class Raster(Service):
             else:
                 params['dltile'] = dltile
 
-        can_blosc = not isinstance(blosc, ThirdParty)
+        if self.cache is not None:
+            # the output format only affects the encoding of the same array, so it's not part of the key
+            cache_key = self._cache_key('/npz', params)
+            cached = self.cache.get_array(cache_key)
+            if cached is None:
+                array, metadata = self._coalesced_npz(params, order, decompress_workers, out)
+            else:
+                array, metadata = cached
+                if out is not None:
+                    array = _copy_to_out(out, array, order)
+        else:
+            array, metadata = self._coalesced_npz(params, order, decompress_workers, out)
 
-        if can_blosc:
-            params['of'] = 'blosc'
+        if len(array.shape) > 2:
+            if order == 'image':
+                return array.transpose((1, 2, 0)), metadata
+            elif order == 'gdal':
+                return array, metadata
+        else:
+            return array, DotDict(metadata)
+
+    def _cache_key(self, endpoint, params):
+        "The key of a request to `endpoint`, specific to this service URL and user"
+        return TileCache.key(self.base_url, getattr(self.auth, 'client_id', None), endpoint, params)
+
+    def _coalesced_npz(self, params, order, decompress_workers, out):
+        """
+        Like `_npz`, but if an identical request is already in progress on another thread,
+        wait for its response instead of making another request.
+        Each caller gets its own copy of the array.
+        Only the caller that makes the request stores its response in the cache, if any.
+        """
+        key = self._cache_key('/npz', params)
+        with self._in_flight_lock:
+            request = self._in_flight.get(key)
+            leader = request is None
+            if leader:
+                request = self._in_flight[key] = _InFlightRequest()
+            else:
+                request.waiters += 1
+
+        if leader:
+            try:
+                try:
+                    array, metadata = self._npz(params, order, decompress_workers, out)
+                    if self.cache is not None:
+                        # before leaving `_in_flight`, so later callers either wait or hit the cache
+                        self.cache.put_array(key, array, metadata)
+                finally:
+                    with self._in_flight_lock:
+                        del self._in_flight[key]
+                        waiters = request.waiters
+                # the leader's array may be `out`, which its caller is free to modify,
+                # so the waiters share a snapshot of it
+                request.set_result((array.copy(), metadata) if waiters else None)
+            except BaseException as e:
+                # including interrupts and timeouts, so the waiters never wait forever
+                request.set_exception(e)
+                raise
+            return array, metadata
+
+        array, metadata = request.result()
+        if out is None:
+            array = array.copy()
         else:
-            params['of'] = 'npz'
+            array = _copy_to_out(out, array, order)
+        return array, copy.deepcopy(metadata)
+
+    def _npz(self, params, order, decompress_workers, out):
+        """
+        Request an array from the ``/npz`` endpoint, returning ``(array, metadata)``
+        with the array in ``(band, row, column)`` order.
+        """
+        can_blosc = not isinstance(blosc, ThirdParty)
+
+        params = dict(params, of='blosc' if can_blosc else 'npz')
 
         r = self.session.post('/npz', json=params, stream=True)
 
         if can_blosc:
             metadata = json.loads(r.raw.readline().decode('utf-8').strip())
             array_meta = json.loads(r.raw.readline().decode('utf-8').strip())
-            array = read_blosc_array(array_meta, r.raw)
+            if out is None:
+                array = read_blosc_array(array_meta, r.raw, max_workers=decompress_workers)
+            else:
+                array = _gdal_order_out(out, array_meta['shape'], array_meta['dtype'], order)
+                read_blosc_array(array_meta, r.raw, max_workers=decompress_workers, out=array)
         else:
             npz = np.load(BytesIO(r.content))
             array = npz['data']
             metadata = json.loads(npz['metadata'].tostring().decode('utf-8'))
+            if out is not None:
+                array = _copy_to_out(out, array, order)
 
-        if len(array.shape) > 2:
-            if order == 'image':
-                return array.transpose((1, 2, 0)), metadata
-            elif order == 'gdal':
-                return array, metadata
-        else:
-            return array, DotDict(metadata)
+        return array, metadata
 
     def _serial_ndarray(self, id_groups, *args, **kwargs):
+        outs = kwargs.pop("outs", None)
         for i, id_group in enumerate(id_groups):
+            if outs is not None:
+                kwargs["out"] = outs[i]
             arr, meta = self.ndarray(id_group, *args, **kwargs)
             yield i, arr, meta
 
@@ -563,6 +1053,9 @@ class Raster(Service):
         """
         Thread ndarray calls by id group, keeping the same `args` and
         `kwargs` for each raster.ndarray call.
+
+        If given, `outs` is a sequence of the ``out`` argument to use
+        for each id group.
         """
         max_workers = kwargs.pop(
             "max_workers",
@@ -579,9 +1072,12 @@ class Raster(Service):
                 yield i, arr, meta
             return
 
+        outs = kwargs.pop("outs", None)
         with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_ndarrays = {}
             for i, id_group in enumerate(id_groups):
+                if outs is not None:
+                    kwargs["out"] = outs[i]
                 future_ndarrays[executor.submit(
                     self.ndarray, id_group, *args, **kwargs)
                 ] = i
@@ -591,6 +1087,82 @@ class Raster(Service):
                 arr, meta = future.result()
                 yield i, arr, meta
 
+    def iter_stack(self, inputs, window=None, max_workers=None, **ndarray_params):
+        """Retrieve rasters one at a time, in order, while downloading the next ones in the background.
+
+        Unlike :meth:`stack`, which returns once every raster has been retrieved, this
+        yields each raster as soon as it (and every raster before it) is ready, so you can
+        process one raster while the following ones download. At most ``window``
+        rasters are requested ahead of the one being processed, so memory use
+        is proportional to ``window``, not to the number of inputs.
+
+        :param inputs: List, or list of lists, of :class:`Metadata` identifiers.
+            Each element in the list is treated as a separate input to ``raster.ndarray``,
+            so if a list of lists is given, each sublist's identifiers will be mosaiced together.
+        :param int window: Number of rasters to download ahead of the one most recently yielded.
+            If `None`, will be set to ``max_workers``.
+        :param int max_workers: Maximum number of threads over which to
+            parallelize individual ndarray calls. If `None`, will be set to the minimum
+            of the number of inputs and `DEFAULT_MAX_WORKERS`.
+        :param ndarray_params: Any other parameters to :meth:`ndarray`, such as ``bands``,
+            ``resolution``, ``srs``, ``bounds``, ``dltile`` and ``order``, used for every raster.
+
+        :return: An iterator of ``(index, ndarray, metadata)`` tuples, in the same order
+            as ``inputs``, where ``index`` is the position of the raster's identifiers in ``inputs``.
+        """
+        # validate here, rather than in the generator, so invalid arguments raise
+        # when iter_stack is called, not when the first raster is requested
+        if not isinstance(inputs, (list, tuple)):
+            raise TypeError("Inputs must be a list or tuple, instead got '{}'".format(type(inputs)))
+
+        if len(inputs) == 0:
+            return iter(())
+
+        if max_workers is None:
+            max_workers = min(len(inputs), DEFAULT_MAX_WORKERS)
+        if window is None:
+            window = max_workers
+        if window < 1:
+            raise ValueError("window must be at least 1, not {}".format(window))
+
+        return self._iter_stack(inputs, window, max_workers, ndarray_params)
+
+    def _iter_stack(self, inputs, window, max_workers, ndarray_params):
+        "Generator of the results of `iter_stack`, given valid arguments"
+        try:
+            futures = concurrent.futures
+        except ImportError:
+            logging.warning(
+                "Failed to import concurrent.futures. ndarray calls will be serial"
+            )
+            for i, arr, meta in self._serial_ndarray(inputs, **ndarray_params):
+                yield i, arr, meta
+            return
+
+        pending = collections.deque()
+        remaining = iter(enumerate(inputs))
+        with futures.ThreadPoolExecutor(max_workers=min(max_workers, window)) as executor:
+            def submit_next():
+                item = next(remaining, None)
+                if item is not None:
+                    i, id_group = item
+                    pending.append((i, executor.submit(self.ndarray, id_group, **ndarray_params)))
+
+            try:
+                for _ in range(window):
+                    submit_next()
+
+                while pending:
+                    i, future = pending.popleft()
+                    arr, meta = future.result()
+                    # keep the window full while the caller works on this raster
+                    submit_next()
+                    yield i, arr, meta
+            finally:
+                # if the caller stopped early, don't wait for rasters it won't use
+                for _, future in pending:
+                    future.cancel()
+
     def stack(
             self,
             inputs,
@@ -610,6 +1182,7 @@ class Raster(Service):
             dltile=None,
             processing_level=None,
             max_workers=None,
+            out_file=None,
             **pass_through_params
     ):
         """Retrieve a stack of rasters as a 4-D NumPy array.
@@ -672,6 +1245,10 @@ class Raster(Service):
         :param int max_workers: Maximum number of threads over which to
             parallelize individual ndarray calls. If `None`, will be set to the minimum
             of the number of inputs and `DEFAULT_MAX_WORKERS`.
+        :param str out_file: Path of a ``.npy`` file in which to build the stack, as a
+            memory-mapped array, instead of in memory. Each raster is written into the file
+            as it's received, so stacks larger than memory can be built. The stack can be
+            reopened later with ``np.load(out_file, mmap_mode="r")``.
 
         :return: A tuple of ``(stack, metadata)``.
 
@@ -714,20 +1291,26 @@ class Raster(Service):
             if bounds is None:
                 raise ValueError("Must set `bounds`")
 
-        full_stack = None
+        if len(inputs) == 0:
+            # there's no raster to take the shape and dtype of the stack from
+            return None, []
+
+        if order == "image":
+            bands_axis = -1
+        elif order == "gdal":
+            bands_axis = 0
+        else:
+            raise ValueError("Unknown order '{}'; should be one of 'image' or 'gdal'".format(order))
+
+        # each raster is decoded directly into its level of the stack
+        allocator = StackAllocator(len(inputs), bands_axis=bands_axis, filename=out_file)
+        outs = [allocator.out(i) for i in range(len(inputs))]
+
         metadata = [None] * len(inputs)
-        for i, arr, meta in self._threaded_ndarray(inputs, **params):
-            if len(arr.shape) == 2:
-                if order == "image":
-                    arr = np.expand_dims(arr, -1)
-                elif order == "gdal":
-                    arr = np.expand_dims(arr, 0)
-                else:
-                    raise ValueError("Unknown order '{}'; should be one of 'image' or 'gdal'".format(order))
-            if full_stack is None:
-                stack_shape = (len(inputs),) + arr.shape
-                full_stack = np.empty(stack_shape, dtype=arr.dtype)
-            full_stack[i] = arr
+        for i, arr, meta in self._threaded_ndarray(inputs, outs=outs, **params):
             metadata[i] = meta
 
-        return full_stack, metadata
+        if out_file is not None:
+            allocator.stack.flush()
+
+        return allocator.stack, metadata
@@ -0,0 +1,72 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark for decoding a blosc stream, as returned by ``Raster.ndarray``.
+
+Compares `read_blosc_array` against the previous implementation, which
+allocated a new ``bytes`` object per read and concatenated each chunk's header and body,
+and against decompressing with a pool of worker threads.
+Runs offline against a synthetic stream::
+
+    python -m descarteslabs.client.services.raster.tests.bench_blosc
+"""
+
+from __future__ import print_function
+
+import struct
+import timeit
+from functools import partial
+from io import BytesIO
+
+from descarteslabs.client.addons import blosc, numpy as np
+from descarteslabs.client.services.raster.raster import read_blosc_array
+from descarteslabs.client.services.raster.tests.test_blosc import blosc_stream
+
+
+def read_blosc_array_concat(metadata, data):
+    "The previous implementation of `read_blosc_array`, for comparison"
+    output = np.empty(metadata['shape'], dtype=np.dtype(metadata['dtype']))
+    ptr = output.__array_interface__['data'][0]
+
+    for _ in metadata['chunks']:
+        header = data.read(16)
+        _, size, _, compressed_size = struct.unpack('<IIII', header)
+        body = data.read(compressed_size - 16)
+        blosc.decompress_ptr(header + body, ptr)
+        ptr += size
+
+    return output
+
+
+def main(shape=(4, 2048, 2048), chunk_bytes=2**20, repeat=5):
+    array = np.random.randint(0, 1000, shape).astype(np.float32)
+    metadata, data = blosc_stream(array, chunk_bytes)
+
+    print("{} float32 array, {:.1f} MB raw, {:.1f} MB compressed, {} chunks".format(
+        shape, array.nbytes / 1e6, len(data) / 1e6, len(metadata['chunks'])))
+
+    readers = [
+        ("concatenating", read_blosc_array_concat),
+        ("streaming", read_blosc_array),
+        ("4 workers", partial(read_blosc_array, max_workers=4)),
+        ("8 workers", partial(read_blosc_array, max_workers=8)),
+    ]
+    for name, reader in readers:
+        best = min(timeit.repeat(lambda: reader(metadata, BytesIO(data)), number=1, repeat=repeat))
+        print("{:>14}: {:.1f} ms".format(name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
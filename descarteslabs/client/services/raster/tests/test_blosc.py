@@ -0,0 +1,379 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+import responses
+import mock
+from mock import patch
+
+from descarteslabs.client.addons import ThirdParty, blosc, numpy as np
+from descarteslabs.client.auth import Auth
+from descarteslabs.client.exceptions import ServerError
+from descarteslabs.client.services.raster import Raster
+from descarteslabs.client.services.raster.raster import iter_blosc_chunks, read_blosc_array, read_blosc_string
+
+
+def blosc_stream(array, chunk_bytes):
+    """
+    Encode `array` the way the raster service does for ``of=blosc``:
+    a sequence of independently compressed blosc chunks.
+    """
+    raw = array.tobytes()
+    chunks = [
+        blosc.compress(raw[i:i + chunk_bytes], typesize=array.dtype.itemsize)
+        for i in range(0, len(raw), chunk_bytes)
+    ]
+    metadata = {
+        'shape': array.shape,
+        'dtype': array.dtype.str,
+        'chunks': [len(chunk) for chunk in chunks],
+    }
+    return metadata, b''.join(chunks)
+
+
+def blosc_response(array, metadata=None, chunk_bytes=1000):
+    "The body of a response from the raster service's ``/npz`` endpoint for ``of=blosc``"
+    array_meta, data = blosc_stream(array, chunk_bytes)
+    return b"\n".join([
+        json.dumps(metadata or {}).encode("utf-8"),
+        json.dumps(array_meta).encode("utf-8"),
+        data,
+    ])
+
+
+class ChunkedReader(BytesIO):
+    "A file-like object that returns at most `max_read` bytes per read, like a socket"
+
+    def __init__(self, data, max_read):
+        super(ChunkedReader, self).__init__(data)
+        self.max_read = max_read
+
+    def readinto(self, b):
+        view = memoryview(b)[:self.max_read]
+        return super(ChunkedReader, self).readinto(view)
+
+
+@unittest.skipIf(isinstance(blosc, ThirdParty), "blosc is not installed")
+class TestReadBlosc(unittest.TestCase):
+
+    def test_read_blosc_array(self):
+        array = np.random.rand(3, 100, 120).astype(np.float32)
+        metadata, data = blosc_stream(array, 4096)
+
+        result = read_blosc_array(metadata, BytesIO(data))
+
+        self.assertEqual(result.dtype, array.dtype)
+        np.testing.assert_array_equal(result, array)
+
+    def test_read_blosc_array_varying_chunk_sizes(self):
+        # random data doesn't compress, so later chunks need a larger buffer than the first
+        array = np.concatenate([
+            np.zeros(5000, dtype=np.uint16),
+            np.random.randint(0, 2**16, 5000).astype(np.uint16),
+        ])
+        metadata, data = blosc_stream(array, 2000)
+
+        np.testing.assert_array_equal(read_blosc_array(metadata, BytesIO(data)), array)
+
+    def test_iter_blosc_chunks_growing_buffer(self):
+        # each chunk is larger than the last, so the buffer is replaced for every one,
+        # and each chunk's header must be carried over into the new buffer intact
+        raw = np.random.rand(1000).astype(np.float64).tobytes()
+        chunks = [blosc.compress(raw[:n], typesize=8) for n in (100, 800, 4000, 8000)]
+        metadata = {'chunks': [len(chunk) for chunk in chunks]}
+
+        received = [
+            (raw_size, chunk.tobytes())
+            for raw_size, chunk in iter_blosc_chunks(metadata, BytesIO(b''.join(chunks)))
+        ]
+        self.assertEqual(received, [(n, chunk) for n, chunk in zip((100, 800, 4000, 8000), chunks)])
+        for n, (_, chunk) in zip((100, 800, 4000, 8000), received):
+            self.assertEqual(blosc.decompress(chunk), raw[:n])
+
+    def test_read_blosc_array_short_reads(self):
+        array = np.arange(10000, dtype=np.int32).reshape(100, 100)
+        metadata, data = blosc_stream(array, 1000)
+
+        result = read_blosc_array(metadata, ChunkedReader(data, 7))
+
+        np.testing.assert_array_equal(result, array)
+
+    def test_read_blosc_array_truncated(self):
+        array = np.arange(10000, dtype=np.int32)
+        metadata, data = blosc_stream(array, 1000)
+
+        with self.assertRaises(ServerError):
+            read_blosc_array(metadata, BytesIO(data[:-10]))
+
+    def test_read_blosc_array_too_much_data(self):
+        array = np.arange(10000, dtype=np.int32)
+        metadata, data = blosc_stream(array, 1000)
+        metadata['shape'] = (5000,)
+
+        with self.assertRaises(ServerError):
+            read_blosc_array(metadata, BytesIO(data))
+
+    def test_read_blosc_array_threaded(self):
+        array = np.random.rand(4, 200, 200).astype(np.float64)
+        metadata, data = blosc_stream(array, 8192)
+
+        result = read_blosc_array(metadata, ChunkedReader(data, 1000), max_workers=4)
+
+        np.testing.assert_array_equal(result, array)
+
+    def test_read_blosc_array_threaded_releasegil(self):
+        array = np.arange(10000, dtype=np.int32)
+        metadata, data = blosc_stream(array, 1000)
+
+        previous = blosc.set_releasegil(False)
+        try:
+            read_blosc_array(metadata, BytesIO(data), max_workers=4)
+            # blosc's setting is restored for its other users
+            self.assertFalse(blosc.set_releasegil(False))
+        finally:
+            blosc.set_releasegil(previous)
+
+    def test_read_blosc_array_threaded_no_releasegil(self):
+        array = np.arange(10000, dtype=np.int32)
+        metadata, data = blosc_stream(array, 1000)
+
+        # older releases of python-blosc
+        old_blosc = mock.Mock(wraps=blosc, spec=["decompress_ptr"])
+        with patch("descarteslabs.client.services.raster.raster.blosc", old_blosc):
+            result = read_blosc_array(metadata, BytesIO(data), max_workers=4)
+        np.testing.assert_array_equal(result, array)
+
+    def test_read_blosc_array_threaded_truncated(self):
+        array = np.arange(100000, dtype=np.int32)
+        metadata, data = blosc_stream(array, 1000)
+
+        with self.assertRaises(ServerError):
+            read_blosc_array(metadata, BytesIO(data[:-10]), max_workers=4)
+
+    def test_read_blosc_array_strided_out(self):
+        array = np.arange(3 * 40 * 50, dtype=np.uint16).reshape(3, 40, 50)
+        # chunks of an odd number of bytes end partway through elements
+        metadata, data = blosc_stream(array, 999)
+
+        image = np.zeros((40, 50, 3), dtype=np.uint16)
+        result = read_blosc_array(metadata, ChunkedReader(data, 100), out=image.transpose((2, 0, 1)))
+        self.assertTrue(np.may_share_memory(result, image))
+        np.testing.assert_array_equal(image, array.transpose((1, 2, 0)))
+
+        as_float = np.zeros(array.shape, dtype=np.float32)
+        read_blosc_array(metadata, BytesIO(data), out=as_float)
+        np.testing.assert_array_equal(as_float, array)
+
+        with self.assertRaises(ServerError):
+            read_blosc_array(metadata, BytesIO(data[:-10]), out=image.transpose((2, 0, 1)))
+
+    def test_read_blosc_string(self):
+        array = np.arange(1000, dtype=np.uint8)
+        metadata, data = blosc_stream(array, 100)
+
+        self.assertEqual(read_blosc_string(metadata, BytesIO(data)), array.tobytes())
+
+
+@unittest.skipIf(isinstance(blosc, ThirdParty), "blosc is not installed")
+@patch.object(Auth, 'token', 'token')
+class TestNdarrayOut(unittest.TestCase):
+    url = "https://example.com/raster/v1"
+
+    def setUp(self):
+        self.raster = Raster(url=self.url)
+        # a (band, row, column) array, as sent by the raster service, per input id
+        self.arrays = {
+            "scene{}".format(i): np.random.randint(0, 1000, (3, 20, 30)).astype(np.uint16)
+            for i in range(4)
+        }
+
+    def add_npz_callback(self, rsps):
+        def callback(request):
+            inputs = json.loads(request.body.decode("utf-8"))["ids"]
+            if not isinstance(inputs, list):
+                inputs = [inputs]
+            return 200, {}, blosc_response(self.arrays[inputs[0]], {"geoTransform": inputs})
+
+        rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+
+    def test_ndarray_out_gdal(self):
+        out = np.zeros((3, 20, 30), dtype=np.uint16)
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            arr, meta = self.raster.ndarray(["scene0"], order="gdal", out=out)
+
+        self.assertTrue(np.may_share_memory(arr, out))
+        np.testing.assert_array_equal(out, self.arrays["scene0"])
+
+    def test_ndarray_out_image(self):
+        out = np.zeros((20, 30, 3), dtype=np.uint16)
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            arr, meta = self.raster.ndarray(["scene1"], order="image", out=out)
+
+        self.assertTrue(np.may_share_memory(arr, out))
+        np.testing.assert_array_equal(out, self.arrays["scene1"].transpose((1, 2, 0)))
+
+    def test_ndarray_out_wrong_shape(self):
+        out = np.zeros((3, 30, 20), dtype=np.uint16)
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            with self.assertRaises(ValueError):
+                self.raster.ndarray(["scene0"], order="gdal", out=out)
+
+    def test_ndarray_out_callable(self):
+        calls = []
+
+        def allocate(shape, dtype):
+            calls.append((shape, dtype))
+            return np.empty(shape, dtype=np.float32)
+
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            arr, meta = self.raster.ndarray(["scene2"], order="image", out=allocate)
+
+        self.assertEqual(calls, [((20, 30, 3), np.dtype(np.uint16))])
+        self.assertEqual(arr.dtype, np.float32)
+        np.testing.assert_array_equal(arr, self.arrays["scene2"].transpose((1, 2, 0)))
+
+    def test_stack(self):
+        inputs = sorted(self.arrays)
+        for order, axes in [("image", (1, 2, 0)), ("gdal", (0, 1, 2))]:
+            with responses.RequestsMock() as rsps:
+                self.add_npz_callback(rsps)
+                stack, metas = self.raster.stack(inputs, order=order, dltile="128:16:960.0:15:-1:37")
+
+            self.assertEqual(stack.shape, (len(inputs),) + self.arrays["scene0"].transpose(axes).shape)
+            self.assertTrue(stack.flags.c_contiguous)
+            for i, scene in enumerate(inputs):
+                np.testing.assert_array_equal(stack[i], self.arrays[scene].transpose(axes))
+                self.assertEqual(metas[i]["geoTransform"], [scene])
+
+    @unittest.skipIf(tracemalloc is None, "tracemalloc is not available")
+    def test_stack_image_order_no_temporary(self):
+        self.arrays = {
+            "scene{}".format(i): np.tile(np.arange(300, dtype=np.uint16), (3, 200, 1)) + i
+            for i in range(4)
+        }
+        inputs = sorted(self.arrays)
+        level_nbytes = self.arrays["scene0"].nbytes
+        # encoded up front, so only the memory used to decode them is traced
+        bodies = {scene: blosc_response(arr) for scene, arr in self.arrays.items()}
+
+        def callback(request):
+            return 200, {}, bodies[json.loads(request.body.decode("utf-8"))["ids"]]
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            tracemalloc.start()
+            try:
+                stack, metas = self.raster.stack(inputs, dltile="128:16:960.0:15:-1:37", max_workers=1)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        self.assertTrue(stack.flags.c_contiguous)
+        for i, scene in enumerate(inputs):
+            np.testing.assert_array_equal(stack[i], self.arrays[scene].transpose((1, 2, 0)))
+        # the levels of the default "image" order are decoded in place, not through a temporary array
+        self.assertLess(peak, stack.nbytes + level_nbytes // 2)
+
+    def test_stack_empty(self):
+        out_file = os.path.join(tempfile.gettempdir(), "x.npy")
+        self.assertEqual(self.raster.stack([], dltile="128:16:960.0:15:-1:37", out_file=out_file), (None, []))
+
+    def test_stack_single_band(self):
+        self.arrays = {"scene{}".format(i): np.full((20, 30), i, dtype=np.int16) for i in range(3)}
+        inputs = sorted(self.arrays)
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            stack, metas = self.raster.stack(inputs, order="image", dltile="128:16:960.0:15:-1:37")
+
+        self.assertEqual(stack.shape, (3, 20, 30, 1))
+        for i in range(3):
+            self.assertTrue((stack[i] == i).all())
+
+    def test_iter_stack(self):
+        inputs = sorted(self.arrays)
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            results = list(self.raster.iter_stack(inputs, window=2, order="gdal"))
+
+        self.assertEqual([i for i, arr, meta in results], list(range(len(inputs))))
+        for i, arr, meta in results:
+            np.testing.assert_array_equal(arr, self.arrays[inputs[i]])
+            self.assertEqual(meta["geoTransform"], [inputs[i]])
+
+    def test_iter_stack_window(self):
+        inputs = sorted(self.arrays)
+        requested = []
+
+        def callback(request):
+            scene = json.loads(request.body.decode("utf-8"))["ids"]
+            requested.append(scene)
+            return 200, {}, blosc_response(self.arrays[scene])
+
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            stack = self.raster.iter_stack(inputs, window=1, max_workers=1)
+            next(stack)
+            # the next raster is downloaded while the caller works on the first one
+            next(stack)
+            stack.close()
+
+        self.assertEqual(requested[:2], inputs[:2])
+        self.assertNotIn(inputs[3], requested)
+
+    def test_iter_stack_empty(self):
+        self.assertEqual(list(self.raster.iter_stack([])), [])
+
+    def test_iter_stack_invalid(self):
+        # raised by the call itself, before any raster is requested
+        with self.assertRaises(TypeError):
+            self.raster.iter_stack("scene")
+        with self.assertRaises(ValueError):
+            self.raster.iter_stack(sorted(self.arrays), window=0)
+
+    def test_stack_out_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        out_file = os.path.join(tmpdir, "stack.npy")
+        inputs = sorted(self.arrays)
+
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            stack, metas = self.raster.stack(inputs, order="gdal", dltile="128:16:960.0:15:-1:37", out_file=out_file)
+
+        self.assertIsInstance(stack, np.memmap)
+        reloaded = np.load(out_file, mmap_mode="r")
+        self.assertEqual(reloaded.shape, (len(inputs), 3, 20, 30))
+        for i, scene in enumerate(inputs):
+            np.testing.assert_array_equal(reloaded[i], self.arrays[scene])
+        del reloaded
+
+
+if __name__ == "__main__":
+    unittest.main()
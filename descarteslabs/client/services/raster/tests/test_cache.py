@@ -0,0 +1,275 @@
+# Copyright 2018 Descartes Labs.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import shutil
+import tempfile
+import time
+import unittest
+
+import responses
+from mock import patch
+
+from descarteslabs.client.addons import ThirdParty, blosc, concurrent, numpy as np
+from descarteslabs.client.auth import Auth
+from descarteslabs.client.exceptions import NotFoundError
+from descarteslabs.client.services.raster import Raster, TileCache
+from descarteslabs.client.services.raster.tests.test_blosc import blosc_response
+
+
+def wait_for_waiters(test, raster, n):
+    "Block until `n` calls are waiting on a request in flight in `raster`"
+    for _ in range(500):
+        with raster._in_flight_lock:
+            if any(request.waiters >= n for request in raster._in_flight.values()):
+                return
+        time.sleep(0.01)
+    test.fail("Calls weren't coalesced")
+
+
+class TestTileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_key(self):
+        params = {"ids": ["a"], "bands": ["red"], "resolution": 60}
+        a = TileCache.key("url", "user", "/npz", params)
+        b = TileCache.key("url", "user", "/npz", {"resolution": 60, "bands": ["red"], "ids": ["a"]})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, TileCache.key("url", "user", "/raster", params))
+        self.assertNotEqual(a, TileCache.key("url", "user", "/npz", dict(params, resolution=30)))
+        self.assertNotEqual(a, TileCache.key("url", "other", "/npz", params))
+        self.assertNotEqual(a, TileCache.key("other", "user", "/npz", params))
+
+    def test_array(self):
+        cache = TileCache(self.directory)
+        array = np.arange(60, dtype=np.uint16).reshape(3, 4, 5)
+
+        self.assertIsNone(cache.get_array("key"))
+        cache.put_array("key", array, {"geoTransform": [0, 1]})
+        cached, metadata = cache.get_array("key")
+
+        self.assertIsInstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, array)
+        self.assertEqual(metadata, {"geoTransform": [0, 1]})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # copy-on-write: changes aren't written back to the cache
+        cached[0] = 0
+        np.testing.assert_array_equal(cache.get_array("key")[0], array)
+
+    def test_bytes(self):
+        cache = TileCache(self.directory)
+        cache.put_bytes("key", b"data")
+        self.assertEqual(cache.get_bytes("key"), b"data")
+        self.assertIsNone(cache.get_bytes("other"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        cache = TileCache(self.directory, max_size=250)
+        for key in "abc":
+            cache.put_bytes(key, b"x" * 100)
+        self.assertEqual(sorted(cache._entries), ["b", "c"])
+
+        cache.get_bytes("b")
+        cache.put_bytes("d", b"x" * 100)
+        self.assertEqual(sorted(cache._entries), ["b", "d"])
+        self.assertEqual(cache.size, 200)
+        self.assertIsNone(cache.get_bytes("c"))
+
+    def test_reindex(self):
+        cache = TileCache(self.directory)
+        cache.put_bytes("a", b"x" * 100)
+        cache.put_array("b", np.zeros(10), {})
+
+        reopened = TileCache(self.directory)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.size, cache.size)
+        self.assertEqual(reopened.get_bytes("a"), b"x" * 100)
+
+    def test_clear(self):
+        cache = TileCache(self.directory)
+        cache.put_bytes("a", b"x")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(len(TileCache(self.directory)), 0)
+
+
+@unittest.skipIf(isinstance(blosc, ThirdParty), "blosc is not installed")
+@patch.object(Auth, 'token', 'token')
+class TestRasterCache(unittest.TestCase):
+    url = "https://example.com/raster/v1"
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.raster = Raster(url=self.url, cache=TileCache(directory))
+        self.raster.auth.client_id = "user"
+        self.array = np.random.randint(0, 1000, (3, 20, 30)).astype(np.uint16)
+
+    def test_ndarray(self):
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/npz", body=blosc_response(self.array, {"foo": "bar"}))
+            arr, meta = self.raster.ndarray(["scene"], bands=["red"], resolution=60)
+            cached, cached_meta = self.raster.ndarray(["scene"], bands=["red"], resolution=60)
+            self.assertEqual(len(rsps.calls), 1)
+            self.assertEqual(json.loads(rsps.calls[0].request.body.decode("utf-8"))["of"], "blosc")
+
+        np.testing.assert_array_equal(cached, self.array.transpose((1, 2, 0)))
+        self.assertEqual(cached_meta, meta)
+        self.assertEqual((self.raster.cache.hits, self.raster.cache.misses), (1, 1))
+
+    def test_ndarray_shared_directory(self):
+        other_user = Raster(url=self.url, cache=TileCache(self.raster.cache.directory))
+        other_user.auth.client_id = "other"
+        other_url = "https://example.com/other/raster/v1"
+        other_service = Raster(url=other_url, cache=TileCache(self.raster.cache.directory))
+        other_service.auth.client_id = "user"
+
+        with responses.RequestsMock() as rsps:
+            for url in [self.url, other_url]:
+                rsps.add(responses.POST, url + "/npz", body=blosc_response(self.array))
+            for raster in [self.raster, other_user, other_service]:
+                raster.ndarray(["scene"], resolution=60)
+            # a response is only reused by the same user of the same service
+            self.assertEqual(len(rsps.calls), 3)
+            self.raster.ndarray(["scene"], resolution=60)
+            self.assertEqual(len(rsps.calls), 3)
+
+    def test_ndarray_concurrent(self):
+        def callback(request):
+            wait_for_waiters(self, self.raster, 2)
+            return 200, {}, blosc_response(self.array, {"foo": "bar"})
+
+        cache = self.raster.cache
+        with responses.RequestsMock() as rsps, patch.object(cache, "put_array", wraps=cache.put_array) as put_array:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [executor.submit(self.raster.ndarray, ["scene"], resolution=60) for _ in range(3)]
+                results = [future.result(timeout=10) for future in futures]
+            self.assertEqual(len(rsps.calls), 1)
+            # only the call that made the request stores its response
+            self.assertEqual(put_array.call_count, 1)
+            self.assertEqual(len(cache), 1)
+            # all three missed the cache before the response arrived
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+            cached, cached_meta = self.raster.ndarray(["scene"], resolution=60)
+            self.assertEqual(len(rsps.calls), 1)
+            self.assertEqual(put_array.call_count, 1)
+            self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        for arr, meta in results + [(cached, cached_meta)]:
+            np.testing.assert_array_equal(arr, self.array.transpose((1, 2, 0)))
+            self.assertEqual(meta, {"foo": "bar"})
+        self.assertEqual(self.raster._in_flight, {})
+
+    def test_ndarray_out(self):
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/npz", body=blosc_response(self.array))
+            self.raster.ndarray(["scene"], order="gdal")
+            out = np.zeros(self.array.shape, dtype=self.array.dtype)
+            arr, meta = self.raster.ndarray(["scene"], order="gdal", out=out)
+
+        self.assertTrue(np.may_share_memory(arr, out))
+        np.testing.assert_array_equal(out, self.array)
+
+    def test_raster(self):
+        body = b"\n".join([
+            json.dumps({"files": 1}).encode("utf-8"),
+            json.dumps({"name": "scene.tif", "length": 4}).encode("utf-8"),
+            b"tiff",
+        ])
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/raster", body=body)
+            r = self.raster.raster(["scene"])
+            cached = self.raster.raster(["scene"])
+            self.assertEqual(len(rsps.calls), 1)
+
+        self.assertEqual(cached, r)
+        self.assertEqual(cached.files["scene.tif"], b"tiff")
+
+
+@unittest.skipIf(isinstance(blosc, ThirdParty), "blosc is not installed")
+@patch.object(Auth, 'token', 'token')
+class TestRequestCoalescing(unittest.TestCase):
+    url = "https://example.com/raster/v1"
+
+    def setUp(self):
+        self.raster = Raster(url=self.url)
+        self.array = np.random.randint(0, 1000, (3, 20, 30)).astype(np.uint16)
+
+    def wait_for_waiters(self, n):
+        wait_for_waiters(self, self.raster, n)
+
+    def test_concurrent_identical_calls(self):
+        def callback(request):
+            self.wait_for_waiters(2)
+            return 200, {}, blosc_response(self.array, {"foo": "bar"})
+
+        outs = [None, None, np.zeros((20, 30, 3), dtype=np.uint16)]
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+                results = list(executor.map(
+                    lambda out: self.raster.ndarray(["scene"], resolution=60, out=out), outs
+                ))
+            self.assertEqual(len(rsps.calls), 1)
+
+        arrays = [arr for arr, meta in results]
+        for arr, meta in results:
+            np.testing.assert_array_equal(arr, self.array.transpose((1, 2, 0)))
+            self.assertEqual(meta, {"foo": "bar"})
+        self.assertTrue(np.may_share_memory(arrays[2], outs[2]))
+        self.assertFalse(np.may_share_memory(arrays[0], arrays[1]))
+        self.assertEqual(self.raster._in_flight, {})
+
+    def test_concurrent_failure(self):
+        def callback(request):
+            self.wait_for_waiters(1)
+            return 404, {}, "not found"
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(self.raster.ndarray, ["scene"]) for _ in range(2)]
+                for future in futures:
+                    with self.assertRaises(NotFoundError):
+                        future.result()
+
+        self.assertEqual(self.raster._in_flight, {})
+
+    def test_concurrent_interrupt(self):
+        class Interrupt(BaseException):
+            pass
+
+        def callback(request):
+            self.wait_for_waiters(1)
+            raise Interrupt()
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(self.raster.ndarray, ["scene"]) for _ in range(2)]
+                for future in futures:
+                    with self.assertRaises(Interrupt):
+                        future.result(timeout=10)
+
+        self.assertEqual(self.raster._in_flight, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
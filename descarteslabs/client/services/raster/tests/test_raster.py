@@ -17,9 +17,15 @@ import tempfile
 import shutil
 import unittest
 import json
+from io import BytesIO
+
+import responses
+from mock import patch
 
 import descarteslabs.client.addons as addons
 from descarteslabs.client.addons import numpy as np
+from descarteslabs.client.auth import Auth
+from descarteslabs.client.exceptions import ServerError
 from descarteslabs.client.services.raster import Raster
 from descarteslabs.client.services.places import Places
 
@@ -397,5 +403,49 @@ class TestRaster(unittest.TestCase):
         self.assertEqual(arr.shape[2], 4)
 
 
+@patch.object(Auth, 'token', 'token')
+class TestRasterDest(unittest.TestCase):
+    url = "https://example.com/raster/v1"
+
+    def setUp(self):
+        self.raster = Raster(url=self.url)
+        self.file = os.urandom(10000)
+        self.body = b"\n".join([
+            json.dumps({"files": 1, "foo": "bar"}).encode("utf-8"),
+            json.dumps({"name": "scene.tif", "length": len(self.file)}).encode("utf-8"),
+            self.file,
+        ])
+
+    @patch("descarteslabs.client.services.raster.raster.COPY_CHUNK_SIZE", 1024)
+    def test_dest_file(self):
+        dest = BytesIO()
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/raster", body=self.body)
+            r = self.raster.raster(["scene"], dest=dest)
+
+        self.assertEqual(dest.getvalue(), self.file)
+        self.assertEqual(r.files, {"scene.tif": dest})
+        self.assertEqual(r.foo, "bar")
+
+    def test_dest_path(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "out.tif")
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/raster", body=self.body)
+            r = self.raster.raster(["scene"], dest=path, save=True)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), self.file)
+        self.assertEqual(r.files, {"scene.tif": path})
+        self.assertFalse(os.path.exists("scene.tif"))
+
+    def test_dest_truncated(self):
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, self.url + "/raster", body=self.body[:-10])
+            with self.assertRaises(ServerError):
+                self.raster.raster(["scene"], dest=BytesIO())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,11 @@
+from .dltile import (  # noqa: F401
+    parse_key,
+    format_key,
+    tile_indices,
+    tile_bounds,
+    tile_polygons,
+    dltile_from_key,
+    dltile_from_latlon,
+    iter_dltiles_from_shape,
+)
+from .conversions import lonlat_to_utm, utm_to_lonlat, zone_from_lon  # noqa: F401
@@ -0,0 +1,134 @@
+"""
+Vectorized conversions between WGS84 longitude/latitude and UTM coordinates.
+
+Uses the 6th-order Kruger series for the transverse Mercator projection
+(Karney, "Transverse Mercator with an accuracy of a few nanometers", 2011),
+which is accurate to well under a millimeter within a UTM zone.
+
+All functions accept scalars or NumPy arrays, and broadcast their arguments.
+UTM coordinates are always on the northern-hemisphere grid of their zone
+(EPSG:326xx, with a false northing of 0), so points south of the equator
+have negative northings.
+"""
+
+import math
+
+from descarteslabs.client.addons import numpy as np
+
+# WGS84 ellipsoid
+A = 6378137.0
+F = 1 / 298.257223563
+
+# UTM
+K0 = 0.9996
+FALSE_EASTING = 500000.0
+ZONE_WIDTH = 6.0
+
+_N = F / (2 - F)
+_N2 = _N ** 2
+_N3 = _N ** 3
+_N4 = _N ** 4
+_N5 = _N ** 5
+_N6 = _N ** 6
+
+# rectifying radius
+_A_HAT = A / (1 + _N) * (1 + _N2 / 4 + _N4 / 64 + _N6 / 256)
+
+_ALPHA = (
+    _N / 2 - 2 * _N2 / 3 + 5 * _N3 / 16 + 41 * _N4 / 180 - 127 * _N5 / 288 + 7891 * _N6 / 37800,
+    13 * _N2 / 48 - 3 * _N3 / 5 + 557 * _N4 / 1440 + 281 * _N5 / 630 - 1983433 * _N6 / 1935360,
+    61 * _N3 / 240 - 103 * _N4 / 140 + 15061 * _N5 / 26880 + 167603 * _N6 / 181440,
+    49561 * _N4 / 161280 - 179 * _N5 / 168 + 6601661 * _N6 / 7257600,
+    34729 * _N5 / 80640 - 3418889 * _N6 / 1995840,
+    212378941 * _N6 / 319334400,
+)
+
+_BETA = (
+    _N / 2 - 2 * _N2 / 3 + 37 * _N3 / 96 - _N4 / 360 - 81 * _N5 / 512 + 96199 * _N6 / 604800,
+    _N2 / 48 + _N3 / 15 - 437 * _N4 / 1440 + 46 * _N5 / 105 - 1118711 * _N6 / 3870720,
+    17 * _N3 / 480 - 37 * _N4 / 840 - 209 * _N5 / 4480 + 5569 * _N6 / 90720,
+    4397 * _N4 / 161280 - 11 * _N5 / 504 - 830251 * _N6 / 7257600,
+    4583 * _N5 / 161280 - 108847 * _N6 / 3991680,
+    20648693 * _N6 / 638668800,
+)
+
+_E = math.sqrt(F * (2 - F))
+
+
+def zone_from_lon(lon):
+    "The UTM zone number (1-60) containing each longitude, in degrees"
+    lon = np.asarray(lon, dtype=float)
+    return (np.floor((lon + 180) / ZONE_WIDTH).astype(int) % 60) + 1
+
+
+def central_meridian(zone):
+    "The central meridian, in degrees, of each UTM zone"
+    return (np.asarray(zone) - 1) * ZONE_WIDTH - 180 + ZONE_WIDTH / 2
+
+
+def lonlat_to_utm(lon, lat, zone):
+    """
+    Project WGS84 longitudes and latitudes, in degrees, to easting and northing
+    in meters on the grid of the given UTM zone(s).
+
+    Returns
+    -------
+    x, y : ndarray
+    """
+    lam = np.radians(np.asarray(lon, dtype=float) - central_meridian(zone))
+    phi = np.radians(np.asarray(lat, dtype=float))
+
+    # conformal latitude
+    tau = np.tan(phi)
+    sigma = np.sinh(_E * np.arctanh(_E * tau / np.sqrt(1 + tau ** 2)))
+    tau_prime = tau * np.sqrt(1 + sigma ** 2) - sigma * np.sqrt(1 + tau ** 2)
+
+    xi_prime = np.arctan2(tau_prime, np.cos(lam))
+    eta_prime = np.arcsinh(np.sin(lam) / np.sqrt(tau_prime ** 2 + np.cos(lam) ** 2))
+
+    xi = xi_prime
+    eta = eta_prime
+    for j, alpha in enumerate(_ALPHA, 1):
+        xi = xi + alpha * np.sin(2 * j * xi_prime) * np.cosh(2 * j * eta_prime)
+        eta = eta + alpha * np.cos(2 * j * xi_prime) * np.sinh(2 * j * eta_prime)
+
+    x = FALSE_EASTING + K0 * _A_HAT * eta
+    y = K0 * _A_HAT * xi
+    return x, y
+
+
+def utm_to_lonlat(x, y, zone):
+    """
+    Unproject eastings and northings, in meters on the grid of the given
+    UTM zone(s), to WGS84 longitudes and latitudes in degrees.
+
+    Returns
+    -------
+    lon, lat : ndarray
+    """
+    xi = np.asarray(y, dtype=float) / (K0 * _A_HAT)
+    eta = (np.asarray(x, dtype=float) - FALSE_EASTING) / (K0 * _A_HAT)
+
+    xi_prime = xi
+    eta_prime = eta
+    for j, beta in enumerate(_BETA, 1):
+        xi_prime = xi_prime - beta * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+        eta_prime = eta_prime - beta * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+
+    tau_prime = np.sin(xi_prime) / np.sqrt(np.sinh(eta_prime) ** 2 + np.cos(xi_prime) ** 2)
+    lam = np.arctan2(np.sinh(eta_prime), np.cos(xi_prime))
+
+    # invert the conformal latitude with Newton's method; converges in 2-3 iterations
+    tau = tau_prime
+    for _ in range(5):
+        sigma = np.sinh(_E * np.arctanh(_E * tau / np.sqrt(1 + tau ** 2)))
+        tau_i_prime = tau * np.sqrt(1 + sigma ** 2) - sigma * np.sqrt(1 + tau ** 2)
+        d_tau = (
+            (tau_prime - tau_i_prime) / np.sqrt(1 + tau_i_prime ** 2)
+            * (1 + (1 - _E ** 2) * tau ** 2) / ((1 - _E ** 2) * np.sqrt(1 + tau ** 2))
+        )
+        tau = tau + d_tau
+
+    lat = np.degrees(np.arctan(tau))
+    lon = np.degrees(lam) + central_meridian(zone)
+    return lon, lat
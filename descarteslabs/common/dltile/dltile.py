@@ -0,0 +1,228 @@
+"""
+Local computation of the DLTile grid.
+
+A DLTile key has the form ``tilesize:pad:resolution:zone:ti:tj``. Tiles are laid
+out on the (northern-hemisphere) UTM grid of their zone: tile ``(ti, tj)`` covers
+eastings ``500000 + ti * tilesize * resolution`` to ``500000 + (ti + 1) * tilesize * resolution``
+and northings ``tj * tilesize * resolution`` to ``(tj + 1) * tilesize * resolution``,
+buffered by ``pad * resolution`` on each side.
+
+The array functions here accept scalars or NumPy arrays and broadcast their
+arguments, so they can be used on millions of tiles at once.
+"""
+
+import shapely.geometry
+import shapely.prepared
+
+from descarteslabs.client.addons import numpy as np
+
+from .conversions import FALSE_EASTING, ZONE_WIDTH, central_meridian, lonlat_to_utm, utm_to_lonlat, zone_from_lon
+
+# latitudes covered by the UTM grid
+MIN_LAT = -80
+MAX_LAT = 84
+
+PROJ4 = "+proj=utm +zone={zone} +datum=WGS84 +units=m +no_defs "
+
+WKT = (
+    'PROJCS["WGS 84 / UTM zone {zone}N",'
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],'
+    'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+    'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]],'
+    'PROJECTION["Transverse_Mercator"],PARAMETER["latitude_of_origin",0],'
+    'PARAMETER["central_meridian",{central_meridian}],PARAMETER["scale_factor",0.9996],'
+    'PARAMETER["false_easting",500000],PARAMETER["false_northing",0],'
+    'UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],AXIS["Northing",NORTH],'
+    'AUTHORITY["EPSG","326{zone:02d}"]]'
+)
+
+
+def parse_key(key):
+    """
+    Split a DLTile key into its parameters.
+
+    Returns
+    -------
+    tuple
+        ``(tilesize, pad, resolution, zone, ti, tj)``
+
+    Raises
+    ------
+    ValueError
+        If the key is malformed.
+    """
+    try:
+        tilesize, pad, resolution, zone, ti, tj = key.split(":")
+        tilesize, pad, zone, ti, tj = int(tilesize), int(pad), int(zone), int(ti), int(tj)
+        resolution = float(resolution)
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid key {!r}; expected 'tilesize:pad:resolution:zone:ti:tj'".format(key))
+
+    if tilesize <= 0 or pad < 0 or resolution <= 0 or not 1 <= zone <= 60:
+        raise ValueError("Invalid key {!r}; tiling parameters are out of range".format(key))
+
+    return tilesize, pad, resolution, zone, ti, tj
+
+
+def format_key(tilesize, pad, resolution, zone, ti, tj):
+    "The key of a DLTile"
+    return "{}:{}:{}:{}:{}:{}".format(int(tilesize), int(pad), float(resolution), int(zone), int(ti), int(tj))
+
+
+def tile_indices(lat, lon, resolution, tilesize):
+    """
+    The UTM zone and ``(ti, tj)`` grid position of the tiles that contain each point.
+
+    Returns
+    -------
+    zone, ti, tj : ndarray
+    """
+    zone = zone_from_lon(lon)
+    x, y = lonlat_to_utm(lon, lat, zone)
+    span = tilesize * resolution
+    ti = np.floor((x - FALSE_EASTING) / span).astype(int)
+    tj = np.floor(y / span).astype(int)
+    return zone, ti, tj
+
+
+def tile_bounds(ti, tj, resolution, tilesize, pad):
+    """
+    The padded ``(min_x, min_y, max_x, max_y)`` of tiles, in UTM coordinates of their zone.
+
+    Returns
+    -------
+    min_x, min_y, max_x, max_y : ndarray
+    """
+    span = tilesize * resolution
+    buffer = pad * resolution
+    min_x = FALSE_EASTING + np.asarray(ti) * span - buffer
+    min_y = np.asarray(tj) * span - buffer
+    size = span + 2 * buffer
+    return min_x, min_y, min_x + size, min_y + size
+
+
+def tile_polygons(zone, ti, tj, resolution, tilesize, pad):
+    """
+    The WGS84 longitude/latitude outlines of the padded tiles.
+
+    Returns
+    -------
+    ndarray
+        Array of shape ``(..., 5, 2)`` of closed rings of ``(lon, lat)`` points, ordered
+        lower-left, lower-right, upper-right, upper-left, lower-left.
+    """
+    min_x, min_y, max_x, max_y = tile_bounds(ti, tj, resolution, tilesize, pad)
+    xs = np.stack([min_x, max_x, max_x, min_x, min_x], axis=-1)
+    ys = np.stack([min_y, min_y, max_y, max_y, min_y], axis=-1)
+    lon, lat = utm_to_lonlat(xs, ys, np.asarray(zone)[..., np.newaxis])
+    return np.stack([lon, lat], axis=-1)
+
+
+def dltile_from_key(key):
+    """
+    The DLTile GeoJSON Feature for a key, as returned by the raster service's
+    ``dlkeys`` endpoints, computed locally.
+    """
+    tilesize, pad, resolution, zone, ti, tj = parse_key(key)
+    return _dltile(tilesize, pad, resolution, zone, ti, tj)
+
+
+def dltile_from_latlon(lat, lon, resolution, tilesize, pad):
+    """
+    The DLTile GeoJSON Feature for the tile containing a latitude/longitude,
+    as returned by the raster service's ``dlkeys`` endpoints, computed locally.
+    """
+    zone, ti, tj = tile_indices(lat, lon, resolution, tilesize)
+    return _dltile(tilesize, pad, resolution, zone, ti, tj)
+
+
+def iter_dltiles_from_shape(shape, resolution, tilesize, pad):
+    """
+    Generate the DLTile GeoJSON Features of every tile whose outline intersects a shape.
+
+    Each UTM zone the shape overlaps is tiled separately, with the part of the shape
+    within that zone. Candidate tiles are enumerated one row of the grid at a time
+    and tested against the shape, so memory use doesn't depend on the number of tiles.
+
+    Parameters
+    ----------
+    shape : GeoJSON-like or shapely geometry
+        Geometry in WGS84 longitude/latitude.
+    resolution : float
+    tilesize : int
+    pad : int
+
+    Returns
+    -------
+    generator of dict
+        Tiles in order of zone, then from south to north and west to east.
+    """
+    if not isinstance(shape, shapely.geometry.base.BaseGeometry):
+        shape = shapely.geometry.shape(getattr(shape, "__geo_interface__", shape))
+
+    span = tilesize * resolution
+    buffer = pad * resolution
+
+    min_lon, min_lat, max_lon, max_lat = shape.bounds
+    last_zone = min(int(np.floor((max_lon + 180) / ZONE_WIDTH)) + 1, 60)
+    for zone in range(int(zone_from_lon(min_lon)), last_zone + 1):
+        zone_west = float(central_meridian(zone)) - ZONE_WIDTH / 2
+        zone_band = shapely.geometry.box(zone_west, MIN_LAT, zone_west + ZONE_WIDTH, MAX_LAT)
+        zone_shape = shape.intersection(zone_band)
+        if zone_shape.is_empty:
+            continue
+        prepared = shapely.prepared.prep(zone_shape)
+
+        # the UTM extent of the shape's lon/lat bounds in this zone is attained on the edges of the bounds;
+        # sample them, and allow a margin of one tile for the curvature between samples
+        west, south, east, north = zone_shape.bounds
+        t = np.linspace(0, 1, 65)
+        lons = west + (east - west) * t
+        lats = south + (north - south) * t
+        edge_lons = np.concatenate([lons, np.full_like(t, east), lons, np.full_like(t, west)])
+        edge_lats = np.concatenate([np.full_like(t, south), lats, np.full_like(t, north), lats])
+        xs, ys = lonlat_to_utm(edge_lons, edge_lats, zone)
+
+        ti = np.arange(
+            int(np.floor((xs.min() - buffer - FALSE_EASTING) / span)) - 1,
+            int(np.floor((xs.max() + buffer - FALSE_EASTING) / span)) + 2,
+        )
+        min_tj = int(np.floor((ys.min() - buffer) / span)) - 1
+        max_tj = int(np.floor((ys.max() + buffer) / span)) + 1
+        for tj in range(min_tj, max_tj + 1):
+            rings = tile_polygons(zone, ti, tj, resolution, tilesize, pad)
+            row = shapely.geometry.Polygon(np.concatenate([rings[:, 0], rings[-1:, 1], rings[-1:, 2], rings[::-1, 3]]))
+            if not prepared.intersects(row):
+                continue
+            for i, ring in zip(ti, rings):
+                if prepared.intersects(shapely.geometry.Polygon(ring)):
+                    yield _dltile(tilesize, pad, resolution, zone, i, tj, ring=ring)
+
+
+def _dltile(tilesize, pad, resolution, zone, ti, tj, ring=None):
+    tilesize, pad, resolution, zone, ti, tj = int(tilesize), int(pad), float(resolution), int(zone), int(ti), int(tj)
+    bounds = [float(b) for b in tile_bounds(ti, tj, resolution, tilesize, pad)]
+    if ring is None:
+        ring = tile_polygons(zone, ti, tj, resolution, tilesize, pad)
+
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [ring.tolist()],
+        },
+        "properties": {
+            "cs_code": "EPSG:326{:02d}".format(zone),
+            "geotrans": [bounds[0], resolution, 0, bounds[3], 0, -resolution],
+            "key": format_key(tilesize, pad, resolution, zone, ti, tj),
+            "outputBounds": bounds,
+            "pad": pad,
+            "proj4": PROJ4.format(zone=zone),
+            "resolution": resolution,
+            "ti": ti,
+            "tilesize": tilesize,
+            "tj": tj,
+            "wkt": WKT.format(zone=zone, central_meridian=(zone - 1) * 6 - 177),
+            "zone": zone,
+        },
+    }
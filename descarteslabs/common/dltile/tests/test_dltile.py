@@ -0,0 +1,183 @@
+import unittest
+
+import shapely.geometry
+
+from descarteslabs.client.addons import ThirdParty, numpy as np
+from descarteslabs.common.dltile import (
+    dltile_from_key,
+    dltile_from_latlon,
+    format_key,
+    iter_dltiles_from_shape,
+    lonlat_to_utm,
+    parse_key,
+    tile_bounds,
+    tile_indices,
+    tile_polygons,
+    utm_to_lonlat,
+)
+
+# responses recorded from the raster service's dlkeys endpoints (only some include the full WKT)
+SERVER_TILES = [
+    {
+        'geometry': {
+            'coordinates': [[
+                [59.88428127486419, 44.89851158847289],
+                [60.08463455818353, 44.90380671613201],
+                [60.077403974563175, 45.046212550598135],
+                [59.87655568675822, 45.040891215906676],
+                [59.88428127486419, 44.89851158847289],
+            ]],
+            'type': 'Polygon'
+        },
+        'properties': {
+            'cs_code': 'EPSG:32641',
+            'geotrans': [254000.0, 15.0, 0, 4992240.0, 0, -15.0],
+            'key': '1024:16:15.0:41:-16:324',
+            'outputBounds': [254000.0, 4976400.0, 269840.0, 4992240.0],
+            'pad': 16,
+            'proj4': '+proj=utm +zone=41 +datum=WGS84 +units=m +no_defs ',
+            'resolution': 15.0,
+            'ti': -16,
+            'tilesize': 1024,
+            'tj': 324,
+            'zone': 41
+        },
+        'type': 'Feature'
+    },
+    {
+        'geometry': {
+            'coordinates': [[
+                [-96.81264975325402, 41.045203319986356],
+                [-96.07101667769108, 41.02873098016475],
+                [-96.04576296033223, 41.59007261142797],
+                [-96.79377566762066, 41.60687154946031],
+                [-96.81264975325402, 41.045203319986356],
+            ]],
+            'type': 'Polygon'
+        },
+        'properties': {
+            'cs_code': 'EPSG:32614',
+            'geotrans': [683840.0, 30.0, 0, 4608480.0, 0, -30.0],
+            'key': '2048:16:30.0:14:3:74',
+            'outputBounds': [683840.0, 4546080.0, 746240.0, 4608480.0],
+            'pad': 16,
+            'proj4': '+proj=utm +zone=14 +datum=WGS84 +units=m +no_defs ',
+            'resolution': 30.0,
+            'ti': 3,
+            'tilesize': 2048,
+            'tj': 74,
+            'zone': 14
+        },
+        'type': 'Feature'
+    },
+    {
+        'geometry': {
+            'coordinates': [[
+                [-94.64171754779824, 40.9202359006794],
+                [-92.81755164322226, 40.93177944075989],
+                [-92.81360932958779, 42.31528732533928],
+                [-94.6771717075502, 42.303172487087394],
+                [-94.64171754779824, 40.9202359006794]
+            ]],
+            'type': 'Polygon'
+        },
+        'properties': {
+            'cs_code': 'EPSG:32615',
+            'key': '128:16:960.0:15:-1:37',
+            'outputBounds': [361760.0, 4531200.0, 515360.0, 4684800.0],
+            'pad': 16,
+            'resolution': 960.0,
+            'ti': -1,
+            'tilesize': 128,
+            'tj': 37,
+            'zone': 15,
+            'geotrans': [361760.0, 960.0, 0, 4684800.0, 0, -960.0],
+            'proj4': '+proj=utm +zone=15 +datum=WGS84 +units=m +no_defs ',
+            'wkt': 'PROJCS["WGS 84 / UTM zone 15N",GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]],PROJECTION["Transverse_Mercator"],PARAMETER["latitude_of_origin",0],PARAMETER["central_meridian",-93],PARAMETER["scale_factor",0.9996],PARAMETER["false_easting",500000],PARAMETER["false_northing",0],UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","32615"]]'  # noqa
+        },
+        'type': 'Feature'
+    },
+]
+
+
+@unittest.skipIf(isinstance(np, ThirdParty), "numpy is not installed")
+class TestDLTile(unittest.TestCase):
+
+    def assertMatchesServer(self, tile, expected):
+        self.assertEqual(tile["type"], "Feature")
+        self.assertEqual(tile["geometry"]["type"], "Polygon")
+        np.testing.assert_allclose(
+            tile["geometry"]["coordinates"], expected["geometry"]["coordinates"], rtol=0, atol=1e-9
+        )
+        properties = dict(tile["properties"])
+        if "wkt" in expected["properties"]:
+            self.assertEqual(properties, expected["properties"])
+        wkt = properties.pop("wkt")
+        self.assertEqual(properties, {k: v for k, v in expected["properties"].items() if k != "wkt"})
+        self.assertTrue(wkt.startswith('PROJCS["WGS 84 / UTM zone {}N",GEOGCS["WGS'.format(properties["zone"])))
+        self.assertTrue(wkt.endswith('"Northing",NORTH],AUTHORITY["EPSG","326{}"]]'.format(properties["zone"])))
+
+    def test_from_key(self):
+        for expected in SERVER_TILES:
+            self.assertMatchesServer(dltile_from_key(expected["properties"]["key"]), expected)
+
+    def test_from_latlon(self):
+        self.assertMatchesServer(dltile_from_latlon(45, 60, 15.0, 1024, 16), SERVER_TILES[0])
+
+    def test_parse_key(self):
+        self.assertEqual(parse_key("128:16:960.0:15:-1:37"), (128, 16, 960.0, 15, -1, 37))
+        self.assertEqual(format_key(*parse_key("128:16:960.0:15:-1:37")), "128:16:960.0:15:-1:37")
+        for key in ["", "128:16:960.0:15:-1", "128:16:foo:15:-1:37", "128:16:960.0:61:-1:37", None]:
+            with self.assertRaises(ValueError):
+                parse_key(key)
+
+    def test_roundtrip(self):
+        lat = np.random.uniform(-80, 84, 10000)
+        lon = np.random.uniform(-180, 180, 10000)
+        zone, ti, tj = tile_indices(lat, lon, 30.0, 2048)
+        x, y = lonlat_to_utm(lon, lat, zone)
+
+        unprojected_lon, unprojected_lat = utm_to_lonlat(x, y, zone)
+        np.testing.assert_allclose(unprojected_lat, lat, rtol=0, atol=1e-9)
+        np.testing.assert_allclose((unprojected_lon - lon + 180) % 360 - 180, 0, rtol=0, atol=1e-9)
+
+        # each point is in the unpadded extent of its tile
+        min_x, min_y, max_x, max_y = tile_bounds(ti, tj, 30.0, 2048, 0)
+        self.assertTrue(((min_x <= x) & (x < max_x) & (min_y <= y) & (y < max_y)).all())
+
+    def test_polygons(self):
+        zone = np.array([41, 14])
+        ti = np.array([-16, 3])
+        tj = np.array([324, 74])
+        polygons = tile_polygons(zone, ti, tj, np.array([15.0, 30.0]), np.array([1024, 2048]), 16)
+        self.assertEqual(polygons.shape, (2, 5, 2))
+        for polygon, expected in zip(polygons, SERVER_TILES):
+            np.testing.assert_allclose(polygon, expected["geometry"]["coordinates"][0], rtol=0, atol=1e-9)
+
+    def test_from_shape(self):
+        # straddles the boundary between zones 14 and 15
+        shape = shapely.geometry.Polygon([(-97.5, 41.0), (-95.0, 41.2), (-93.5, 42.5), (-97.0, 42.0)])
+        tiles = list(iter_dltiles_from_shape(shape, 60.0, 512, 8))
+
+        keys = set(tile["properties"]["key"] for tile in tiles)
+        self.assertEqual(len(keys), len(tiles))
+        self.assertEqual(set(tile["properties"]["zone"] for tile in tiles), {14, 15})
+        for tile in tiles:
+            self.assertTrue(shapely.geometry.shape(tile["geometry"]).intersects(shape))
+
+        # every point in the shape is covered by its tile
+        lon = np.random.uniform(-97.5, -93.5, 2000)
+        lat = np.random.uniform(41.0, 42.5, 2000)
+        inside = [shape.contains(shapely.geometry.Point(x, y)) for x, y in zip(lon, lat)]
+        zone, ti, tj = tile_indices(lat[inside], lon[inside], 60.0, 512)
+        for z, i, j in zip(zone, ti, tj):
+            self.assertIn(format_key(512, 8, 60.0, z, i, j), keys)
+
+    def test_from_shape_geojson(self):
+        shape = {"type": "Point", "coordinates": [60, 45]}
+        tiles = list(iter_dltiles_from_shape(shape, 15.0, 1024, 16))
+        self.assertIn("1024:16:15.0:41:-16:324", [tile["properties"]["key"] for tile in tiles])
+
+
+if __name__ == "__main__":
+    unittest.main()
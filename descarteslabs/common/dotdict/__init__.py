@@ -1,3 +1,4 @@
 from .dotdict import DotDict, DotList, DotDict_items, DotDict_values  # noqa: F401
+from .dotdict import FrozenDotDict, FrozenDotList, freeze  # noqa: F401
 
-__all__ = ["DotDict", "DotList"]
+__all__ = ["DotDict", "DotList", "FrozenDotDict", "FrozenDotList", "freeze"]
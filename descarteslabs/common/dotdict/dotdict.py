@@ -184,27 +184,12 @@ class DotDict(dict):
     def asdict(self):
         """
         D.asdict() -> a deep copy of D, where any DotDicts or DotLists contained are converted to plain types.
-        Raises RuntimeError if the container is recursive (contains itself as a value).
+
+        Plain dicts and lists within D are shared with the copy, not copied. A DotDict or
+        DotList that appears more than once (including within itself) is converted once,
+        and the copy has the same structure.
         """
-        # TODO: does not handle recursive structures
-
-        # note: we're assuming here that any plain dict/list doesn't contain Dot-types within it.
-        # this is safe for normal usage of DotDict: any assignment to a DotDict will cause all the levels
-        # in the hierarchy to be converted to Dot-types
-        # However, if someone creates a plain dict, assigns DotDicts as its values, then assigns
-        # *that* plain dict to a value in a DotDict, the asdict of the containing DotDict will stop when
-        # it hits the plain dict.
-        # The most probable case here is assigning Dot-types as values in a dictionary or list comprehension.
-
-        unboxed = {}
-        iterator = dict.iteritems if six.PY2 else dict.items
-        for k, v in iterator(self):
-            if isinstance(v, DotDict):
-                v = v.asdict()
-            if isinstance(v, DotList):
-                v = v.aslist()
-            unboxed[k] = v
-        return unboxed
+        return _unbox(self)
 
 
 class DotDict_view(object):
@@ -354,15 +339,184 @@ class DotList(list):
     def aslist(self):
         """
         L.aslist() -> a deep copy of L, where any DotDicts or DotLists contained are converted to plain types.
-        Raises RuntimeError if the container is recursive (contains itself as a value).
+
+        Plain dicts and lists within L are shared with the copy, not copied. A DotDict or
+        DotList that appears more than once (including within itself) is converted once,
+        and the copy has the same structure.
         """
-        unboxed = list(self)
-        for i, obj in enumerate(unboxed):
-            if isinstance(obj, DotList):
-                unboxed[i] = obj.aslist()
-            elif isinstance(obj, DotDict):
-                unboxed[i] = obj.asdict()
-        return unboxed
+        return _unbox(self)
+
+
+def _unbox(obj):
+    """
+    Convert a DotDict or DotList, and every DotDict and DotList within it, to plain types.
+
+    Iterative rather than recursive, so it handles arbitrarily deep containers. Only the
+    contents of converted containers are examined: a plain dict or list is assumed not to
+    contain any Dot-types, as is the case for any container read through a DotDict, and is
+    shared as-is. So if nothing within `obj` was ever accessed (and boxed), this is a single
+    shallow copy.
+    """
+    # dict(...) and list.__getitem__ copy without going through the Dot-types' boxing methods
+    plain = dict(obj) if isinstance(obj, dict) else list.__getitem__(obj, slice(None))
+    converted = {id(obj): plain}
+    stack = [plain]
+    while stack:
+        container = stack.pop()
+        for key, value in (list(container.items()) if type(container) is dict else enumerate(container)):
+            if isinstance(value, (DotDict, DotList)):
+                copy = converted.get(id(value))
+                if copy is None:
+                    copy = dict(value) if isinstance(value, dict) else list.__getitem__(value, slice(None))
+                    converted[id(value)] = copy
+                    stack.append(copy)
+                container[key] = copy
+    return plain
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("'{}' object is read-only".format(type(self).__name__))
+
+
+class FrozenDotDict(DotDict):
+    """
+    Read-only DotDict, whose nested dicts and lists are FrozenDotDicts and FrozenDotLists.
+
+    The nested containers are converted once, when the FrozenDotDict is created
+    (directly or with `freeze`), so reading values never allocates or modifies anything.
+    That makes reads cheaper than on a DotDict, which converts (and stores) a nested
+    container the first time it's accessed, and safe to do from several threads at once.
+
+    This is a copy rather than a read-only view of the original containers: a view would
+    have to wrap each nested container it returned, on every read or by caching the
+    wrappers (which is the modification on read that a DotDict makes), and couldn't stop
+    the original from being changed through other references to it. Only the containers
+    are copied; all other values are shared with the original.
+
+    Methods that would modify it raise TypeError; use `asdict` for a mutable copy.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        _freeze_nested(self, _converted(self, args, kwargs))
+
+    # values never need converting, so reads can use dict's methods directly
+    __getitem__ = dict.__getitem__
+    get = dict.get
+    items = dict.items
+    values = dict.values
+    if six.PY2:
+        iteritems = dict.iteritems
+        itervalues = dict.itervalues
+
+    def __getattr__(self, attr):
+        try:
+            return dict.__getitem__(self, attr)
+        except KeyError:
+            six.raise_from(AttributeError(attr), None)
+
+    def __reduce__(self):
+        # the default pickle protocol for dict subclasses would call __setitem__
+        return (FrozenDotDict, (dict(self),))
+
+    __setitem__ = __delitem__ = __setattr__ = __delattr__ = _read_only
+    pop = popitem = setdefault = update = clear = _read_only
+
+
+class FrozenDotList(DotList):
+    """
+    Read-only DotList, whose nested dicts and lists are FrozenDotDicts
+    and FrozenDotLists. See `FrozenDotDict`.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args):
+        list.__init__(self, *args)
+        _freeze_nested(self, _converted(self, args, None))
+
+    def __getitem__(self, i):
+        item = list.__getitem__(self, i)
+        # the items of a slice are already frozen
+        return _frozen_copy(item) if isinstance(i, slice) else item
+
+    __iter__ = list.__iter__
+
+    def __reduce__(self):
+        return (FrozenDotList, (list(self),))
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = remove = pop = sort = reverse = clear = _read_only
+
+
+def freeze(obj):
+    """
+    Convert `obj` and every dict and list nested within it to `FrozenDotDict`
+    and `FrozenDotList`.
+
+    The conversion is iterative, so arbitrarily deep containers can be frozen.
+    Other values, including containers that aren't dicts or lists, are left as-is.
+    To freeze JSON as it's parsed, use ``json.loads(text, object_hook=freeze)``.
+    """
+    frozen = _frozen_copy(obj)
+    if frozen is not obj:
+        _freeze_nested(frozen, {id(obj): frozen})
+    return frozen
+
+
+def _converted(frozen, args, kwargs):
+    "The initial memo for `_freeze_nested` of a frozen container constructed from `args`"
+    if len(args) == 1 and not kwargs and isinstance(args[0], (dict, list)):
+        # so references to the original within itself refer to the copy
+        return {id(args[0]): frozen}
+    return {}
+
+
+def _freeze_nested(frozen, converted):
+    """
+    Replace the dicts and lists within the new frozen container `frozen` with frozen copies.
+
+    Each container is copied once, then its children in the copy are replaced with their
+    frozen copies. Copies are memoized in `converted` by the id of the original, so shared
+    and cyclic references stay shared.
+    """
+    stack = [frozen]
+    while stack:
+        container = stack.pop()
+        if isinstance(container, dict):
+            setitem, children = dict.__setitem__, list(dict.items(container))
+        else:
+            setitem, children = list.__setitem__, list(enumerate(list.__iter__(container)))
+        for key, child in children:
+            frozen_child = converted.get(id(child))
+            if frozen_child is None:
+                frozen_child = _frozen_copy(child)
+                if frozen_child is child:
+                    continue
+                converted[id(child)] = frozen_child
+                stack.append(frozen_child)
+            setitem(container, key, frozen_child)
+
+
+def _frozen_copy(obj):
+    """
+    A shallow frozen copy of a dict or list that isn't already frozen, whose children
+    still need freezing; otherwise `obj` itself.
+    """
+    cls = type(obj)
+    if cls is FrozenDotDict or cls is FrozenDotList:
+        return obj
+    # bypass the constructors, which would freeze the children as well
+    if isinstance(obj, dict):
+        frozen = dict.__new__(FrozenDotDict)
+        dict.update(frozen, obj)
+        return frozen
+    if isinstance(obj, list):
+        frozen = list.__new__(FrozenDotList)
+        # list.__getitem__ copies a DotList without boxing its items
+        list.extend(frozen, list.__getitem__(obj, slice(None)))
+        return frozen
+    return obj
 
 
 def _possibly_sorted(x):
@@ -393,6 +547,12 @@ class IndentedRepr(reprlib.Repr, object):
     def repr_DotList(self, x, level):
         return self.repr_list(x, level)
 
+    def repr_FrozenDotDict(self, x, level):
+        return self.repr_dict(x, level)
+
+    def repr_FrozenDotList(self, x, level):
+        return self.repr_list(x, level)
+
     def repr_unicode(self, x, level):
         return self.repr_str(x, level)
 
@@ -0,0 +1,150 @@
+"""
+Benchmarks of reading search results through DotDict and FrozenDotDict,
+and of converting them back to plain types with asdict.
+
+Not run as part of the test suite; run with::
+
+    python -m descarteslabs.common.dotdict.tests.benchmark_dotdict
+"""
+
+from __future__ import print_function
+
+import json
+import random
+import timeit
+
+import six
+
+from descarteslabs.common.dotdict import DotDict, DotList, freeze
+
+N_FEATURES = 10000
+
+
+def search_response(n=N_FEATURES):
+    "JSON text of a metadata search response with `n` features"
+    random.seed(0)
+    features = []
+    for i in range(n):
+        x, y = random.uniform(-180, 170), random.uniform(-80, 70)
+        features.append({
+            "type": "Feature",
+            "id": "product:scene_{}".format(i),
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[x, y], [x + 1, y], [x + 1, y + 1], [x, y + 1], [x, y]]],
+            },
+            "properties": dict(
+                {"key{}".format(k): random.random() for k in range(30)},
+                acquired="2017-01-01T00:00:00Z",
+                cloud_fraction=random.random(),
+                bands=[{"name": "red"}, {"name": "nir"}],
+                geotrans=[x, 15, 0, y, 0, -15],
+            ),
+        })
+    return json.dumps(features)
+
+
+def multipolygon(n_polygons=200, n_points=200):
+    "A deeply nested GeoJSON MultiPolygon feature"
+    random.seed(0)
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "MultiPolygon",
+            "coordinates": [
+                [[[random.random(), random.random()] for _ in range(n_points)]]
+                for _ in range(n_polygons)
+            ],
+        },
+        "properties": {"id": "shape"},
+    }
+
+
+def box_everything(obj):
+    "Access every container in a DotDict or DotList, so all of them are boxed"
+    stack = [obj]
+    while stack:
+        container = stack.pop()
+        values = container.values() if isinstance(container, dict) else container
+        stack.extend(value for value in values if isinstance(value, (dict, list)))
+    return obj
+
+
+def recursive_asdict(d):
+    "DotDict.asdict as previously implemented, for comparison"
+    unboxed = {}
+    for k, v in six.iteritems(dict(d)):
+        if isinstance(v, DotDict):
+            v = recursive_asdict(v)
+        if isinstance(v, DotList):
+            v = recursive_aslist(v)
+        unboxed[k] = v
+    return unboxed
+
+
+def recursive_aslist(dotlist):
+    unboxed = list(dotlist)
+    for i, obj in enumerate(unboxed):
+        if isinstance(obj, DotList):
+            unboxed[i] = recursive_aslist(obj)
+        elif isinstance(obj, DotDict):
+            unboxed[i] = recursive_asdict(obj)
+    return unboxed
+
+
+def read(features):
+    "Read a few nested values of every feature, as typical client code does"
+    total = 0
+    for feature in features:
+        total += feature.properties.cloud_fraction
+        total += feature.geometry.coordinates[0][0][0]
+        total += len(feature.properties.bands[0].name)
+    return total
+
+
+def benchmark(name, stmt, number=3):
+    seconds = min(timeit.repeat(stmt, number=1, repeat=number))
+    print("{:<58} {:8.1f} ms".format(name, seconds * 1000))
+
+
+def main():
+    text = search_response()
+    print("{} features, {:.1f} MB of JSON\n".format(N_FEATURES, len(text) / 1e6))
+
+    benchmark("json.loads", lambda: json.loads(text))
+    benchmark("json.loads + DotList, first read", lambda: read(DotList(json.loads(text))))
+    benchmark("json.loads(object_hook=freeze) + freeze, first read", lambda: read(freeze(
+        json.loads(text, object_hook=freeze)
+    )))
+    benchmark("json.loads + freeze", lambda: freeze(json.loads(text)))
+
+    dotlist = DotList(json.loads(text))
+    read(dotlist)
+    frozen = freeze(json.loads(text))
+    benchmark("DotList, repeated read", lambda: read(dotlist))
+    benchmark("FrozenDotList, repeated read", lambda: read(frozen))
+
+    plain = json.loads(text)
+    benchmark("plain dicts, item access", lambda: sum(
+        f["properties"]["cloud_fraction"] + f["geometry"]["coordinates"][0][0][0] +
+        len(f["properties"]["bands"][0]["name"])
+        for f in plain
+    ))
+
+    benchmark("DotDict({'features': ...}).asdict()", lambda: DotDict(features=dotlist).asdict())
+    frozen_response = freeze({"features": plain})
+    benchmark("FrozenDotDict({'features': ...}).asdict()", lambda: frozen_response.asdict())
+
+    shape = multipolygon()
+    print("\nMultiPolygon of {} polygons of {} points\n".format(
+        len(shape["geometry"]["coordinates"]), len(shape["geometry"]["coordinates"][0][0])
+    ))
+    untouched = DotDict(shape)
+    boxed = box_everything(DotDict(json.loads(json.dumps(shape))))
+    benchmark("asdict, nothing boxed", lambda: untouched.asdict())
+    benchmark("asdict, everything boxed", lambda: boxed.asdict())
+    benchmark("recursive asdict, everything boxed", lambda: recursive_asdict(boxed))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,12 @@ import textwrap
 import random
 import string
 import ast
+import copy
 import json
+import pickle
 import six
 from descarteslabs.common.dotdict import DotDict, DotList, DotDict_items, DotDict_values
+from descarteslabs.common.dotdict import FrozenDotDict, FrozenDotList, freeze
 from descarteslabs.common.dotdict.dotdict import IndentedRepr, idr, untruncated_idr
 
 
@@ -380,7 +383,6 @@ class TestUnbox(unittest.TestCase):
         unboxed = obj.asdict()
         self.assertTrue(self.is_unboxed(unboxed))
 
-    @unittest.skip("results in RuntimeError since recursive structures are not handled")
     def test_recursive_container(self):
         d = DotDict({
             "a": 1,
@@ -390,6 +392,157 @@ class TestUnbox(unittest.TestCase):
         d.loop = d
         unboxed = d.asdict()
         self.assertEqual(type(unboxed["loop"]), dict)
+        self.assertIs(unboxed["loop"], unboxed)
+
+    def test_shares_plain_containers(self):
+        plain = {"x": [1, 2]}
+        d = DotDict(a=plain, b=DotList([plain]))
+        unboxed = d.asdict()
+        self.assertIs(unboxed["a"], plain)
+        self.assertIs(unboxed["b"][0], plain)
+        self.assertIs(type(unboxed["b"]), list)
+
+    def test_shared_dottypes(self):
+        shared = DotDict(x=1)
+        unboxed = DotList([shared, DotDict(y=shared)]).aslist()
+        self.assertIs(unboxed[0], unboxed[1]["y"])
+        self.assertIs(type(unboxed[0]), dict)
+
+    def test_unboxed_values_not_boxed(self):
+        d = DotList([{"a": {"b": 1}}])
+        unboxed = d.aslist()
+        # converting doesn't box anything in the original
+        self.assertIs(type(list.__getitem__(d, 0)), dict)
+        self.assertIs(unboxed[0], list.__getitem__(d, 0))
+
+    def test_deeply_nested(self):
+        obj = DotDict()
+        inner = obj
+        for _ in range(5000):
+            inner.child = DotDict()
+            inner = inner.child
+        unboxed = obj.asdict()
+        for _ in range(5000):
+            self.assertIs(type(unboxed), dict)
+            unboxed = unboxed["child"]
+
+
+class TestFrozen(unittest.TestCase):
+
+    def setUp(self):
+        self.template = {
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]},
+            "properties": {"bands": [{"name": "red"}, {"name": "nir"}], "cloud_fraction": 0.5},
+        }
+
+    def test_freeze(self):
+        d = freeze(self.template)
+        self.assertEqual(d, self.template)
+        self.assertIsInstance(d, FrozenDotDict)
+        self.assertIsInstance(d.properties, FrozenDotDict)
+        self.assertIsInstance(d.properties.bands, FrozenDotList)
+        self.assertIsInstance(d.properties.bands[1], FrozenDotDict)
+        self.assertIsInstance(d.geometry.coordinates[0][0], FrozenDotList)
+        self.assertEqual(d.properties.bands[1].name, "nir")
+        # the original is untouched
+        self.assertIs(type(self.template["properties"]["bands"][0]), dict)
+
+    def test_constructor(self):
+        for d in [FrozenDotDict(self.template), FrozenDotDict(**self.template)]:
+            self.assertEqual(d, self.template)
+            self.assertIsInstance(d.properties, FrozenDotDict)
+            self.assertIsInstance(d.properties.bands[1], FrozenDotDict)
+            self.assertIs(freeze(d), d)
+            with self.assertRaises(TypeError):
+                freeze(d).properties.bands.append(1)
+
+        bands = FrozenDotList(self.template["properties"]["bands"])
+        self.assertIsInstance(bands[0], FrozenDotDict)
+        self.assertIs(type(self.template["properties"]["bands"][0]), dict)
+
+        d = {"a": 1}
+        d["loop"] = d
+        frozen = FrozenDotDict(d)
+        self.assertIs(frozen["loop"], frozen)
+
+    def test_reads_dont_write(self):
+        d = freeze(self.template)
+        properties = d.properties
+        self.assertIs(d.properties, properties)
+        self.assertIs(d["properties"], properties)
+        self.assertIs(d.get("properties"), properties)
+        self.assertIs(dict(d.items())["properties"], properties)
+        self.assertIs(list(d.properties.bands)[0], d.properties.bands[0])
+        self.assertEqual(d.get("missing", 1), 1)
+
+    def test_read_only(self):
+        d = freeze(self.template)
+        bands = d.properties.bands
+        for modify in [
+            lambda: setattr(d, "foo", 1),
+            lambda: d.__setitem__("foo", 1),
+            lambda: delattr(d, "type"),
+            lambda: d.pop("type"),
+            lambda: d.update(foo=1),
+            lambda: d.setdefault("foo", 1),
+            lambda: d.clear(),
+            lambda: bands.append(1),
+            lambda: bands.__setitem__(0, 1),
+            lambda: bands.sort(),
+        ]:
+            with self.assertRaises(TypeError):
+                modify()
+        self.assertEqual(d, self.template)
+
+    def test_slice(self):
+        bands = freeze(self.template).properties.bands
+        self.assertIsInstance(bands[:1], FrozenDotList)
+        self.assertEqual(bands[:1], [{"name": "red"}])
+
+    def test_json(self):
+        d = json.loads(json.dumps(self.template), object_hook=freeze)
+        self.assertIsInstance(d.properties.bands, FrozenDotList)
+        self.assertEqual(json.loads(json.dumps(d)), self.template)
+
+    def test_copy_and_pickle(self):
+        d = freeze(self.template)
+        for copied in [pickle.loads(pickle.dumps(d)), copy.deepcopy(d), copy.copy(d)]:
+            self.assertIsInstance(copied, FrozenDotDict)
+            self.assertEqual(copied, self.template)
+
+    def test_asdict(self):
+        unboxed = freeze(self.template).asdict()
+        self.assertTrue(TestUnbox.is_unboxed(unboxed))
+        unboxed["type"] = "changed"
+
+    def test_deeply_nested(self):
+        obj = []
+        for _ in range(5000):
+            obj = [obj]
+        frozen = freeze(obj)
+        for _ in range(5000):
+            self.assertIsInstance(frozen, FrozenDotList)
+            frozen = frozen[0]
+
+    def test_recursive_container(self):
+        d = {"a": 1}
+        d["loop"] = d
+        d["list"] = [d]
+        frozen = freeze(d)
+        self.assertIs(frozen["loop"], frozen)
+        self.assertIs(frozen["list"][0], frozen)
+        self.assertIsInstance(frozen["list"], FrozenDotList)
+
+    def test_shared_containers(self):
+        shared = {"x": 1}
+        frozen = freeze([shared, {"y": shared}])
+        self.assertIs(frozen[0], frozen[1]["y"])
+        self.assertIsInstance(frozen[0], FrozenDotDict)
+
+    def test_non_containers(self):
+        self.assertEqual(freeze(1), 1)
+        self.assertEqual(freeze((1, {"a": 1})), (1, {"a": 1}))
 
 
 class TestDotList(unittest.TestCase):
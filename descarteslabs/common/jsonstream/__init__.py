@@ -0,0 +1 @@
+from .jsonstream import iter_array  # noqa: F401
@@ -0,0 +1,116 @@
+"""
+Incremental parsing of JSON arrays, for handling large responses with bounded memory.
+"""
+
+import codecs
+import json
+import re
+
+import six
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = "0123456789.eE+-"
+
+# parser states
+_START = "start"
+_FIRST = "first"
+_VALUE = "value"
+_NEXT = "next"
+_END = "end"
+
+
+def iter_array(chunks):
+    """
+    Generate the elements of a JSON array as its text arrives.
+
+    Each element is parsed, and yielded, as soon as the chunks containing all of it
+    have been read, so only about one element (plus one chunk) is held in memory
+    at a time, rather than the whole array and its parsed contents.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes or str
+        The JSON text of an array, in pieces of any size; for example from
+        ``response.iter_content(chunk_size)`` on a ``requests`` response made with ``stream=True``.
+        Bytes are decoded as UTF-8.
+
+    Returns
+    -------
+    generator
+        The parsed elements of the array.
+
+    Raises
+    ------
+    ValueError
+        If the text isn't a JSON array. Elements before the error are still generated.
+    """
+    chunks = iter(chunks)
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = u""
+    pos = 0
+    exhausted = False
+    state = _START
+
+    while state != _END:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if exhausted:
+                raise ValueError("Unexpected end of JSON array")
+            buffer, pos, exhausted = _read(chunks, text_decoder, buffer, pos, 1)
+            continue
+
+        char = buffer[pos]
+        if state == _START:
+            if char != "[":
+                raise ValueError("Expected a JSON array, found {!r}".format(char))
+            pos += 1
+            state = _FIRST
+        elif state == _NEXT or (state == _FIRST and char == "]"):
+            if char == "]":
+                state = _END
+            elif char == ",":
+                state = _VALUE
+            else:
+                raise ValueError("Expected ',' or ']' in JSON array, found {!r}".format(char))
+            pos += 1
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # a number may continue past what's been read so far, even if it parses
+                complete = (
+                    exhausted or
+                    isinstance(value, (dict, list, six.string_types)) or
+                    (end < len(buffer) and buffer[end] not in _NUMBER_CHARS)
+                )
+            except ValueError:
+                if exhausted:
+                    raise
+                complete = False
+
+            if not complete:
+                # read at least as much again as the partial element, so that long
+                # elements aren't parsed from the start once for every chunk
+                buffer, pos, exhausted = _read(chunks, text_decoder, buffer, pos, len(buffer) - pos)
+                continue
+
+            yield value
+            pos = end
+            state = _NEXT
+
+
+def _read(chunks, text_decoder, buffer, pos, size):
+    """
+    Append at least `size` characters from `chunks` to the unconsumed part of `buffer`,
+    or whatever is left. Returns the new buffer, position, and whether `chunks` is exhausted.
+    """
+    buffer = buffer[pos:]
+    target = len(buffer) + size
+    while len(buffer) < target:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return buffer + text_decoder.decode(b"", final=True), 0, True
+        if isinstance(chunk, six.binary_type):
+            chunk = text_decoder.decode(chunk)
+        buffer += chunk
+    return buffer, 0, False
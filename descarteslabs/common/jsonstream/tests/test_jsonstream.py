@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from descarteslabs.common.jsonstream import iter_array
+
+
+def split(text, size):
+    data = text.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.values = [
+            {"id": u"scène", "properties": {"cloud_fraction": 0.25, "bands": ["red", "nir"]}},
+            [1, 2.5, None],
+            12345,
+            u"string with ] and , inside",
+            True,
+            {},
+            -0.5e-3,
+        ]
+        self.text = json.dumps(self.values, ensure_ascii=False)
+
+    def test_chunk_sizes(self):
+        for size in [1, 2, 3, 7, 64, len(self.text) * 2]:
+            self.assertEqual(list(iter_array(split(self.text, size))), self.values, size)
+
+    def test_text_chunks(self):
+        self.assertEqual(list(iter_array([self.text[:10], self.text[10:]])), self.values)
+
+    def test_whitespace(self):
+        self.assertEqual(list(iter_array([b" \n[ 1 ,\n 2 ] \n"])), [1, 2])
+        self.assertEqual(list(iter_array([b"[", b" ", b"]"])), [])
+
+    def test_incremental(self):
+        chunks = iter([b'[{"a": 1}, {"b"', b': 2}]'])
+        values = iter_array(chunks)
+        self.assertEqual(next(values), {"a": 1})
+        # the second chunk hasn't been read yet
+        self.assertEqual(next(chunks), b': 2}]')
+
+    def test_invalid(self):
+        for text in [b"", b"{}", b"[1, 2", b"[1 2]", b"[1,]", b"[{]"]:
+            with self.assertRaises(ValueError):
+                list(iter_array(split(text.decode("utf-8"), 2)))
+
+    def test_values_before_error(self):
+        values = iter_array([b"[1, 2, oops]"])
+        self.assertEqual([next(values), next(values)], [1, 2])
+        with self.assertRaises(ValueError):
+            next(values)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+_ITEM = "item"
+_ERROR = "error"
+_DONE = "done"
+
+
+def prefetch(iterable, depth=1):
+    """
+    Iterate over `iterable` in a background thread, staying up to `depth`
+    items ahead of the consumer.
+
+    Useful when producing each item involves waiting, for example on a network
+    request: the next items are produced while the current one is consumed.
+    Exceptions raised by `iterable` are re-raised in the consumer, at the point
+    where the item would have been. If the consumer stops early (the generator
+    is closed or garbage collected), the background thread stops after
+    producing at most one more item.
+    """
+    return interleave([iterable], depth=depth)
+
+
+def interleave(iterables, depth=1):
+    """
+    Iterate over each of `iterables` in its own background thread, yielding
+    their items in the order they're produced.
+
+    At most `depth` items are held waiting for the consumer. Otherwise behaves
+    like `prefetch`; the first exception raised by any of the iterables
+    is re-raised in the consumer, and stops the other threads.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1, not {}".format(depth))
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(iterable):
+        try:
+            for item in iterable:
+                if not put((_ITEM, item)):
+                    return
+        except Exception:
+            put((_ERROR, sys.exc_info()))
+        else:
+            put((_DONE, None))
+
+    remaining = 0
+    for iterable in iterables:
+        thread = threading.Thread(target=produce, args=(iterable,))
+        thread.daemon = True
+        thread.start()
+        remaining += 1
+
+    try:
+        while remaining:
+            kind, value = items.get()
+            if kind == _ITEM:
+                yield value
+            elif kind == _ERROR:
+                six.reraise(*value)
+            else:
+                remaining -= 1
+    finally:
+        stop.set()
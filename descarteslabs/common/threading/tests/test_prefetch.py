@@ -0,0 +1,43 @@
+import threading
+import unittest
+
+from descarteslabs.common.threading.prefetch import prefetch
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_prefetch(self):
+        self.assertEqual(list(prefetch(iter(range(100)), depth=3)), list(range(100)))
+        self.assertEqual(list(prefetch([])), [])
+
+    def test_runs_ahead(self):
+        produced = []
+        ready = threading.Event()
+
+        def items():
+            for i in range(10):
+                produced.append(i)
+                if i == 3:
+                    ready.set()
+                yield i
+
+        it = prefetch(items(), depth=2)
+        self.assertEqual(next(it), 0)
+        # with 0 consumed, 1 and 2 are queued and 3 is waiting to be queued
+        self.assertTrue(ready.wait(5))
+        self.assertEqual(produced, [0, 1, 2, 3])
+        it.close()
+
+    def test_exception(self):
+        def items():
+            yield 1
+            raise KeyError("foo")
+
+        it = prefetch(items())
+        self.assertEqual(next(it), 1)
+        with self.assertRaises(KeyError):
+            next(it)
+
+    def test_invalid_depth(self):
+        with self.assertRaises(ValueError):
+            list(prefetch([1], depth=0))
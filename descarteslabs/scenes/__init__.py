@@ -142,5 +142,10 @@ from ._search import search
 from .scene import Scene
 from .collection import Collection
 from .scenecollection import SceneCollection
+from ._bands import clear_bands_cache
+from ._mask import CompactMask, CompactMaskedArray
 
-__all__ = ["Scene", "SceneCollection", "Collection", "AOI", "DLTile", "GeoContext", "search", "display"]
+__all__ = [
+    "Scene", "SceneCollection", "Collection", "AOI", "DLTile", "GeoContext", "search", "display", "clear_bands_cache",
+    "CompactMask", "CompactMaskedArray",
+]
@@ -0,0 +1,106 @@
+import logging
+import threading
+
+from cachetools import TTLCache
+
+from descarteslabs.client.addons import concurrent
+from descarteslabs.common.dotdict import freeze
+
+DEFAULT_MAXSIZE = 256
+DEFAULT_TTL = 600  # seconds
+DEFAULT_MAX_WORKERS = 8
+
+
+class ProductBandsCache(object):
+    """
+    Cache of the band metadata of products, shared by every search in the process.
+
+    The bands are stored as read-only `FrozenDotDict`s, since they're shared
+    by every Scene of the product. Entries expire after ``ttl`` seconds. They're keyed on the metadata service's URL
+    and the user's client ID as well as the product ID, since different users
+    may see different products.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self._cache = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+
+    def get(self, products, metadata_client, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Band metadata for each of ``products``, as returned by
+        ``metadata_client.get_bands_by_product``.
+
+        Products that aren't cached are requested concurrently.
+
+        Returns
+        -------
+        dict
+            Mapping of product ID to a FrozenDotDict of ``{band id: band metadata}``
+        """
+        products = list(products)
+        bands = {}
+        with self._lock:
+            for product in products:
+                try:
+                    bands[product] = self._cache[self._key(metadata_client, product)]
+                except KeyError:
+                    pass
+
+        missing = [product for product in products if product not in bands]
+        for product, product_bands in zip(missing, self._fetch(missing, metadata_client, max_workers)):
+            bands[product] = freeze(product_bands)
+
+        with self._lock:
+            for product in missing:
+                self._cache[self._key(metadata_client, product)] = bands[product]
+
+        return bands
+
+    def invalidate(self, product=None):
+        "Remove the cached bands of ``product``, or of every product if None"
+        with self._lock:
+            if product is None:
+                self._cache.clear()
+            else:
+                for key in [key for key in self._cache if key[-1] == product]:
+                    del self._cache[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cache)
+
+    @staticmethod
+    def _key(metadata_client, product):
+        return metadata_client.base_url, getattr(metadata_client.auth, "client_id", None), product
+
+    @staticmethod
+    def _fetch(products, metadata_client, max_workers):
+        if len(products) <= 1:
+            return [metadata_client.get_bands_by_product(product) for product in products]
+
+        try:
+            futures = concurrent.futures
+        except ImportError:
+            logging.warning(
+                "Failed to import concurrent.futures. Band metadata requests will be serial."
+            )
+            return [metadata_client.get_bands_by_product(product) for product in products]
+
+        with futures.ThreadPoolExecutor(max_workers=min(len(products), max_workers)) as executor:
+            return list(executor.map(metadata_client.get_bands_by_product, products))
+
+
+bands_cache = ProductBandsCache()
+
+
+def clear_bands_cache(product=None):
+    """
+    Forget the band metadata cached by `search` and `Scene.from_id`,
+    so it's requested again the next time it's needed.
+
+    Parameters
+    ----------
+    product : str, optional
+        Only forget the bands of this product ID. By default, forgets every product's bands.
+    """
+    bands_cache.invalidate(product)
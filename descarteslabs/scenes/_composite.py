@@ -0,0 +1,158 @@
+import collections
+import logging
+import warnings
+
+from descarteslabs.client.addons import concurrent, numpy as np
+
+DEFAULT_MEDIAN_SAMPLES = 32
+# each worker holds one loaded Scene, so this also bounds memory use
+DEFAULT_MAX_WORKERS = 4
+
+
+class SumReducer(object):
+    def __init__(self):
+        self.sum = None
+        self.count = None
+
+    def add(self, data, mask):
+        valid = ~mask
+        if self.sum is None:
+            self.sum = np.zeros(data.shape, dtype=np.float64)
+            self.count = np.zeros(data.shape, dtype=np.int32)
+        np.add(self.sum, data, out=self.sum, where=valid)
+        self.count += valid
+
+    def result(self):
+        return np.ma.MaskedArray(self.sum, self.count == 0)
+
+
+class MeanReducer(SumReducer):
+    def result(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.ma.MaskedArray(self.sum / self.count, self.count == 0)
+
+
+class CountReducer(SumReducer):
+    def result(self):
+        return self.count
+
+
+class MinReducer(object):
+    compare = staticmethod(np.less)
+
+    def __init__(self):
+        self.value = None
+        self.seen = None
+
+    def add(self, data, mask):
+        valid = ~mask
+        if self.value is None:
+            self.value = np.zeros(data.shape, dtype=data.dtype)
+            self.seen = np.zeros(data.shape, dtype=bool)
+        update = valid & (~self.seen | self.compare(data, self.value))
+        np.copyto(self.value, data, where=update)
+        self.seen |= valid
+
+    def result(self):
+        return np.ma.MaskedArray(self.value, ~self.seen)
+
+
+class MaxReducer(MinReducer):
+    compare = staticmethod(np.greater)
+
+
+class MedianReducer(object):
+    """
+    Approximate median, from a uniform random sample of up to ``samples`` values
+    of each pixel (reservoir sampling). Exact for pixels with ``samples``
+    or fewer values.
+
+    The sample is drawn with a fixed seed, so adding the same arrays
+    in the same order gives the same result.
+    """
+
+    def __init__(self, samples=DEFAULT_MEDIAN_SAMPLES):
+        if samples < 1:
+            raise ValueError("The number of median samples must be at least 1, not {}".format(samples))
+        self.samples = samples
+        self.reservoir = None
+        self.count = None
+        self._random = np.random.RandomState(0)
+
+    def add(self, data, mask):
+        valid = ~mask
+        if self.reservoir is None:
+            self.reservoir = np.zeros((self.samples,) + data.shape, dtype=data.dtype)
+            self.count = np.zeros(data.shape, dtype=np.int64)
+
+        # the nth value goes into the reservoir if it isn't full, otherwise replaces a
+        # random sample with probability samples / (n + 1)
+        slot = np.where(
+            self.count < self.samples,
+            self.count,
+            (self._random.random_sample(data.shape) * (self.count + 1)).astype(np.int64),
+        )
+        pixels = np.flatnonzero(valid & (slot < self.samples))
+        self.reservoir.reshape(self.samples, -1)[slot.ravel()[pixels], pixels] = data.ravel()[pixels]
+        self.count += valid
+
+    def result(self):
+        sampled = self.reservoir.astype(np.float64)
+        filled = np.arange(self.samples).reshape((-1,) + (1,) * self.count.ndim) < self.count
+        sampled[~np.broadcast_to(filled, sampled.shape)] = np.nan
+        with warnings.catch_warnings():
+            # pixels with no values are all-NaN, and are masked
+            warnings.simplefilter("ignore", RuntimeWarning)
+            median = np.nanmedian(sampled, axis=0)
+        return np.ma.MaskedArray(median, self.count == 0)
+
+
+# Each reducer folds ``(band, y, x)`` arrays into a running accumulator, one at a time:
+# ``add(data, mask)`` includes ``data`` except where ``mask`` is True, and ``result()``
+# returns the reduction of everything added so far, masked where nothing was added.
+REDUCERS = {
+    "mean": MeanReducer,
+    "sum": SumReducer,
+    "count": CountReducer,
+    "min": MinReducer,
+    "max": MaxReducer,
+    "median": MedianReducer,
+}
+
+
+def bounded_map(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Yield ``func(item)`` for each of ``items``, computed in a thread pool,
+    in the order of ``items``.
+
+    At most ``max_workers`` calls are in progress or waiting to be consumed at once,
+    so only that many results are held in memory.
+    """
+    items = iter(items)
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+
+    try:
+        futures = concurrent.futures
+    except ImportError:
+        logging.warning(
+            "Failed to import concurrent.futures. ndarray calls will be serial."
+        )
+        for item in items:
+            yield func(item)
+        return
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # results that complete out of order wait for the ones before them,
+        # but no more than `max_workers` calls are ever submitted ahead
+        pending = collections.deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
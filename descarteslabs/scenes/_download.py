@@ -17,6 +17,22 @@ def _is_path_like(dest):
     return isinstance(dest, six.string_types) or (hasattr(os, "PathLike") and isinstance(dest, os.PathLike))
 
 
+class _FileLikeWriter(object):
+    "Wraps a file-like `dest`, so errors writing to it are raised as TypeErrors"
+
+    def __init__(self, dest):
+        self.dest = dest
+
+    def write(self, data):
+        try:
+            return self.dest.write(data)
+        except Exception as e:
+            six.raise_from(
+                TypeError("Unable to write to the file-like object {} provided as `dest`:\n{}".format(self.dest, e)),
+                None
+            )
+
+
 def _format_from_path(path):
     _, ext = os.path.splitext(path)
     return _get_format(ext.lstrip("."))
@@ -60,6 +76,10 @@ def _download(inputs, bands_list, ctx, dtype, dest, format, resampler="near",
 
         format = _format_from_path(dest)
     else:
+        if not hasattr(dest, "write"):
+            raise TypeError(
+                "Unable to write to the object {} provided as `dest`: it's not a path or file-like".format(dest)
+            )
         format = _get_format(format)
 
     raster_params = ctx.raster_params
@@ -76,7 +96,10 @@ def _download(inputs, bands_list, ctx, dtype, dest, format, resampler="near",
     )
 
     try:
-        result = raster_client.raster(**full_raster_args)
+        # the file is written to `dest` as it's received, without holding it all in memory
+        result = raster_client.raster(
+            dest=dest if _is_path_like(dest) else _FileLikeWriter(dest), **full_raster_args
+        )
     except NotFoundError:
         if len(inputs) == 1:
             msg = "'{}' does not exist in the Descartes catalog".format(inputs[0])
@@ -91,22 +114,12 @@ def _download(inputs, bands_list, ctx, dtype, dest, format, resampler="near",
         msg = msg.format(err=e, args=json.dumps(full_raster_args, indent=2))
         six.raise_from(BadRequestError(msg), None)
 
-    # `result["files"]` should be a dict mapping {default_filename: bytestring}
+    # `result["files"]` should be a dict mapping {default_filename: dest}
     filenames = list(result["files"].keys())
     if len(filenames) == 0:
         raise RuntimeError("Unexpected missing results from raster call")
     elif len(filenames) > 1:
         raise RuntimeError("Unexpected multiple files returned from single raster call: {}".format(filenames))
-    else:
-        file = result["files"][filenames[0]]
 
     if _is_path_like(dest):
-        with open(dest, "wb") as f:
-            f.write(file)
         return dest
-    else:
-        # `dest` is a file-like object
-        try:
-            dest.write(file)
-        except Exception as e:
-            raise TypeError("Unable to write to the file-like object {} provided as `dest`:\n{}".format(dest, e))
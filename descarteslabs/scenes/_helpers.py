@@ -2,8 +2,11 @@ import collections
 
 import six
 import shapely.geometry
+import shapely.prepared
 import geojson
 
+from descarteslabs.client.addons import numpy as np
+
 
 def polygon_from_bounds(bounds):
     "Return a GeoJSON Polygon dict from a (minx, miny, maxx, maxy) tuple"
@@ -117,6 +120,45 @@ def geometry_like_to_shapely(geometry):
     return shape
 
 
+def coverage(shape, geometries):
+    """
+    Return the fraction of ``shape``'s area covered by each of ``geometries``, as an array.
+
+    ``shape`` is prepared once, and only geometries whose bounding boxes overlap
+    its own are tested against it. Geometries that contain its convex hull cover it
+    entirely, and geometries that don't intersect it cover none of it; an exact
+    intersection is computed only for the rest.
+    """
+    geometries = list(geometries)
+    coverages = np.zeros(len(geometries))
+    if len(geometries) == 0 or shape.is_empty:
+        return coverages
+
+    bounds = np.array([
+        geometry.bounds if not geometry.is_empty else (np.nan,) * 4
+        for geometry in geometries
+    ], dtype=float).reshape(-1, 4)
+    minx, miny, maxx, maxy = shape.bounds
+    # NaN bounds of empty geometries compare False, so they're excluded
+    candidates = np.flatnonzero(
+        (bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx) &
+        (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny)
+    )
+    if len(candidates) == 0:
+        return coverages
+
+    prepared = shapely.prepared.prep(shape)
+    hull = shape.convex_hull
+    area = shape.area
+    for i in candidates:
+        geometry = geometries[i]
+        if geometry.contains(hull):
+            coverages[i] = 1.0
+        elif prepared.intersects(geometry):
+            coverages[i] = shape.intersection(geometry).area / area
+    return coverages
+
+
 def as_geojson_geometry(geojson_dict):
     """
     Return a mapping as a GeoJSON instance, converting Feature types to Geometry types.
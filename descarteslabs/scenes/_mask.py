@@ -0,0 +1,215 @@
+from descarteslabs.client.addons import numpy as np
+
+
+def _pack(mask):
+    "Pack a boolean array of shape ``(..., y, x)`` into bits along its flattened last two axes"
+    return np.packbits(mask.reshape(mask.shape[:-2] + (-1,)), axis=-1)
+
+
+def _unpack(bits, shape):
+    "Inverse of `_pack`, for a mask of `shape`"
+    size = shape[-2] * shape[-1]
+    return np.unpackbits(bits, axis=-1)[..., :size].reshape(shape).astype(bool)
+
+
+def nodata_mask(arr, nodata_values, out=None):
+    """
+    Mask the values in each band of ``arr`` that equal one of that band's nodata values.
+
+    Bands are compared against their nodata values in one broadcast pass
+    for each run of adjacent bands that have them, writing straight into the mask.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Array of shape ``(band, ...)``
+    nodata_values : Sequence[Iterable]
+        The nodata values of each band. None values are ignored.
+    out : ndarray, optional
+        Boolean array, of the same shape as ``arr``, in which to write the mask.
+
+    Returns
+    -------
+    mask : ndarray
+        Boolean array of the same shape as ``arr``
+    """
+    if len(nodata_values) != len(arr):
+        raise ValueError("Got nodata values for {} bands, but the array has {}".format(len(nodata_values), len(arr)))
+
+    mask = np.empty(arr.shape, dtype=bool) if out is None else out
+    band_values = [sorted(set(value for value in values if value is not None)) for values in nodata_values]
+
+    start = 0
+    while start < len(arr):
+        if not band_values[start]:
+            mask[start] = False
+            start += 1
+            continue
+
+        stop = start + 1
+        while stop < len(arr) and band_values[stop]:
+            stop += 1
+
+        # bands with fewer nodata values than others in the run repeat their last one
+        run = band_values[start:stop]
+        table_shape = (stop - start,) + (1,) * (arr.ndim - 1)
+        for j in range(max(len(values) for values in run)):
+            table = np.array([values[min(j, len(values) - 1)] for values in run]).reshape(table_shape)
+            same_dtype = table.astype(arr.dtype)
+            if (same_dtype == table).all():
+                # comparing in the array's own dtype avoids upcasting the whole array
+                table = same_dtype
+            if j == 0:
+                np.equal(arr[start:stop], table, out=mask[start:stop])
+            else:
+                mask[start:stop] |= arr[start:stop] == table
+        start = stop
+
+    return mask
+
+
+class CompactMask(object):
+    """
+    A boolean mask of an array of bands, stored without a separate value for every band.
+
+    Masks loaded with ``mask_alpha`` are mostly the same in every band, so the pixels
+    masked in every band are stored once, and bands with their own ``nodata`` masks
+    store them packed 8 pixels to a byte. The full mask is only built when it's needed.
+
+    Parameters
+    ----------
+    pixels : ndarray
+        Boolean array of shape ``(..., y, x)``, of the pixels masked in every band
+    nbands : int
+        Number of bands in the masked array
+    band_bits : dict, optional
+        Mapping of band index to the mask of just that band,
+        as returned by ``CompactMask.pack``
+    bands_axis : int, default 0
+        Axis of the bands in the masked array
+    """
+
+    __slots__ = ("pixels", "nbands", "band_bits", "bands_axis")
+
+    def __init__(self, pixels, nbands, band_bits=None, bands_axis=0):
+        ndim = pixels.ndim + 1
+        if not (-ndim <= bands_axis < ndim):
+            raise ValueError("Invalid bands_axis; axis {} would not exist in a {}D array".format(bands_axis, ndim))
+
+        self.pixels = pixels
+        self.nbands = nbands
+        self.band_bits = band_bits if band_bits is not None else {}
+        self.bands_axis = bands_axis % ndim
+
+    @classmethod
+    def from_band_masks(cls, pixels, nbands, band_masks, bands_axis=0):
+        """
+        Build a CompactMask from ``pixels`` and a mapping of band index
+        to boolean mask, of shape ``(..., y, x)``, of just that band.
+
+        Band masks with nothing masked that ``pixels`` doesn't already mask aren't stored.
+        """
+        band_bits = {
+            i: cls.pack(mask)
+            for i, mask in band_masks.items()
+            if (mask & ~pixels).any()
+        }
+        return cls(pixels, nbands, band_bits, bands_axis)
+
+    @staticmethod
+    def pack(mask):
+        "Pack a boolean mask of shape ``(..., y, x)`` for use in ``band_bits``"
+        return _pack(mask)
+
+    @property
+    def shape(self):
+        return self.pixels.shape[:self.bands_axis] + (self.nbands,) + self.pixels.shape[self.bands_axis:]
+
+    @property
+    def nbytes(self):
+        return self.pixels.nbytes + sum(bits.nbytes for bits in self.band_bits.values())
+
+    def band(self, i):
+        "The mask of band ``i``, of shape ``(..., y, x)``"
+        if not (-self.nbands <= i < self.nbands):
+            raise IndexError("Band index {} is out of range for {} bands".format(i, self.nbands))
+        bits = self.band_bits.get(i % self.nbands)
+        if bits is None:
+            return self.pixels.copy()
+        return self.pixels | _unpack(bits, self.pixels.shape)
+
+    def materialize(self):
+        "The full boolean mask, as an ndarray of `shape`"
+        mask = np.empty(self.shape, dtype=bool)
+        bands_first = np.moveaxis(mask, self.bands_axis, 0)
+        bands_first[...] = self.pixels
+        for i, bits in self.band_bits.items():
+            bands_first[i] |= _unpack(bits, self.pixels.shape)
+        return mask
+
+    def __array__(self, dtype=None):
+        mask = self.materialize()
+        return mask if dtype is None else mask.astype(dtype)
+
+    def __repr__(self):
+        return "{}(shape={}, bands with their own masks: {})".format(
+            self.__class__.__name__, self.shape, sorted(self.band_bits)
+        )
+
+
+class CompactMaskedArray(object):
+    """
+    An array of bands with a `CompactMask`, as returned by `Scene.ndarray`,
+    `SceneCollection.stack` and `SceneCollection.mosaic` with ``compact_mask=True``.
+
+    Use `masked` to get a `numpy.ma.MaskedArray`, or `filled` to replace masked
+    values without building the full mask.
+
+    Attributes
+    ----------
+    data : ndarray
+        The unmasked data
+    mask : CompactMask
+        Its mask
+    """
+
+    __slots__ = ("data", "mask")
+
+    def __init__(self, data, mask):
+        if data.shape != mask.shape:
+            raise ValueError("Shape {} of the mask differs from shape {} of the data".format(mask.shape, data.shape))
+        self.data = data
+        self.mask = mask
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def ndim(self):
+        return self.data.ndim
+
+    def __len__(self):
+        return len(self.data)
+
+    def masked(self):
+        "The data as a `numpy.ma.MaskedArray`, with the full mask built from the compact one"
+        return np.ma.MaskedArray(self.data, self.mask.materialize(), copy=False)
+
+    def filled(self, fill_value):
+        "A copy of the data, with masked values replaced by ``fill_value``"
+        filled = self.data.copy()
+        bands_first = np.moveaxis(filled, self.mask.bands_axis, 0)
+        for i in range(self.mask.nbands):
+            mask = self.mask.band(i) if i in self.mask.band_bits else self.mask.pixels
+            bands_first[i][mask] = fill_value
+        return filled
+
+    def __repr__(self):
+        return "{}(shape={}, dtype={}, mask={!r})".format(
+            self.__class__.__name__, self.shape, self.dtype, self.mask
+        )
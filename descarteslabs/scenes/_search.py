@@ -15,15 +15,19 @@
 import six
 import collections
 import datetime
+import itertools
 
 from descarteslabs.client.services.raster import Raster
 from descarteslabs.client.services.metadata import Metadata
 
+from ._bands import bands_cache
 from .scene import Scene
 from .scenecollection import SceneCollection
 from . import geocontext
 
 MAX_RESULT_WINDOW = 10000
+# when searching all products, the bands of every product among this many first results are requested at once
+BANDS_PREFETCH_WINDOW = 1000
 
 
 def search(aoi,
@@ -83,7 +87,8 @@ def search(aoi,
         with non-default auth and parameters.
     metadata_client : Metadata, optional
         Unneeded in general use; lets you use a specific client instance
-        with non-default auth and parameters.
+        with non-default auth and parameters. Results are only streamed
+        from a `Metadata` instance; other clients' ``search`` isn't passed ``stream``.
 
     Returns
     -------
@@ -144,18 +149,35 @@ def search(aoi,
         randomize=randomize
     )
 
+    product_bands = {}
+
+    def product_bands_of(product):
+        if product not in product_bands:
+            bands = bands_cache.get([product], metadata_client)[product]
+            product_bands[product] = Scene._scenes_bands_dict(bands)
+        return product_bands[product]
+
+    if isinstance(metadata_client, Metadata):
+        # construct each Scene as soon as its metadata arrives, rather than parsing the whole response first
+        metadata_params["stream"] = True
     metadata = metadata_client.search(**metadata_params)
+    features = iter(metadata["features"])
+
     if products is None:
-        products = {meta["properties"]["product"] for meta in metadata["features"]}
+        # the products aren't known until results arrive; rather than requesting their bands
+        # one at a time as each is first seen, request those of the first results all at once
+        first_features = list(itertools.islice(features, BANDS_PREFETCH_WINDOW))
+        prefetch_products = sorted(set(meta["properties"]["product"] for meta in first_features))
+        features = itertools.chain(first_features, features)
+    else:
+        prefetch_products = products
 
-    product_bands = {
-        product: Scene._scenes_bands_dict(metadata_client.get_bands_by_product(product))
-        for product in products
-    }
+    for product, bands in six.iteritems(bands_cache.get(prefetch_products, metadata_client)):
+        product_bands[product] = Scene._scenes_bands_dict(bands)
 
     scenes = SceneCollection(
-        (Scene(meta, product_bands[meta["properties"]["product"]])
-            for meta in metadata["features"]),
+        (Scene(meta, product_bands_of(meta["properties"]["product"]))
+            for meta in features),
         raster_client=raster_client
     )
 
@@ -0,0 +1,128 @@
+import math
+import warnings
+
+import six
+import shapely.geometry
+
+from descarteslabs.client.addons import numpy as np
+
+from . import _helpers
+from .geocontext import AOI
+
+
+class Window(object):
+    """
+    A rectangle of pixels in the output grid of a GeoContext,
+    and the `AOI` to load exactly those pixels.
+
+    ``ctx`` is None if the window doesn't intersect the GeoContext's geometry at all.
+    """
+
+    __slots__ = ("rows", "cols", "ctx")
+
+    def __init__(self, rows, cols, ctx):
+        self.rows = rows
+        self.cols = cols
+        self.ctx = ctx
+
+    @property
+    def shape(self):
+        return (self.rows.stop - self.rows.start, self.cols.stop - self.cols.start)
+
+    def view(self, arr, bands_axis=None):
+        """
+        The part of ``arr``, a raster of the whole GeoContext, covered by this window.
+        If ``bands_axis`` is given, ``arr`` is 3D with bands along that axis,
+        otherwise it's a 2D ``(y, x)`` array.
+        """
+        if bands_axis is None:
+            return arr[self.rows, self.cols]
+        bands_first = np.moveaxis(arr, bands_axis, 0)
+        return np.moveaxis(bands_first[:, self.rows, self.cols], 0, bands_axis)
+
+
+def output_grid(ctx):
+    """
+    The output pixel grid of an `AOI` whose bounds are in its output CRS,
+    as ``(minx, maxy, xres, yres, rows, cols)``, replicating how the raster service
+    resolves its bounds, resolution or shape, and ``align_pixels``.
+
+    Raises ValueError if the grid can't be determined without reprojecting.
+    """
+    if not isinstance(ctx, AOI):
+        raise ValueError("Only AOI GeoContexts can be tiled, not {}".format(type(ctx).__name__))
+    # ensures every parameter is set
+    ctx.raster_params
+    if ctx.bounds_crs != ctx.crs:
+        raise ValueError(
+            "To be tiled, an AOI's bounds must be in its output CRS, but its bounds_crs is {!r} "
+            "and its crs is {!r}. Try `ctx.assign(bounds=<bounds in {}>, bounds_crs={!r})`.".format(
+                ctx.bounds_crs, ctx.crs, ctx.crs, ctx.crs
+            )
+        )
+
+    minx, miny, maxx, maxy = ctx.bounds
+    if ctx.shape is not None:
+        rows, cols = ctx.shape
+        xres = (maxx - minx) / cols
+        yres = (maxy - miny) / rows
+    else:
+        xres = yres = ctx.resolution
+        if ctx.align_pixels:
+            minx = math.floor(minx / xres) * xres
+            miny = math.floor(miny / yres) * yres
+            maxx = math.ceil(maxx / xres) * xres
+            maxy = math.ceil(maxy / yres) * yres
+            cols = int(round((maxx - minx) / xres))
+            rows = int(round((maxy - miny) / yres))
+        else:
+            # GDAL rounds to the nearest whole number of pixels, anchored at the top-left corner
+            cols = max(1, int((maxx - minx) / xres + 0.5))
+            rows = max(1, int((maxy - miny) / yres + 0.5))
+
+    return minx, maxy, xres, yres, rows, cols
+
+
+def windows(ctx, tile_size):
+    """
+    Split an `AOI` into windows of at most ``tile_size`` by ``tile_size`` pixels,
+    aligned to its output pixel grid, in row-major order.
+
+    Returns
+    -------
+    shape : tuple
+        The ``(rows, cols)`` shape of the whole output grid
+    windows : List[Window]
+    """
+    if not isinstance(tile_size, six.integer_types + (np.integer,)) or tile_size < 1:
+        raise ValueError("tile_size must be a positive integer number of pixels, not {!r}".format(tile_size))
+
+    minx, maxy, xres, yres, rows, cols = output_grid(ctx)
+    geometry = ctx.geometry
+    check_geometry = geometry is not None and _helpers.is_wgs84_crs(ctx.crs)
+
+    tiles = []
+    for row in range(0, rows, tile_size):
+        for col in range(0, cols, tile_size):
+            row_stop = min(row + tile_size, rows)
+            col_stop = min(col + tile_size, cols)
+            bounds = (minx + col * xres, maxy - row_stop * yres, minx + col_stop * xres, maxy - row * yres)
+
+            if check_geometry and not shapely.geometry.box(*bounds).intersects(geometry):
+                # the AOI would refuse bounds that don't intersect its geometry; nothing would be loaded anyway
+                window_ctx = None
+            else:
+                with warnings.catch_warnings():
+                    # any warnings about the bounds were already given for `ctx`
+                    warnings.simplefilter("ignore")
+                    window_ctx = AOI(
+                        geometry=geometry,
+                        crs=ctx.crs,
+                        bounds=bounds,
+                        bounds_crs=ctx.crs,
+                        shape=(row_stop - row, col_stop - col),
+                        align_pixels=False,
+                    )
+            tiles.append(Window(slice(row, row_stop), slice(col, col_stop), window_ctx))
+
+    return (rows, cols), tiles
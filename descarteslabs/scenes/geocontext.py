@@ -134,6 +134,7 @@ import warnings
 from six.moves import reprlib
 
 from descarteslabs.client.services.raster import Raster
+from descarteslabs.common import dltile as dltile_grid
 
 from . import _helpers
 
@@ -704,7 +705,7 @@ class DLTile(GeoContext):
         return cls(tile)
 
     @classmethod
-    def from_shape(cls, shape, resolution, tilesize, pad, raster_client=None):
+    def from_shape(cls, shape, resolution, tilesize, pad, raster_client=None, local=False):
         # TODO : non-overlapping tiles across UTM zones
         """
         Return a list of DLTiles that intersect the given geometry
@@ -724,11 +725,18 @@ class DLTile(GeoContext):
         raster_client : descarteslabs.client.services.Raster, optional, default None
             Unneeded in general use; lets you use a specific client instance
             with non-default auth and parameters.
+        local : bool, default False
+            If True, compute the tiles locally (see `DLTile.iter_from_shape`)
+            instead of requesting them from the Descartes Labs platform,
+            and ignore ``raster_client``. Requires numpy.
 
         Returns
         -------
         tiles : List[DLTile]
         """
+        if local:
+            return list(cls.iter_from_shape(shape, resolution, tilesize, pad))
+
         if raster_client is None:
             raster_client = Raster()
 
@@ -738,6 +746,35 @@ class DLTile(GeoContext):
         tiles_fc = raster_client.dltiles_from_shape(resolution=resolution, tilesize=tilesize, pad=pad, shape=shape)
         return [cls(tile) for tile in tiles_fc["features"]]
 
+    @classmethod
+    def iter_from_shape(cls, shape, resolution, tilesize, pad):
+        """
+        Generate the DLTiles that intersect the given geometry, one at a time.
+
+        The tiles are computed locally rather than by the Descartes Labs platform,
+        and only one row of the tiling grid is held in memory at a time, so this can
+        enumerate millions of tiles covering very large areas. Requires numpy.
+
+        Parameters
+        ----------
+        shape : GeoJSON-like
+            A GeoJSON dict, or object with a __geo_interface__. Must be in
+            EPSG:4326 (WGS84 lat-lon) projection.
+        resolution : float
+            Distance, in meters, that the edge of each pixel represents on the ground
+        tilesize : int
+            Length of each side of the tile, in pixels
+        pad : int
+            Number of extra pixels by which each side of the tile is buffered.
+            This determines the number of pixels by which two tiles overlap.
+
+        Returns
+        -------
+        tiles : Iterator[DLTile]
+        """
+        for tile in dltile_grid.iter_dltiles_from_shape(shape, resolution, tilesize, pad):
+            yield cls(tile)
+
     @classmethod
     def from_key(cls, dltile_key, raster_client=None):
         """
@@ -44,6 +44,7 @@ from __future__ import division
 import six
 import json
 import datetime
+import threading
 import warnings
 
 import shapely.geometry
@@ -54,13 +55,20 @@ from descarteslabs.client.addons import numpy as np
 from descarteslabs.client.services.raster import Raster
 from descarteslabs.client.services.metadata import Metadata
 from descarteslabs.client.exceptions import NotFoundError, BadRequestError
-from descarteslabs.common.dotdict import DotDict
+from descarteslabs.common.dotdict import DotDict, FrozenDotDict, freeze
 
 from . import geocontext
+from ._bands import bands_cache
+from ._mask import CompactMask, CompactMaskedArray, nodata_mask
 from . import _download
 from . import _helpers
 
 
+# guards building the geometry and properties of Scenes, which may first be read
+# from several threads at once (as by SceneCollection.stack)
+_build_lock = threading.Lock()
+
+
 def _strptime_helper(s):
     formats = [
         '%Y-%m-%dT%H:%M:%S.%fZ',
@@ -109,6 +117,9 @@ class Scene(object):
             Band names are either the band's ``name`` field (like "red"),
             or for derived bands, the band's ``id`` (like "derived:ndvi").
 
+            Scenes returned by `search <scenes._search.search>` share their product's bands
+            as a read-only ``FrozenDotDict``; use ``bands.asdict()`` for a copy you can modify.
+
             Each band metadata dict should contain these fields:
 
             * ``id`` : str
@@ -148,6 +159,8 @@ class Scene(object):
                 Units of the wavelength fields, such as ``"nm"``
     """
 
+    __slots__ = ("_feature", "_bands_dict", "_geometry", "_properties")
+
     def __init__(self, scene_dict, bands_dict):
         """
         ``__init__`` instantiates a Scene from a dict returned by `Metadata.search`
@@ -155,10 +168,44 @@ class Scene(object):
 
         It's preferred to use `Scene.from_id` or `scenes.search <scenes._search.search>` instead.
         """
-        self.geometry = shapely.geometry.shape(scene_dict["geometry"])
-        properties = scene_dict["properties"]
-        properties["id"] = scene_dict["id"]
-        properties["bands"] = self._scenes_bands_dict(bands_dict)
+        # the geometry and properties are built from the feature when first accessed
+        self._feature = scene_dict
+        self._bands_dict = bands_dict
+        self._geometry = None
+        self._properties = None
+
+    @property
+    def geometry(self):
+        if self._geometry is None:
+            with _build_lock:
+                if self._geometry is None:
+                    self._geometry = shapely.geometry.shape(self._feature["geometry"])
+                    self._release_feature()
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry):
+        self._geometry = geometry
+
+    @property
+    def properties(self):
+        if self._properties is None:
+            with _build_lock:
+                if self._properties is None:
+                    self._properties = self._build_properties()
+                    self._bands_dict = None
+                    self._release_feature()
+        return self._properties
+
+    @properties.setter
+    def properties(self, properties):
+        self._properties = properties
+
+    def _build_properties(self):
+        "The properties of the Scene, built from a copy of those of its feature"
+        properties = DotDict(self._feature["properties"])
+        properties["id"] = self._feature["id"]
+        properties["bands"] = self._scenes_bands_dict(self._bands_dict)
         properties["crs"] = (properties.pop("cs_code")
                              if "cs_code" in properties
                              else properties.get("proj4"))
@@ -168,7 +215,19 @@ class Scene(object):
         else:
             properties["date"] = None
 
-        self.properties = properties
+        return properties
+
+    def _release_feature(self):
+        "Drop the feature once everything has been built from it; call with `_build_lock` held"
+        if self._geometry is not None and self._properties is not None:
+            self._feature = None
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in Scene.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in six.iteritems(state):
+            setattr(self, name, value)
 
     @classmethod
     def from_id(cls, scene_id, metadata_client=None):
@@ -177,6 +236,9 @@ class Scene(object):
 
         Also returns a GeoContext for loading the Scene's original, unwarped data.
 
+        The band metadata of the Scene's product is cached for the rest of the session
+        (see `clear_bands_cache <descarteslabs.scenes._bands.clear_bands_cache>`).
+
         Parameters
         ----------
         scene_id: str
@@ -226,7 +288,12 @@ class Scene(object):
             "properties": metadata
         }
 
-        bands = metadata_client.get_bands_by_id(scene_id)
+        product = metadata["properties"].get("product")
+        if product is not None:
+            # the cached bands are shared and read-only; a single Scene can have its own copy
+            bands = bands_cache.get([product], metadata_client)[product].asdict()
+        else:
+            bands = metadata_client.get_bands_by_id(scene_id)
         scene = cls(metadata, bands)
 
         return scene, scene.default_ctx()
@@ -332,8 +399,7 @@ class Scene(object):
         else:
             shape = _helpers.geometry_like_to_shapely(geom)
 
-        intersection = shape.intersection(self.geometry)
-        return intersection.area / shape.area
+        return _helpers.coverage(shape, [self.geometry])[0]
 
     def ndarray(self,
                 bands,
@@ -344,7 +410,9 @@ class Scene(object):
                 raster_info=False,
                 resampler="near",
                 processing_level=None,
-                raster_client=None
+                raster_client=None,
+                out=None,
+                compact_mask=False,
                 ):
         """
         Load bands from this scene as an ndarray, optionally masking invalid data.
@@ -392,13 +460,28 @@ class Scene(object):
         raster_client : Raster, optional
             Unneeded in general use; lets you use a specific client instance
             with non-default auth and parameters.
+        out : ndarray or callable, optional
+            Array into which to write the data, such as one level of a larger stack
+            or a ``np.memmap``, with the same shape as the returned array would have.
+            Data is written into it without an intermediate copy of the whole array,
+            except when the alpha band is loaded only for masking.
+            May also be a callable ``out(shape, dtype)`` returning such an array,
+            which is called once the shape of the data is known.
+        compact_mask : bool, default False
+            If True, and ``mask_nodata`` or ``mask_alpha`` is True, return a
+            `CompactMaskedArray` instead of a masked array. Its mask stores the pixels
+            masked by alpha once for all bands, and only the bands that have a ``nodata``
+            value get their own (bit-packed) masks. Call its ``masked()`` method
+            to get a masked array.
 
         Returns
         -------
         arr : ndarray
             Returned array's shape will be ``(band, y, x)`` if bands_axis is 0,
             ``(y, x, band)`` if bands_axis is -1
-            If ``mask_nodata`` or ``mask_alpha`` is True, arr will be a masked array.
+            If ``mask_nodata`` or ``mask_alpha`` is True, arr will be a masked array,
+            or a `CompactMaskedArray` if ``compact_mask`` is True.
+            If ``out`` is given, the data is a view of it.
         raster_info : dict
             If ``raster_info=True``, a raster information dict is also returned.
 
@@ -449,6 +532,27 @@ class Scene(object):
                 if alpha_i != len(bands) - 1:
                     raise ValueError("Alpha must be the last band in order to reduce rasterization errors")
                 drop_alpha = False
+        else:
+            drop_alpha = False
+
+        raster_out = None
+        if out is not None:
+            def bands_first_out(shape, dtype):
+                # `shape` is the ``(band, y, x)`` shape of the data, excluding any dropped alpha band
+                out_shape = shape[1:]
+                out_shape = out_shape[:bands_axis % 3] + shape[:1] + out_shape[bands_axis % 3:]
+                target = out(out_shape, dtype) if callable(out) else out
+                if target.shape != out_shape:
+                    raise ValueError("`out` must have shape {}, not {}".format(out_shape, target.shape))
+                return np.moveaxis(target, bands_axis, 0)
+
+            if not drop_alpha:
+                def gdal_order_out(shape, dtype):
+                    # Raster.ndarray returns a 2D array for a single band
+                    target = bands_first_out(tuple(shape) if len(shape) == 3 else (1,) + tuple(shape), dtype)
+                    return target if len(shape) == 3 else target[0]
+
+                raster_out = gdal_order_out
 
         raster_params = ctx.raster_params
         full_raster_args = dict(
@@ -463,7 +567,7 @@ class Scene(object):
         )
 
         try:
-            arr, info = raster_client.ndarray(**full_raster_args)
+            arr, info = raster_client.ndarray(out=raster_out, **full_raster_args)
         except NotFoundError:
             six.raise_from(
                 NotFoundError("'{}' does not exist in the Descartes catalog".format(self.properties["id"])), None
@@ -480,20 +584,38 @@ class Scene(object):
             # if only 1 band requested, still return a 3d array
             arr = arr[np.newaxis]
 
-        if mask_nodata or mask_alpha:
-            if mask_alpha:
-                alpha = arr[-1]
-                if drop_alpha:
-                    arr = arr[:-1]
-                    bands.pop(-1)
-
-            mask = np.zeros_like(arr, dtype=bool)
-
+        if drop_alpha:
+            alpha = arr[-1]
+            arr = arr[:-1]
+            bands.pop(-1)
+            if out is not None:
+                target = bands_first_out(arr.shape, arr.dtype)
+                target[...] = arr
+                arr = target
+        elif mask_alpha:
+            alpha = arr[-1]
+
+        if (mask_nodata or mask_alpha) and compact_mask:
+            band_masks = {}
             if mask_nodata:
                 for i, bandname in enumerate(bands):
                     nodata = self_bands[bandname].get('nodata')
                     if nodata is not None:
-                        mask[i] = arr[i] == nodata
+                        band_masks[i] = arr[i] == nodata
+
+            pixels = alpha == 0 if mask_alpha else np.zeros(arr.shape[1:], dtype=bool)
+            mask = CompactMask.from_band_masks(pixels, len(arr), band_masks, bands_axis)
+            arr = CompactMaskedArray(np.moveaxis(arr, 0, bands_axis), mask)
+            if raster_info:
+                return arr, info
+            else:
+                return arr
+
+        if mask_nodata or mask_alpha:
+            if mask_nodata:
+                mask = nodata_mask(arr, [[self_bands[bandname].get('nodata')] for bandname in bands])
+            else:
+                mask = np.zeros_like(arr, dtype=bool)
 
             if mask_alpha:
                 mask |= alpha == 0
@@ -728,7 +850,19 @@ class Scene(object):
         """
         Convert bands dict from metadata client ({id: band_meta})
         to {<name, or ID if derived>: band_meta}
+
+        A `FrozenDotDict` that's already in that form is returned as-is, so Scenes
+        of the same product can share one bands dict without being able to modify it.
+        Other FrozenDotDicts give a FrozenDotDict, and anything else gives a new DotDict.
         """
+        if isinstance(metadata_bands, FrozenDotDict):
+            if all(id.startswith("derived") or id == meta["name"] for id, meta in six.iteritems(metadata_bands)):
+                return metadata_bands
+            return freeze({
+                id if id.startswith("derived") else meta["name"]: meta
+                for id, meta in six.iteritems(metadata_bands)
+            })
+
         return DotDict({
             id if id.startswith("derived") else meta["name"]: meta
             for id, meta in six.iteritems(metadata_bands)
@@ -107,11 +107,17 @@ import os.path
 from descarteslabs.client.addons import concurrent, numpy as np
 
 from descarteslabs.client.services.raster import Raster
+from descarteslabs.client.services.raster.raster import StackAllocator
 from descarteslabs.client.exceptions import NotFoundError, BadRequestError
 
 from .collection import Collection
 from .scene import Scene
+from ._composite import DEFAULT_MEDIAN_SAMPLES, REDUCERS, bounded_map
+from ._mask import CompactMask, CompactMaskedArray, nodata_mask
+from . import geocontext
 from . import _download
+from . import _helpers
+from . import _tiling
 
 
 class SceneCollection(Collection):
@@ -170,7 +176,43 @@ class SceneCollection(Collection):
         >>> assert len(filtered_scenes) < len(scenes)  # doctest: +SKIP
         """
 
-        return self.filter(lambda scene: scene.coverage(geom) >= minimum_coverage)
+        return self[np.flatnonzero(self.coverage(geom) >= minimum_coverage)]
+
+    def coverage(self, geom):
+        """
+        The fraction of a geometry-like object covered by each Scene's geometry.
+
+        Equivalent to calling `Scene.coverage <descarteslabs.scenes.scene.Scene.coverage>`
+        on every Scene, but ``geom`` is converted and prepared only once, and Scenes
+        whose bounding boxes don't overlap it are skipped.
+
+        Parameters
+        ----------
+        geom : GeoJSON-like dict, GeoContext, or object with __geo_interface__
+            Geometry to which to compare each Scene's geometry.
+
+        Returns
+        -------
+        coverage : ndarray
+            1D float array with the fraction of ``geom``'s area that overlaps with
+            each Scene, between 0 and 1, in the same order as the Scenes.
+
+        Example
+        -------
+        >>> import descarteslabs as dl
+        >>> aoi_geometry = {
+        ...    'type': 'Polygon',
+        ...    'coordinates': [[[-95, 42],[-93, 42],[-93, 40],[-95, 41],[-95, 42]]]}
+        >>> scenes, ctx = dl.scenes.search(aoi_geometry, products=["landsat:LC08:PRE:TOAR"], limit=20)
+        >>> scenes.coverage(ctx)  # doctest: +SKIP
+        array([0.57, 0.57, 1.  , 0.98, ...])
+        """
+        if isinstance(geom, geocontext.GeoContext):
+            shape = geom.geometry
+        else:
+            shape = _helpers.geometry_like_to_shapely(geom)
+
+        return _helpers.coverage(shape, (scene.geometry for scene in self))
 
     def stack(self,
               bands,
@@ -183,6 +225,9 @@ class SceneCollection(Collection):
               resampler="near",
               processing_level=None,
               max_workers=None,
+              out_file=None,
+              compact_mask=False,
+              tile_size=None,
               ):
         """
         Load bands from all scenes and stack them into a 4D ndarray,
@@ -253,13 +298,40 @@ class SceneCollection(Collection):
             multiplied by 5.
             Note that unnecessary threads *won't* be created if ``max_workers``
             is greater than the number of Scenes in the SceneCollection.
+        out_file : str, optional
+            Path of a ``.npy`` file in which to build the stack as a memory-mapped
+            array, instead of in memory. Each Scene is written into the file as
+            it's loaded, so stacks larger than memory can be built.
+            If the stack is masked, the mask is written to a sibling ``.npy`` file,
+            with ``_mask`` appended to the name (``stack.npy`` -> ``stack_mask.npy``).
+            Either can be reopened later with ``np.load(path, mmap_mode="r")``.
+        compact_mask : bool, default False
+            If True, and ``mask_nodata`` or ``mask_alpha`` is True, return a
+            `CompactMaskedArray` instead of a masked array, as with
+            `Scene.ndarray <descarteslabs.scenes.scene.Scene.ndarray>`.
+            Its mask takes 1/N of the memory of a full mask of N bands when only
+            alpha is masked, and a further 1/8 of it for each band with a ``nodata`` value.
+            A compact mask is always kept in memory, even if ``out_file`` is given.
+        tile_size : int, optional
+            Load each Scene in windows of at most ``tile_size`` by ``tile_size`` pixels,
+            instead of all at once, and assemble them into the stack. The windows are
+            aligned to the pixel grid of ``ctx``, and loaded concurrently with each other
+            and with other Scenes, so large areas load faster and without requests
+            that time out; a failed request is only retried for its window.
+
+            ``ctx`` must be an `AOI` whose ``bounds_crs`` is its ``crs``.
+            With ``raster_info=True``, the raster information of each Scene
+            is that of its first window, in row-major order, that intersects
+            the geometry of ``ctx``.
 
         Returns
         -------
         arr : ndarray
             Returned array's shape is ``(scene, band, y, x)`` if bands_axis is 1,
             or ``(scene, y, x, band)`` if bands_axis is -1.
-            If ``mask_nodata`` or ``mask_alpha`` is True, arr will be a masked array.
+            If ``mask_nodata`` or ``mask_alpha`` is True, arr will be a masked array,
+            or a `CompactMaskedArray` if ``compact_mask`` is True.
+            If ``out_file`` is given, arr (and its mask) will be backed by `numpy.memmap`.
         raster_info : List[dict]
             If ``raster_info=True``, a list of raster information dicts for each scene
             is also returned
@@ -271,6 +343,7 @@ class SceneCollection(Collection):
             or are invalid.
             If not all required parameters are specified in the GeoContext.
             If the SceneCollection is empty.
+            If ``tile_size`` is given and ``ctx`` can't be tiled.
         NotFoundError
             If a Scene's ID cannot be found in the Descartes Labs catalog
         BadRequestError
@@ -286,6 +359,7 @@ class SceneCollection(Collection):
             raster_info=raster_info,
             resampler=resampler,
             processing_level=processing_level,
+            compact_mask=compact_mask,
         )
 
         if bands_axis == 0 or bands_axis == -4:
@@ -303,8 +377,9 @@ class SceneCollection(Collection):
         else:
             scenes = self
 
-        full_stack = None
         mask = None
+        pixels = None
+        band_bits = {}
         if raster_info:
             raster_infos = [None] * len(scenes)
 
@@ -318,52 +393,133 @@ class SceneCollection(Collection):
         if pop_alpha:
             bands.pop(-1)
 
+        # each Scene is loaded directly into its level of the stack, or into windows of it
+        level_bands_axis = kwargs['bands_axis']
+        allocator = StackAllocator(len(scenes), bands_axis=level_bands_axis, filename=out_file)
+        if out_file is not None:
+            root, ext = os.path.splitext(out_file)
+            mask_file = root + "_mask" + ext
+        else:
+            mask_file = None
+
+        if tile_size is None:
+            windows = [None]
+        else:
+            grid_shape, windows = _tiling.windows(ctx, tile_size)
+            level_shape = grid_shape[:level_bands_axis % 3] + (len(bands),) + grid_shape[level_bands_axis % 3:]
+            empty_windows = [window for window in windows if window.ctx is None]
+            windows = [window for window in windows if window.ctx is not None]
+            # the band masks of a tiled compact mask are assembled unpacked, and packed at the end
+            band_masks = {}
+
+        def level_of(i, window, dtype):
+            "The part of level `i` of the stack covered by `window`"
+            if window is None:
+                return None
+            return window.view(allocator.level(i, level_shape, dtype), level_bands_axis)
+
         def threaded_ndarrays():
-            def data_loader(scene_or_scenecollection, bands, ctx, **kwargs):
-                ndarray_kwargs = dict(kwargs, raster_client=self._raster_client)
+            def data_loader(scene_or_scenecollection, i, window, bands, ctx, **kwargs):
+                if window is None:
+                    out = allocator.out(i)
+                else:
+                    ctx = window.ctx
+
+                    def out(shape, dtype):
+                        return level_of(i, window, dtype)
+
+                ndarray_kwargs = dict(kwargs, out=out, raster_client=self._raster_client)
                 if isinstance(scene_or_scenecollection, self.__class__):
                     return lambda: scene_or_scenecollection.mosaic(bands, ctx, **kwargs)
                 else:
                     return lambda: scene_or_scenecollection.ndarray(bands, ctx, **ndarray_kwargs)
 
+            jobs = [(i, window) for i in range(len(scenes)) for window in windows]
             try:
                 futures = concurrent.futures
             except ImportError:
                 logging.warning(
                     "Failed to import concurrent.futures. ndarray calls will be serial."
                 )
-                for i, scene_or_scenecollection in enumerate(scenes):
-                    yield i, data_loader(scene_or_scenecollection, bands, ctx, **kwargs)()
+                for i, window in jobs:
+                    yield i, window, data_loader(scenes[i], i, window, bands, ctx, **kwargs)()
             else:
                 with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
                     future_ndarrays = {}
-                    for i, scene_or_scenecollection in enumerate(scenes):
-                        future_ndarray = executor.submit(data_loader(scene_or_scenecollection, bands, ctx, **kwargs))
-                        future_ndarrays[future_ndarray] = i
+                    for i, window in jobs:
+                        future_ndarray = executor.submit(
+                            data_loader(scenes[i], i, window, bands, ctx, **kwargs)
+                        )
+                        future_ndarrays[future_ndarray] = i, window
                     for future in futures.as_completed(future_ndarrays):
-                        i = future_ndarrays[future]
+                        i, window = future_ndarrays[future]
                         result = future.result()
-                        yield i, result
+                        yield i, window, result
+
+        def view(arr, window, bands_axis=None):
+            return arr if window is None else window.view(arr, bands_axis)
 
-        for i, arr in threaded_ndarrays():
+        for i, window, arr in threaded_ndarrays():
             if raster_info:
                 arr, raster_meta = arr
-                raster_infos[i] = raster_meta
+                # windows outside the geometry of `ctx` aren't loaded, so the first loaded one is used
+                if window is None or window is windows[0]:
+                    raster_infos[i] = raster_meta
 
-            if full_stack is None:
-                stack_shape = (len(scenes),) + arr.shape
-                full_stack = np.empty(stack_shape, dtype=arr.dtype)
-                if isinstance(arr, np.ma.MaskedArray):
-                    mask = np.empty(stack_shape, dtype=bool)
-
-            if isinstance(arr, np.ma.MaskedArray):
-                full_stack[i] = arr.data
-                mask[i] = arr.mask
+            if window is None:
+                level = allocator.level(i, arr.shape, arr.dtype)
             else:
-                full_stack[i] = arr
-
+                level = level_of(i, window, arr.dtype)
+
+            if isinstance(arr, CompactMaskedArray):
+                if pixels is None:
+                    pixels_shape = arr.mask.pixels.shape if window is None else grid_shape
+                    pixels = np.empty((len(scenes),) + pixels_shape, dtype=bool)
+                view(pixels[i], window)[...] = arr.mask.pixels
+                for band, bits in six.iteritems(arr.mask.band_bits):
+                    if window is None:
+                        if band not in band_bits:
+                            band_bits[band] = np.zeros((len(scenes),) + bits.shape, dtype=bits.dtype)
+                        band_bits[band][i] = bits
+                    else:
+                        if band not in band_masks:
+                            band_masks[band] = np.zeros(pixels.shape, dtype=bool)
+                        window.view(band_masks[band][i])[...] = arr.mask.band(band)
+                arr = arr.data
+            elif isinstance(arr, np.ma.MaskedArray):
+                if mask is None:
+                    mask = allocator.empty(allocator.stack.shape, bool, mask_file)
+                view(mask[i], window, level_bands_axis)[...] = np.ma.getmaskarray(arr)
+                arr = arr.data
+
+            if not np.may_share_memory(level, arr):
+                # mosaics of flattened groups aren't loaded into the stack directly
+                level[...] = arr
+
+        if tile_size is not None:
+            # windows entirely outside the geometry of `ctx` weren't loaded; they're empty and masked
+            for i in range(len(scenes)):
+                for window in empty_windows:
+                    window.view(allocator.stack[i], level_bands_axis)[...] = 0
+                    if mask is not None:
+                        window.view(mask[i], level_bands_axis)[...] = True
+                    if pixels is not None:
+                        window.view(pixels[i])[...] = True
+            band_bits = {
+                band: CompactMask.pack(band_mask) for band, band_mask in six.iteritems(band_masks)
+            }
+
+        full_stack = allocator.stack
+        if out_file is not None:
+            full_stack.flush()
+            if mask is not None:
+                mask.flush()
         if mask is not None:
             full_stack = np.ma.MaskedArray(full_stack, mask, copy=False)
+        elif pixels is not None:
+            full_stack = CompactMaskedArray(full_stack, CompactMask(
+                pixels, len(bands), band_bits, bands_axis
+            ))
         if raster_info:
             return full_stack, raster_infos
         else:
@@ -378,6 +534,7 @@ class SceneCollection(Collection):
                resampler="near",
                processing_level=None,
                raster_info=False,
+               compact_mask=False,
                ):
         """
         Load bands from all scenes, combining them into a single 3D ndarray
@@ -425,14 +582,18 @@ class SceneCollection(Collection):
             values are ``toa`` (top of atmosphere) and ``surface``. For products that
             support it, ``surface`` applies Descartes Labs' general surface reflectance
             algorithm to the output.
-
+        compact_mask : bool, default False
+            If True, and ``mask_nodata`` or ``mask_alpha`` is True, return a
+            `CompactMaskedArray` instead of a masked array, as with
+            `Scene.ndarray <descarteslabs.scenes.scene.Scene.ndarray>`.
 
         Returns
         -------
         arr : ndarray
             Returned array's shape will be ``(band, y, x)`` if ``bands_axis``
             is 0, and ``(y, x, band)`` if ``bands_axis`` is -1.
-            If ``mask_nodata`` or ``mask_alpha`` is True, arr will be a masked array.
+            If ``mask_nodata`` or ``mask_alpha`` is True, arr will be a masked array,
+            or a `CompactMaskedArray` if ``compact_mask`` is True.
         raster_info : dict
             If ``raster_info=True``, a raster information dict is also returned.
 
@@ -506,22 +667,31 @@ class SceneCollection(Collection):
                     arr = arr[:-1]
                     bands.pop(-1)
 
-            mask = np.zeros_like(arr, dtype=bool)
-
             if mask_nodata:
-                # collect all possible nodata values per band,
+                # all possible nodata values per band,
                 # in case different products have different nodata values for the same-named band
-                # QUESTION: is this overkill?
-                band_nodata_values = collections.defaultdict(set)
-                for scene in self:
-                    scene_bands = scene.properties["bands"]
-                    for bandname in bands:
-                        band_nodata_values[bandname].add(scene_bands[bandname].get('nodata'))
-
-                for i, bandname in enumerate(bands):
-                    for nodata in band_nodata_values[bandname]:
-                        if nodata is not None:
-                            mask[i] |= arr[i] == nodata
+                band_nodata_values = self._band_nodata_values(bands)
+                nodata_values = [band_nodata_values[bandname] for bandname in bands]
+
+            if compact_mask:
+                band_masks = {}
+                if mask_nodata:
+                    for i, values in enumerate(nodata_values):
+                        if any(value is not None for value in values):
+                            band_masks[i] = nodata_mask(arr[i:i + 1], [values])[0]
+
+                pixels = alpha == 0 if mask_alpha else np.zeros(arr.shape[1:], dtype=bool)
+                mask = CompactMask.from_band_masks(pixels, len(arr), band_masks, bands_axis)
+                arr = CompactMaskedArray(np.moveaxis(arr, 0, bands_axis), mask)
+                if raster_info:
+                    return arr, info
+                else:
+                    return arr
+
+            if mask_nodata:
+                mask = nodata_mask(arr, nodata_values)
+            else:
+                mask = np.zeros_like(arr, dtype=bool)
 
             if mask_alpha:
                 mask |= alpha == 0
@@ -535,6 +705,148 @@ class SceneCollection(Collection):
         else:
             return arr
 
+    def composite(self,
+                  bands,
+                  ctx,
+                  reducer="mean",
+                  mask_nodata=True,
+                  mask_alpha=True,
+                  bands_axis=0,
+                  resampler="near",
+                  processing_level=None,
+                  max_workers=None,
+                  median_samples=DEFAULT_MEDIAN_SAMPLES,
+                  ):
+        """
+        Load bands from all scenes and reduce them over time into a single 3D ndarray,
+        such as a mean or median composite.
+
+        Unlike reducing the result of `stack`, the whole stack is never held in memory:
+        each Scene is folded into running totals as soon as it's loaded, so memory use
+        is proportional to the size of one Scene (times ``max_workers``), not to the
+        number of Scenes. Scenes are folded in the order of the SceneCollection,
+        so the same Scenes always give the same result.
+
+        Parameters
+        ----------
+        bands : str or Sequence[str]
+            Band names to load. Can be a single string of band names
+            separated by spaces (``"red green blue"``),
+            or a sequence of band names (``["red", "green", "blue"]``).
+        ctx : `GeoContext`
+            A `GeoContext` to use when loading each Scene
+        reducer : str, default "mean"
+            How to combine the values of each pixel over all Scenes,
+            ignoring masked values. One of:
+
+            * ``"mean"``, ``"sum"``, ``"min"`` or ``"max"``
+            * ``"count"``: the number of unmasked values
+            * ``"median"``: an approximate median, from a random sample of
+              ``median_samples`` values of each pixel. It's exact where
+              a pixel has no more than ``median_samples`` unmasked values.
+        mask_nodata : bool, default True
+            Whether to ignore values in each band of each scene that equal
+            that band's ``nodata`` sentinel value.
+        mask_alpha : bool, default True
+            Whether to ignore pixels in all bands of each scene where
+            the alpha band is 0.
+        bands_axis : int, default 0
+            Axis along which bands should be located in the returned array.
+            If 0, the array will have shape ``(band, y, x)``,
+            if -1, it will have shape ``(y, x, band)``.
+        resampler : str, default "near"
+            Algorithm used to interpolate pixel values when scaling and transforming
+            each image to its new resolution or SRS. Possible values are
+            ``near`` (nearest-neighbor), ``bilinear``, ``cubic``, ``cubicsplice``,
+            ``lanczos``, ``average``, ``mode``, ``max``, ``min``, ``med``, ``q1``, ``q3``.
+        processing_level : str, optional
+            How the processing level of the underlying data should be adjusted. Possible
+            values are ``toa`` (top of atmosphere) and ``surface``. For products that
+            support it, ``surface`` applies Descartes Labs' general surface reflectance
+            algorithm to the output.
+        max_workers : int, default None
+            Maximum number of threads to use to load Scenes, which is also
+            the maximum number of loaded Scenes held in memory at once,
+            in addition to the running totals. If None, it defaults to 4.
+        median_samples : int, default 32
+            Number of values of each pixel to keep for the ``"median"`` reducer.
+            Memory use of the median is proportional to it.
+
+        Returns
+        -------
+        arr : ndarray
+            Returned array's shape will be ``(band, y, x)`` if ``bands_axis``
+            is 0, and ``(y, x, band)`` if ``bands_axis`` is -1.
+            Except for ``"count"``, it's a masked array, masked where no Scene
+            had an unmasked value. ``"mean"``, ``"sum"`` and ``"median"``
+            are floats; ``"min"`` and ``"max"`` have the dtype of the bands.
+
+        Example
+        -------
+        >>> import descarteslabs as dl
+        >>> aoi_geometry = {
+        ...    'type': 'Polygon',
+        ...    'coordinates': [[[-95, 42],[-93, 42],[-93, 40],[-95, 41],[-95, 42]]]}
+        >>> scenes, ctx = dl.scenes.search(aoi_geometry, products=["landsat:LC08:PRE:TOAR"],
+        ...     start_datetime="2015-01-01", end_datetime="2018-01-01")  # doctest: +SKIP
+        >>> median = scenes.composite("red green blue", ctx.assign(resolution=120),
+        ...     reducer="median")  # doctest: +SKIP
+        >>> median.shape  # doctest: +SKIP
+        (3, 1881, 1802)
+
+        Raises
+        ------
+        ValueError
+            If requested bands are unavailable, or band names are not given
+            or are invalid.
+            If ``reducer`` is unknown.
+            If not all required parameters are specified in the GeoContext.
+            If the SceneCollection is empty.
+        NotFoundError
+            If a Scene's ID cannot be found in the Descartes Labs catalog
+        BadRequestError
+            If the Descartes Labs platform is given unrecognized parameters
+        """
+        if len(self) == 0:
+            raise ValueError("This SceneCollection is empty")
+
+        if not (-3 < bands_axis < 3):
+            raise ValueError("Invalid bands_axis; axis {} would not exist in a 3D array".format(bands_axis))
+
+        try:
+            reducer_class = REDUCERS[reducer]
+        except (KeyError, TypeError):
+            six.raise_from(ValueError("Unknown reducer {!r}; must be one of {}".format(
+                reducer, ", ".join(sorted(REDUCERS))
+            )), None)
+        accumulator = reducer_class(median_samples) if reducer == "median" else reducer_class()
+
+        bands = Scene._bands_to_list(bands)
+        # Pre-check that all bands and alpha are available in all Scenes, and all have the same dtypes
+        self._common_data_type(bands + ["alpha"] if mask_alpha and "alpha" not in bands else bands)
+
+        def load(scene):
+            return scene.ndarray(
+                bands,
+                ctx,
+                mask_nodata=mask_nodata,
+                mask_alpha=mask_alpha,
+                resampler=resampler,
+                processing_level=processing_level,
+                raster_client=self._raster_client,
+            )
+
+        for arr in bounded_map(load, self, max_workers=max_workers):
+            if isinstance(arr, np.ma.MaskedArray):
+                accumulator.add(arr.data, np.ma.getmaskarray(arr))
+            else:
+                accumulator.add(arr, np.zeros(arr.shape, dtype=bool))
+
+        result = accumulator.result()
+        if bands_axis != 0:
+            result = np.moveaxis(result, 0, bands_axis)
+        return result
+
     def download(self,
                  bands,
                  ctx,
@@ -830,6 +1142,24 @@ class SceneCollection(Collection):
 
         return "\n".join(parts)
 
+    def _band_nodata_values(self, bands):
+        """
+        Mapping of each of ``bands`` to the set of its nodata values among all Scenes.
+
+        Scenes of the same product share their bands dict, so each is scanned once.
+        """
+        product_bands = {}
+        for scene in self:
+            scene_bands = scene.properties["bands"]
+            product_bands[id(scene_bands)] = scene_bands
+
+        return {
+            bandname: frozenset(
+                scene_bands[bandname].get('nodata') for scene_bands in six.itervalues(product_bands)
+            )
+            for bandname in bands
+        }
+
     def _common_data_type(self, bands):
         data_types = [scene._common_data_type_of_bands(bands) for scene in self]
         common_data_type = None
@@ -0,0 +1,129 @@
+import threading
+import time
+import unittest
+
+import mock
+import shapely.geometry
+
+from descarteslabs.common.dotdict import FrozenDotDict
+from descarteslabs.scenes import _bands, _search
+
+
+class TestProductBandsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = _bands.ProductBandsCache(ttl=600)
+        self.metadata_client = self.client("https://example.com/metadata", "user")
+
+    def client(self, url, client_id):
+        client = mock.Mock(base_url=url)
+        client.auth.client_id = client_id
+        client.get_bands_by_product.side_effect = lambda product: {product + ":red": {"name": "red"}}
+        return client
+
+    def test_get(self):
+        bands = self.cache.get(["a", "b"], self.metadata_client)
+        self.assertEqual(bands, {"a": {"a:red": {"name": "red"}}, "b": {"b:red": {"name": "red"}}})
+        self.assertIsInstance(bands["a"], FrozenDotDict)
+
+        bands = self.cache.get(["b", "c"], self.metadata_client)
+        self.assertEqual(sorted(bands), ["b", "c"])
+        self.assertEqual(
+            sorted(call[0][0] for call in self.metadata_client.get_bands_by_product.call_args_list),
+            ["a", "b", "c"],
+        )
+
+    def test_keyed_by_client(self):
+        self.cache.get(["a"], self.metadata_client)
+        other = self.client("https://example.com/metadata", "someone else")
+        self.cache.get(["a"], other)
+        other.get_bands_by_product.assert_called_once_with("a")
+
+    def test_concurrent_fetch(self):
+        barrier = threading.Event()
+        in_flight = []
+
+        def get_bands_by_product(product):
+            in_flight.append(product)
+            # only returns once every product has been requested
+            if len(in_flight) == 3:
+                barrier.set()
+            barrier.wait(5)
+            return {}
+
+        self.metadata_client.get_bands_by_product.side_effect = get_bands_by_product
+        self.cache.get(["a", "b", "c"], self.metadata_client)
+        self.assertTrue(barrier.is_set())
+
+    def test_ttl(self):
+        cache = _bands.ProductBandsCache(ttl=0.05)
+        cache.get(["a"], self.metadata_client)
+        time.sleep(0.1)
+        cache.get(["a"], self.metadata_client)
+        self.assertEqual(self.metadata_client.get_bands_by_product.call_count, 2)
+
+    def test_invalidate(self):
+        self.cache.get(["a", "b"], self.metadata_client)
+        self.cache.invalidate("a")
+        self.assertEqual(len(self.cache), 1)
+        self.cache.get(["a", "b"], self.metadata_client)
+        self.assertEqual(self.metadata_client.get_bands_by_product.call_count, 3)
+
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestSearchBands(unittest.TestCase):
+    aoi = shapely.geometry.box(0, 0, 1, 1)
+    geom = shapely.geometry.mapping(aoi)
+
+    def setUp(self):
+        self.metadata_client = mock.Mock(base_url="https://example.com/metadata")
+        self.metadata_client.auth.client_id = "user"
+        self.metadata_client.search.side_effect = lambda **kwargs: {
+            "features": iter([
+                {"id": "{}:{}".format(product, i), "geometry": self.geom, "properties": {
+                    "product": product, "crs": "EPSG:4326"
+                }}
+                for i, product in enumerate(["a", "b", "a", "c"])
+            ])
+        }
+        self.addCleanup(_bands.clear_bands_cache)
+
+    def test_unknown_products_fetched_concurrently(self):
+        barrier = threading.Event()
+        in_flight = []
+
+        def get_bands_by_product(product):
+            in_flight.append(product)
+            # only returns once every product has been requested
+            if len(in_flight) == 3:
+                barrier.set()
+            waited.append(barrier.wait(1))
+            return {product + ":red": {"name": "red", "resolution": 10}}
+
+        waited = []
+        self.metadata_client.get_bands_by_product.side_effect = get_bands_by_product
+        scenes, ctx = _search.search(self.aoi, metadata_client=self.metadata_client, raster_client=mock.Mock())
+
+        self.assertEqual(waited, [True] * 3)
+        self.assertEqual(sorted(in_flight), ["a", "b", "c"])
+        self.assertEqual([scene.properties.id for scene in scenes], ["a:0", "b:1", "a:2", "c:3"])
+        self.assertEqual(list(scenes[1].properties.bands), ["red"])
+        self.assertIs(scenes[0].properties.bands, scenes[2].properties.bands)
+        self.assertEqual(ctx.resolution, 10)
+
+    def test_products_beyond_window(self):
+        self.metadata_client.get_bands_by_product.side_effect = lambda product: {}
+        with mock.patch.object(_search, "BANDS_PREFETCH_WINDOW", 2):
+            scenes, ctx = _search.search(self.aoi, metadata_client=self.metadata_client, raster_client=mock.Mock())
+
+        self.assertEqual(len(scenes), 4)
+        self.assertEqual(
+            sorted(call[0][0] for call in self.metadata_client.get_bands_by_product.call_args_list),
+            ["a", "b", "c"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from descarteslabs.scenes._composite import REDUCERS, MedianReducer, bounded_map
+
+
+class TestReducers(unittest.TestCase):
+    def setUp(self):
+        random = np.random.RandomState(42)
+        self.stack = np.ma.MaskedArray(
+            random.randint(0, 100, (10, 2, 4, 5)).astype(np.uint16),
+            random.random_sample((10, 2, 4, 5)) < 0.3,
+        )
+        self.stack.mask[:, :, 0, 0] = True  # never valid
+
+    def reduce(self, reducer):
+        for arr in self.stack:
+            reducer.add(arr.data, arr.mask)
+        return reducer.result()
+
+    def test_reducers(self):
+        expected = {
+            "mean": self.stack.mean(axis=0),
+            "sum": self.stack.sum(axis=0),
+            "min": self.stack.min(axis=0),
+            "max": self.stack.max(axis=0),
+            "median": np.ma.median(self.stack, axis=0),
+        }
+        for name, reduction in expected.items():
+            result = self.reduce(REDUCERS[name]())
+            np.testing.assert_array_equal(result.mask, reduction.mask, err_msg=name)
+            np.testing.assert_allclose(result.compressed(), reduction.compressed(), err_msg=name)
+
+        self.assertEqual(self.reduce(REDUCERS["min"]()).dtype, np.uint16)
+        np.testing.assert_array_equal(self.reduce(REDUCERS["count"]()), self.stack.count(axis=0))
+
+    def test_approximate_median(self):
+        result = self.reduce(MedianReducer(samples=4))
+        np.testing.assert_array_equal(result.mask, self.stack.mask.all(axis=0))
+        # every sampled median is within the range of the pixel's values
+        self.assertTrue((result >= self.stack.min(axis=0)).all())
+        self.assertTrue((result <= self.stack.max(axis=0)).all())
+        # and the sample is reproducible
+        np.testing.assert_array_equal(self.reduce(MedianReducer(samples=4)), result)
+
+    def test_invalid_samples(self):
+        with self.assertRaises(ValueError):
+            MedianReducer(samples=0)
+
+
+class TestBoundedMap(unittest.TestCase):
+    def test_bounded(self):
+        lock = threading.Lock()
+        state = {"running": 0, "max": 0}
+
+        def func(i):
+            with lock:
+                state["running"] += 1
+                state["max"] = max(state["max"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return i * 2
+
+        results = bounded_map(func, range(20), max_workers=3)
+        self.assertEqual(list(results), [i * 2 for i in range(20)])
+        self.assertLessEqual(state["max"], 3)
+
+    def test_ordered(self):
+        delays = np.random.RandomState(0).random_sample(20) * 0.01
+
+        def func(i):
+            time.sleep(delays[i])
+            return i
+
+        self.assertEqual(list(bounded_map(func, range(20), max_workers=4)), list(range(20)))
+
+    def test_error(self):
+        def func(i):
+            if i == 3:
+                raise RuntimeError("nope")
+            return i
+
+        with self.assertRaises(RuntimeError):
+            list(bounded_map(func, range(10), max_workers=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,14 +22,20 @@ class TestFormat(unittest.TestCase):
             _download._format_from_path("foo")
 
 
-@mock.patch("descarteslabs.scenes._download.open", new_callable=mock.mock_open)
-@mock.patch("descarteslabs.scenes._download.os.makedirs")
-# wrap return value in lambda so individual tests can safely mutate it
-@mock.patch("descarteslabs.scenes._download.Raster.raster", side_effect=lambda *args, **kwargs: {
-    "files": {
-        "foo:bar_nir-yellow.tiff": b"i'm a geotiff!"
+def raster(*args, **kwargs):
+    "Stand-in for `Raster.raster`, which writes the file to `dest` as it's received"
+    dest = kwargs["dest"]
+    if hasattr(dest, "write"):
+        dest.write(b"i'm a geotiff!")
+    return {
+        "files": {
+            "foo:bar_nir-yellow.tiff": dest
+        }
     }
-})
+
+
+@mock.patch("descarteslabs.scenes._download.os.makedirs")
+@mock.patch("descarteslabs.scenes._download.Raster.raster", side_effect=raster)
 class TestDownload(unittest.TestCase):
     id = "foo:bar"
     bands = ["nir", "yellow"]
@@ -55,53 +61,65 @@ class TestDownload(unittest.TestCase):
             format=format,
         )
 
-    def test_format_from_ext(self, mock_raster, mock_makedirs, mock_open):
+    def test_format_from_ext(self, mock_raster, mock_makedirs):
         dest = "foo.jpg"
         self.download(dest)
         mock_raster.assert_called_once()
         called_format = mock_raster.call_args[1]["output_format"]
         self.assertEqual(called_format, "JPEG")
-        mock_open.assert_called_once_with(dest, "wb")
+        self.assertEqual(mock_raster.call_args[1]["dest"], dest)
 
-    def test_different_format_and_ext(self, mock_raster, mock_makedirs, mock_open):
+    def test_different_format_and_ext(self, mock_raster, mock_makedirs):
         dest = "foo.tif"
         self.download(dest, format="jpg")
         mock_raster.assert_called_once()
         called_format = mock_raster.call_args[1]["output_format"]
         self.assertEqual(called_format, "GTiff")
-        mock_open.assert_called_once_with(dest, "wb")
+        self.assertEqual(mock_raster.call_args[1]["dest"], dest)
 
-    def test_to_file(self, mock_raster, mock_makedirs, mock_open):
+    def test_to_file(self, mock_raster, mock_makedirs):
         file = six.BytesIO()
         result = self.download(file, format="jpg")
         self.assertIsNone(result)
         self.assertEqual(file.getvalue(), b"i'm a geotiff!")
-        mock_open.assert_not_called()
+        self.assertIs(mock_raster.call_args[1]["dest"].dest, file)
         mock_makedirs.assert_not_called()
         mock_raster.assert_called_once()
         called_format = mock_raster.call_args[1]["output_format"]
         self.assertEqual(called_format, "JPEG")
 
-    def test_to_file_invalid_format(self, mock_raster, mock_makedirs, mock_open):
+    def test_to_invalid_dest(self, mock_raster, mock_makedirs):
+        with self.assertRaises(TypeError):
+            self.download(42)
+        mock_raster.assert_not_called()
+
+    def test_to_file_write_error(self, mock_raster, mock_makedirs):
+        class ReadOnly(object):
+            def write(self, data):
+                raise IOError("not writable")
+
+        with self.assertRaisesRegexp(TypeError, "not writable"):
+            self.download(ReadOnly())
+
+    def test_to_file_invalid_format(self, mock_raster, mock_makedirs):
         file = six.BytesIO()
         with self.assertRaises(ValueError):
             self.download(file, format="foo")
 
-    def test_to_path(self, mock_raster, mock_makedirs, mock_open):
+    def test_to_path(self, mock_raster, mock_makedirs):
         path = "foo/bar.tif"
         result = self.download(path)
         self.assertEqual(result, path)
-        mock_open.assert_called_once_with(path, "wb")
-        mock_open().write.assert_called_once_with(b"i'm a geotiff!")
+        self.assertEqual(mock_raster.call_args[1]["dest"], path)
         mock_makedirs.assert_called_once_with("foo")
 
-    def test_to_existing_path(self, mock_raster, mock_makedirs, mock_open):
+    def test_to_existing_path(self, mock_raster, mock_makedirs):
         path = "../bar.tif"
         self.download(path)
-        mock_open.assert_called_once_with(path, "wb")
+        self.assertEqual(mock_raster.call_args[1]["dest"], path)
         mock_makedirs.assert_not_called()
 
-    def test_default_filename_single_scene(self, mock_raster, mock_makedirs, mock_open):
+    def test_default_filename_single_scene(self, mock_raster, mock_makedirs):
         result = self.download(None)
         self.assertEqual(result, "{id}-{bands}.tif".format(id=self.id, bands="-".join(self.bands)))
         result = self.download(None, format="jpg")
@@ -109,7 +127,7 @@ class TestDownload(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.download(None, format="baz")
 
-    def test_default_filename_mosaic(self, mock_raster, mock_makedirs, mock_open):
+    def test_default_filename_mosaic(self, mock_raster, mock_makedirs):
         result = self.download_mosaic(None)
         self.assertEqual(result, "mosaic-{bands}.tif".format(bands="-".join(self.bands)))
         result = self.download_mosaic(None, format="jpg")
@@ -118,15 +136,14 @@ class TestDownload(unittest.TestCase):
             self.download_mosaic(None, format="baz")
 
     @unittest.skipIf(sys.version_info[:2] < (3, 6), "PathLike ABC introduced in 3.6")
-    def test_to_pathlib(self, mock_raster, mock_makedirs, mock_open):
+    def test_to_pathlib(self, mock_raster, mock_makedirs):
         import pathlib
         path = pathlib.Path("foo/bar.tif")
         self.download(path)
-        mock_open.assert_called_once_with(path, "wb")
+        self.assertEqual(mock_raster.call_args[1]["dest"], path)
         mock_makedirs.assert_called_once_with("foo")
-        mock_open().write.assert_called_once_with(b"i'm a geotiff!")
 
-    def test_weird_response(self, mock_raster, mock_makedirs, mock_open):
+    def test_weird_response(self, mock_raster, mock_makedirs):
         mock_raster.side_effect = lambda *args, **kwargs: {
             "files": {
                 "file1": "",
@@ -142,12 +159,12 @@ class TestDownload(unittest.TestCase):
         with self.assertRaisesRegexp(RuntimeError, "missing results"):
             self.download("file.tif")
 
-    def test_raster_not_found(self, mock_raster, mock_makedirs, mock_open):
+    def test_raster_not_found(self, mock_raster, mock_makedirs):
         mock_raster.side_effect = NotFoundError("there is no foo")
         with self.assertRaisesRegexp(NotFoundError, "does not exist in the Descartes catalog"):
             self.download("file.tif")
 
-    def test_raster_bad_request(self, mock_raster, mock_makedirs, mock_open):
+    def test_raster_bad_request(self, mock_raster, mock_makedirs):
         mock_raster.side_effect = BadRequestError("what is a foo")
         with self.assertRaisesRegexp(BadRequestError, "Error with request"):
             self.download("file.tif")
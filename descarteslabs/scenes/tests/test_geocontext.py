@@ -319,6 +319,26 @@ class TestDLTIle(unittest.TestCase):
         self.assertEqual(tile.proj4, "+proj=utm +zone=15 +datum=WGS84 +units=m +no_defs ")
         self.assertEqual(tile.wkt, 'PROJCS["WGS 84 / UTM zone 15N",GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]],PROJECTION["Transverse_Mercator"],PARAMETER["latitude_of_origin",0],PARAMETER["central_meridian",-93],PARAMETER["scale_factor",0.9996],PARAMETER["false_easting",500000],PARAMETER["false_northing",0],UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","32615"]]') # noqa
 
+    def test_iter_from_shape(self):
+        shape = shapely.geometry.box(-93.8, 41.5, -93.6, 41.7)
+        tiles = list(geocontext.DLTile.iter_from_shape(shape, 960.0, 128, 16))
+        self.assertEqual([tile.key for tile in tiles], [self.key])
+        self.assertEqual(tiles[0].bounds, tuple(self.dltile_dict["properties"]["outputBounds"]))
+        self.assertEqual(tiles[0].wkt, self.dltile_dict["properties"]["wkt"])
+        local_tiles = geocontext.DLTile.from_shape(shape, 960.0, 128, 16, local=True)
+        self.assertEqual([tile.key for tile in local_tiles], [self.key])
+
+    def test_from_shape(self):
+        raster_client = mock.Mock()
+        raster_client.dltiles_from_shape.return_value = {"features": [self.dltile_dict]}
+        shape = shapely.geometry.box(-93.8, 41.5, -93.6, 41.7)
+
+        tiles = geocontext.DLTile.from_shape(shape, 960.0, 128, 16, raster_client=raster_client)
+        raster_client.dltiles_from_shape.assert_called_once_with(
+            resolution=960.0, tilesize=128, pad=16, shape=shape.__geo_interface__
+        )
+        self.assertEqual([tile.key for tile in tiles], [self.key])
+
 
 # can't use the word `test` in the function name otherwise nose tries to run it...
 def run_threadsafe_experiment(geoctx_factory, property, n=80000):
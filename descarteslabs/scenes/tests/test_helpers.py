@@ -243,3 +243,29 @@ class TestGeometryLikeToShapely(unittest.TestCase):
         as_shapely = _helpers.geometry_like_to_shapely(fc)
         self.assertIsInstance(as_shapely, shapely.geometry.GeometryCollection)
         self.assertEqual(as_shapely, shapely.geometry.GeometryCollection(shapes))
+
+
+class TestCoverage(unittest.TestCase):
+    def test_coverage(self):
+        aoi = shapely.geometry.box(0, 0, 2, 2)
+        geometries = [
+            shapely.geometry.box(-1, -1, 3, 3),  # contains the AOI
+            shapely.geometry.box(1, 0, 3, 2),  # covers half
+            shapely.geometry.box(5, 5, 6, 6),  # bounding boxes don't overlap
+            shapely.geometry.Polygon([(2.5, -1), (3, -1), (-1, 3), (-1, 2.5)]).difference(aoi),  # only touches
+            shapely.geometry.Polygon(),
+        ]
+        coverage = _helpers.coverage(aoi, geometries)
+        self.assertEqual(coverage.tolist(), [1.0, 0.5, 0.0, 0.0, 0.0])
+
+    def test_matches_intersection(self):
+        aoi = shapely.geometry.Point(0, 0).buffer(1)
+        geometries = [shapely.geometry.Point(x / 4.0, 0).buffer(1) for x in range(-10, 11)]
+        coverage = _helpers.coverage(aoi, geometries)
+        for geometry, covered in zip(geometries, coverage):
+            self.assertAlmostEqual(covered, aoi.intersection(geometry).area / aoi.area)
+
+    def test_empty(self):
+        aoi = shapely.geometry.box(0, 0, 1, 1)
+        self.assertEqual(_helpers.coverage(aoi, []).shape, (0,))
+        self.assertEqual(_helpers.coverage(shapely.geometry.Polygon(), [aoi]).tolist(), [0.0])
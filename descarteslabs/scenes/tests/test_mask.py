@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+
+from descarteslabs.scenes import CompactMask, CompactMaskedArray
+from descarteslabs.scenes._mask import nodata_mask
+
+
+class TestNodataMask(unittest.TestCase):
+    def test_nodata_mask(self):
+        arr = np.arange(5 * 2 * 3, dtype=np.uint16).reshape(5, 2, 3) % 7
+        nodata_values = [[0], [None], [1, 3], [2, None], [70000]]
+        expected = np.zeros(arr.shape, dtype=bool)
+        for i, values in enumerate(nodata_values):
+            for value in values:
+                if value is not None:
+                    expected[i] |= arr[i] == value
+
+        np.testing.assert_array_equal(nodata_mask(arr, nodata_values), expected)
+
+        out = np.ones(arr.shape, dtype=bool)
+        self.assertIs(nodata_mask(arr, nodata_values, out=out), out)
+        np.testing.assert_array_equal(out, expected)
+
+    def test_no_nodata(self):
+        arr = np.zeros((2, 3, 3))
+        self.assertFalse(nodata_mask(arr, [[], [None]]).any())
+
+    def test_wrong_number_of_bands(self):
+        with self.assertRaises(ValueError):
+            nodata_mask(np.zeros((2, 3, 3)), [[0]])
+
+
+class TestCompactMask(unittest.TestCase):
+    def setUp(self):
+        self.pixels = np.zeros((2, 3, 5), dtype=bool)
+        self.pixels[:, -1, -1] = True
+        self.nodata = np.zeros((2, 3, 5), dtype=bool)
+        self.nodata[1, 0, :3] = True
+        self.nodata[:, -1, -1] = True
+
+    def full_mask(self, bands_axis):
+        mask = np.stack([self.pixels, self.pixels | self.nodata, self.pixels], axis=1)
+        return np.moveaxis(mask, 1, bands_axis)
+
+    def test_materialize(self):
+        for bands_axis in [1, -1]:
+            mask = CompactMask.from_band_masks(self.pixels, 3, {1: self.nodata}, bands_axis)
+            full = self.full_mask(bands_axis)
+            self.assertEqual(mask.shape, full.shape)
+            np.testing.assert_array_equal(mask.materialize(), full)
+            np.testing.assert_array_equal(np.asarray(mask), full)
+            np.testing.assert_array_equal(mask.band(1), self.pixels | self.nodata)
+            np.testing.assert_array_equal(mask.band(-1), self.pixels)
+
+        with self.assertRaises(IndexError):
+            mask.band(3)
+
+    def test_redundant_band_masks(self):
+        mask = CompactMask.from_band_masks(self.pixels, 3, {0: self.pixels.copy(), 1: self.nodata})
+        self.assertEqual(list(mask.band_bits), [1])
+        self.assertEqual(mask.nbytes, self.pixels.nbytes + 2 * 2)
+
+    def test_invalid_bands_axis(self):
+        with self.assertRaises(ValueError):
+            CompactMask(self.pixels, 3, bands_axis=4)
+
+
+class TestCompactMaskedArray(unittest.TestCase):
+    def setUp(self):
+        self.data = np.arange(2 * 4 * 3, dtype=np.uint16).reshape(2, 4, 3)
+        pixels = np.zeros((4, 3), dtype=bool)
+        pixels[0, 0] = True
+        nodata = self.data[1] == 20
+        self.arr = CompactMaskedArray(self.data, CompactMask.from_band_masks(pixels, 2, {1: nodata}))
+
+    def test_masked(self):
+        masked = self.arr.masked()
+        self.assertIsInstance(masked, np.ma.MaskedArray)
+        self.assertTrue(np.may_share_memory(masked.data, self.data))
+        self.assertEqual(masked.mask.sum(), 3)
+        self.assertTrue(masked.mask[1, 2, 2])
+
+    def test_filled(self):
+        filled = self.arr.filled(0)
+        np.testing.assert_array_equal(filled, self.arr.masked().filled(0))
+        self.assertEqual(self.data[0, 0, 0], 0)
+        self.assertEqual(self.data[1, 2, 2], 20)
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            CompactMaskedArray(self.data[:1], self.arr.mask)
+
+
+if __name__ == "__main__":
+    unittest.main()
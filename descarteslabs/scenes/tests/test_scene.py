@@ -7,7 +7,7 @@ import warnings
 import shapely.geometry
 import numpy as np
 
-from descarteslabs.common.dotdict import DotDict
+from descarteslabs.common.dotdict import DotDict, FrozenDotDict, freeze
 from descarteslabs.scenes import Scene, geocontext
 from descarteslabs.scenes.scene import _strptime_helper
 
@@ -221,6 +221,100 @@ class TestScene(unittest.TestCase):
         self.assertEqual(scenes_bands.ndvi, meta_bands["someproduct:ndvi"])
         self.assertEqual(scenes_bands["derived:ndvi"], meta_bands["derived:ndvi"])
 
+    def test_lazy_init(self):
+        feature = {
+            "type": "Feature",
+            "id": "someproduct:scene",
+            "geometry": {"type": "Point", "coordinates": [1.0, 2.0]},
+            "properties": {"product": "someproduct", "cs_code": "EPSG:4326", "acquired": "2017-08-31T00:00:00Z"},
+        }
+        bands = Scene._scenes_bands_dict(freeze({"someproduct:red": {"name": "red", "id": "someproduct:red"}}))
+        scene = Scene(feature, bands)
+        self.assertFalse(hasattr(scene, "__dict__"))
+        self.assertIsNone(scene._geometry)
+        self.assertIsNone(scene._properties)
+
+        self.assertEqual(scene.properties.id, "someproduct:scene")
+        self.assertEqual(scene.properties.crs, "EPSG:4326")
+        self.assertEqual(scene.properties.date, datetime.datetime(2017, 8, 31))
+        self.assertIs(scene.properties.bands, bands)
+        self.assertIsNotNone(scene._feature)
+
+        self.assertEqual(scene.geometry, shapely.geometry.Point(1.0, 2.0))
+        self.assertIsNone(scene._feature)
+        # the feature's own properties are left as they were
+        self.assertEqual(feature["properties"]["cs_code"], "EPSG:4326")
+
+    def test_lazy_init_threads(self):
+        import threading
+
+        features = [{
+            "id": "someproduct:scene{}".format(i),
+            "geometry": {"type": "Point", "coordinates": [1.0, 2.0]},
+            "properties": {"cs_code": "EPSG:4326", "proj4": "+proj=longlat"},
+        } for i in range(200)]
+        scenes = [Scene(feature, {}) for feature in features]
+        n_threads = 8
+        start = threading.Event()
+        results = [[] for _ in range(n_threads)]
+
+        def first_access(i):
+            start.wait()
+            for scene in scenes:
+                results[i].append((scene.properties, scene.geometry))
+
+        threads = [threading.Thread(target=first_access, args=(i,)) for i in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        for properties, geometry in results[0]:
+            self.assertEqual(properties.crs, "EPSG:4326")
+            self.assertEqual(geometry, shapely.geometry.Point(1.0, 2.0))
+        # every thread got the same objects for each Scene
+        for thread_results in results[1:]:
+            for (properties, geometry), (first_properties, first_geometry) in zip(thread_results, results[0]):
+                self.assertIs(properties, first_properties)
+                self.assertIs(geometry, first_geometry)
+
+    def test_shared_bands(self):
+        meta_bands = {"someproduct:red": {"name": "red", "id": "someproduct:red"}}
+        bands = Scene._scenes_bands_dict(freeze(meta_bands))
+        self.assertIsInstance(bands, FrozenDotDict)
+        self.assertIs(Scene._scenes_bands_dict(bands), bands)
+        self.assertEqual(list(bands.keys()), ["red"])
+
+        scenes = [
+            Scene({"id": str(i), "geometry": None, "properties": {}}, bands)
+            for i in range(2)
+        ]
+        self.assertIs(scenes[0].properties.bands, scenes[1].properties.bands)
+        with self.assertRaises(TypeError):
+            scenes[0].properties.bands.red.name = "blue"
+        self.assertEqual(scenes[1].properties.bands.red.name, "red")
+
+    def test_unshared_bands(self):
+        meta_bands = {"someproduct:red": {"name": "red", "id": "someproduct:red"}}
+        bands = Scene._scenes_bands_dict(DotDict(meta_bands))
+        self.assertIsNot(Scene._scenes_bands_dict(bands), bands)
+        self.assertNotIsInstance(Scene._scenes_bands_dict(meta_bands), FrozenDotDict)
+
+    def test_pickle(self):
+        import pickle
+
+        feature = {
+            "id": "someproduct:scene",
+            "geometry": {"type": "Point", "coordinates": [1.0, 2.0]},
+            "properties": {"product": "someproduct"},
+        }
+        scene = Scene(feature, {})
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            unpickled = pickle.loads(pickle.dumps(scene, protocol))
+            self.assertEqual(unpickled.properties.id, "someproduct:scene")
+            self.assertEqual(unpickled.geometry, scene.geometry)
+
     def test_common_data_type_of_bands(self):
         mock_properties = {
             "product": "mock_product",
@@ -1,10 +1,18 @@
+import json
 import unittest
 import mock
 import os.path
+import responses
+import shutil
+import tempfile
 import shapely.geometry
+import numpy as np
 
 from descarteslabs.client.addons import ThirdParty
-from descarteslabs.scenes import Scene, SceneCollection, geocontext
+from descarteslabs.client.auth import Auth
+from descarteslabs.client.services.raster import Raster
+from descarteslabs.client.services.raster.tests.test_blosc import blosc_response
+from descarteslabs.scenes import Scene, SceneCollection, CompactMaskedArray, geocontext
 
 from .test_scene import MockScene
 
@@ -148,6 +156,35 @@ class TestSceneCollection(unittest.TestCase):
         ])
 
         self.assertEqual(len(scenes.filter_coverage(ctx)), 1)
+        self.assertEqual(len(scenes.filter_coverage(ctx, 0.5)), 2)
+        self.assertIsInstance(scenes.filter_coverage(ctx, 2), SceneCollection)
+        self.assertEqual(len(scenes.filter_coverage(ctx, 2)), 0)
+
+    def test_band_nodata_values(self):
+        landsat_bands = {"red": {"nodata": 0}, "alpha": {}}
+        sentinel_bands = {"red": {"nodata": 1}, "alpha": {}}
+        scenes = SceneCollection([
+            MockScene({}, {"id": str(i), "bands": landsat_bands if i % 2 else sentinel_bands})
+            for i in range(4)
+        ])
+
+        self.assertEqual(scenes._band_nodata_values(["red", "alpha"]), {"red": {0, 1}, "alpha": {None}})
+        self.assertEqual(scenes[::2]._band_nodata_values(["red"]), {"red": {1}})
+
+        for scene in scenes[1::2]:
+            scene.properties.bands.red.nodata = 2
+        self.assertEqual(scenes._band_nodata_values(["red"]), {"red": {1, 2}})
+
+    def test_coverage(self):
+        aoi = shapely.geometry.box(0, 0, 2, 2)
+        scenes = SceneCollection([
+            Scene(dict(id='foo', geometry=shapely.geometry.box(1, 0, 3, 2), properties={}), {}),
+            Scene(dict(id='bar', geometry=shapely.geometry.box(5, 5, 6, 6), properties={}), {}),
+            Scene(dict(id='baz', geometry=shapely.geometry.box(-1, -1, 3, 3), properties={}), {}),
+        ])
+        coverage = scenes.coverage(aoi)
+        self.assertEqual(coverage.tolist(), [0.5, 0.0, 1.0])
+        self.assertEqual(coverage.tolist(), [scene.coverage(aoi) for scene in scenes])
 
 
 @mock.patch.object(MockScene, "download")
@@ -229,3 +266,186 @@ class TestSceneCollectionDownload(unittest.TestCase):
         mock_base_download.assert_called_once()
         called_ids = mock_base_download.call_args[1]["inputs"]
         self.assertEqual(called_ids, self.scenes.each.properties["id"].combine())
+
+
+@mock.patch.object(Auth, "token", "token")
+class TestSceneCollectionStackInto(unittest.TestCase):
+    url = "https://example.com/raster/v1"
+
+    def setUp(self):
+        properties = [{
+            "id": "foo:bar" + str(i),
+            "product": "foo",
+            "bands": {
+                "nir": {"dtype": "UInt16", "nodata": 1},
+                "red": {"dtype": "UInt16"},
+                "alpha": {"dtype": "UInt16"},
+            }
+        } for i in range(3)]
+
+        self.scenes = SceneCollection([MockScene({}, p) for p in properties], raster_client=Raster(url=self.url))
+        self.ctx = geocontext.AOI(bounds=[30, 40, 50, 60], resolution=2, crs="EPSG:4326")
+
+        # the (band, y, x) arrays sent by the raster service, where the last band is alpha
+        self.arrays = {}
+        for i, scene_id in enumerate(self.scenes.each.properties["id"]):
+            arr = np.full((3, 10, 10), i + 2, dtype=np.uint16)
+            arr[0, 0, 0] = 1  # nodata
+            arr[-1] = 1
+            arr[-1, -1, -1] = 0  # masked by alpha
+            self.arrays[scene_id] = arr
+
+    def add_npz_callback(self, rsps):
+        def callback(request):
+            params = json.loads(request.body.decode("utf-8"))
+            arr = self.arrays[params["ids"]][:len(params["bands"])]
+            return 200, {}, blosc_response(arr)
+
+        rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+
+    def test_stack_masked(self):
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            stack = self.scenes.stack("nir red", self.ctx)
+
+        self.assertEqual(stack.shape, (3, 2, 10, 10))
+        for i in range(3):
+            self.assertTrue((stack.data[i, :, 1:, :-1] == i + 2).all())
+        self.assertTrue(stack.mask[:, 0, 0, 0].all())
+        self.assertFalse(stack.mask[:, 1, 0, 0].any())
+        self.assertTrue(stack.mask[:, :, -1, -1].all())
+
+    def test_stack_compact_mask(self):
+        for bands_axis in [1, -1]:
+            with responses.RequestsMock() as rsps:
+                self.add_npz_callback(rsps)
+                stack = self.scenes.stack("nir red", self.ctx, bands_axis=bands_axis)
+            with responses.RequestsMock() as rsps:
+                self.add_npz_callback(rsps)
+                compact = self.scenes.stack("nir red", self.ctx, bands_axis=bands_axis, compact_mask=True)
+
+            self.assertIsInstance(compact, CompactMaskedArray)
+            self.assertEqual(compact.shape, stack.shape)
+            np.testing.assert_array_equal(compact.data, stack.data)
+            np.testing.assert_array_equal(compact.mask.materialize(), stack.mask)
+            np.testing.assert_array_equal(compact.masked().mask, stack.mask)
+            # only nir has its own mask, for its nodata value
+            self.assertEqual(list(compact.mask.band_bits), [0])
+            self.assertLess(compact.mask.nbytes, stack.mask.nbytes)
+
+    def test_composite(self):
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            stack = self.scenes.stack("nir red", self.ctx)
+
+        for reducer in ["mean", "min", "max", "median"]:
+            with responses.RequestsMock() as rsps:
+                self.add_npz_callback(rsps)
+                composite = self.scenes.composite("nir red", self.ctx, reducer=reducer, bands_axis=-1)
+
+            expected = np.moveaxis(getattr(np.ma, reducer)(stack, axis=0), 0, -1)
+            self.assertEqual(composite.shape, (10, 10, 2))
+            np.testing.assert_array_equal(composite.mask, expected.mask)
+            np.testing.assert_array_equal(composite, expected)
+
+        with self.assertRaises(ValueError):
+            self.scenes.composite("nir red", self.ctx, reducer="mode")
+
+    def add_tiled_npz_callback(self, rsps):
+        # responds with the window of each scene's array covered by the requested bounds
+        def callback(request):
+            params = json.loads(request.body.decode("utf-8"))
+            minx, miny, maxx, maxy = params["outputBounds"]
+            width, height = params["outsize"]
+            row, col = int(round((60 - maxy) / 2)), int(round((minx - 30) / 2))
+            arr = self.arrays[params["ids"]][:len(params["bands"]), row:row + height, col:col + width]
+            return 200, {}, blosc_response(np.ascontiguousarray(arr))
+
+        rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+
+    def test_stack_tiled(self):
+        for arr in self.arrays.values():
+            arr[:-1] += np.arange(100, dtype=np.uint16).reshape(10, 10)
+            arr[-1, 3:5, 6] = 0
+
+        for bands_axis in [1, -1]:
+            with responses.RequestsMock() as rsps:
+                self.add_npz_callback(rsps)
+                stack = self.scenes.stack("nir red", self.ctx, bands_axis=bands_axis)
+
+            with responses.RequestsMock() as rsps:
+                self.add_tiled_npz_callback(rsps)
+                tiled = self.scenes.stack("nir red", self.ctx, bands_axis=bands_axis, tile_size=4)
+                # 3 scenes in 3x3 windows
+                self.assertEqual(len(rsps.calls), 27)
+
+            np.testing.assert_array_equal(tiled.data, stack.data)
+            np.testing.assert_array_equal(tiled.mask, stack.mask)
+
+            with responses.RequestsMock() as rsps:
+                self.add_tiled_npz_callback(rsps)
+                compact = self.scenes.stack("nir red", self.ctx, bands_axis=bands_axis, tile_size=4, compact_mask=True)
+
+            np.testing.assert_array_equal(compact.data, stack.data)
+            np.testing.assert_array_equal(compact.mask.materialize(), stack.mask)
+
+    def test_stack_tiled_raster_info(self):
+        # a triangle in the bottom-right of the bounds: the top-left window is outside it
+        triangle = shapely.geometry.Polygon([(42, 40), (50, 40), (50, 60)])
+        ctx = self.ctx.assign(geometry=triangle)
+
+        def callback(request):
+            params = json.loads(request.body.decode("utf-8"))
+            width, height = params["outsize"]
+            arr = self.arrays[params["ids"]][:len(params["bands"]), :height, :width]
+            meta = {"id": params["ids"], "outputBounds": params["outputBounds"]}
+            return 200, {}, blosc_response(np.ascontiguousarray(arr), meta)
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.POST, self.url + "/npz", callback=callback)
+            stack, raster_infos = self.scenes.stack("nir red", ctx, tile_size=4, raster_info=True)
+
+        self.assertEqual(stack.shape, (3, 2, 10, 10))
+        self.assertTrue(stack.mask[:, :, :4, :4].all())
+        # the first window, in row-major order, that intersects the triangle
+        self.assertEqual(
+            raster_infos,
+            [{"id": scene_id, "outputBounds": [46, 52, 50, 60]} for scene_id in self.scenes.each.properties["id"]]
+        )
+
+    def test_stack_tiled_wrong_ctx(self):
+        with self.assertRaises(ValueError):
+            self.scenes.stack("nir red", self.ctx.assign(crs="EPSG:3857"), tile_size=4)
+
+    def test_stack_unmasked(self):
+        for bands_axis, scene_bands_axis, shape in [(1, 0, (3, 3, 10, 10)), (-1, -1, (3, 10, 10, 3))]:
+            with responses.RequestsMock() as rsps:
+                self.add_npz_callback(rsps)
+                stack = self.scenes.stack(
+                    "nir red alpha", self.ctx, bands_axis=bands_axis, mask_alpha=False, mask_nodata=False
+                )
+
+            self.assertNotIsInstance(stack, np.ma.MaskedArray)
+            self.assertEqual(stack.shape, shape)
+            for i, scene_id in enumerate(self.scenes.each.properties["id"]):
+                np.testing.assert_array_equal(np.moveaxis(stack[i], scene_bands_axis, 0), self.arrays[scene_id])
+
+    def test_stack_out_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        out_file = os.path.join(tmpdir, "stack.npy")
+
+        with responses.RequestsMock() as rsps:
+            self.add_npz_callback(rsps)
+            stack = self.scenes.stack("nir red", self.ctx, bands_axis=-1, out_file=out_file)
+
+        self.assertIsInstance(stack.data, np.memmap)
+
+        data = np.load(out_file, mmap_mode="r")
+        mask = np.load(os.path.join(tmpdir, "stack_mask.npy"), mmap_mode="r")
+        self.assertEqual(data.shape, (3, 10, 10, 2))
+        np.testing.assert_array_equal(data, stack.data)
+        np.testing.assert_array_equal(mask, stack.mask)
+        self.assertTrue(mask[:, 0, 0, 0].all())
+        self.assertTrue(mask[:, -1, -1, :].all())
+        del data, mask
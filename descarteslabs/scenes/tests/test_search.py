@@ -1,7 +1,11 @@
 import unittest
 import datetime
 
-from descarteslabs.scenes import geocontext, search
+import mock
+import shapely.geometry
+
+from descarteslabs.client.services.metadata import Metadata
+from descarteslabs.scenes import _bands, geocontext, search
 
 
 class TestScenesSearch(unittest.TestCase):
@@ -79,3 +83,30 @@ class TestScenesSearch(unittest.TestCase):
         for scene in sc:
             self.assertGreaterEqual(scene.properties['date'], start_datetime)
             self.assertLessEqual(scene.properties['date'], end_datetime)
+
+
+class TestSearchMetadataClient(unittest.TestCase):
+    aoi = shapely.geometry.box(0, 0, 1, 1)
+    geom = shapely.geometry.mapping(aoi)
+
+    def setUp(self):
+        self.addCleanup(_bands.clear_bands_cache)
+
+    def search(self, metadata_client):
+        "Search with `metadata_client`, returning the keyword arguments its ``search`` was called with"
+        metadata_client.base_url = "https://example.com/metadata"
+        metadata_client.auth = mock.Mock(client_id="user")
+        metadata_client.search.return_value = {"features": [
+            {"id": "a:0", "geometry": self.geom, "properties": {"product": "a", "crs": "EPSG:4326"}}
+        ]}
+        metadata_client.get_bands_by_product.return_value = {}
+        scenes, ctx = search(self.aoi, products="a", metadata_client=metadata_client, raster_client=mock.Mock())
+        self.assertEqual([scene.properties.id for scene in scenes], ["a:0"])
+        return metadata_client.search.call_args[1]
+
+    def test_metadata_streamed(self):
+        self.assertIs(self.search(mock.create_autospec(Metadata, instance=True))["stream"], True)
+
+    def test_other_client_not_streamed(self):
+        # e.g. a client whose search doesn't take `stream`
+        self.assertNotIn("stream", self.search(mock.Mock()))
@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+import shapely.geometry
+
+from descarteslabs.scenes import AOI, DLTile
+from descarteslabs.scenes._tiling import output_grid, windows
+
+
+class TestTiling(unittest.TestCase):
+    def test_output_grid(self):
+        ctx = AOI(bounds=(1, 1, 9, 7), bounds_crs="EPSG:32615", crs="EPSG:32615", resolution=2)
+        self.assertEqual(output_grid(ctx), (0, 8, 2, 2, 4, 5))
+
+        unaligned = ctx.assign(align_pixels=False)
+        self.assertEqual(output_grid(unaligned), (1, 7, 2, 2, 3, 4))
+
+        shaped = ctx.assign(resolution=None, shape=(3, 4))
+        self.assertEqual(output_grid(shaped), (1, 7, 2, 2, 3, 4))
+
+    def test_windows(self):
+        ctx = AOI(bounds=(0, 0, 10, 6), bounds_crs="EPSG:32615", crs="EPSG:32615", resolution=1)
+        shape, tiles = windows(ctx, 4)
+        self.assertEqual(shape, (6, 10))
+        self.assertEqual([tile.shape for tile in tiles], [(4, 4), (4, 4), (4, 2), (2, 4), (2, 4), (2, 2)])
+
+        covered = np.zeros(shape, dtype=int)
+        for tile in tiles:
+            tile.view(covered)[...] += 1
+            self.assertEqual(tile.ctx.shape, tile.shape)
+            self.assertFalse(tile.ctx.align_pixels)
+        self.assertTrue((covered == 1).all())
+
+        last = tiles[-1].ctx
+        self.assertEqual(last.bounds, (8, 0, 10, 2))
+        self.assertEqual(last.bounds_crs, "EPSG:32615")
+
+    def test_windows_outside_geometry(self):
+        geometry = shapely.geometry.box(0, 0, 1, 1)
+        ctx = AOI(geometry=geometry, crs="EPSG:4326", bounds=(0, 0, 4, 4), resolution=1)
+        shape, tiles = windows(ctx, 2)
+        self.assertEqual(shape, (4, 4))
+        self.assertEqual([tile.ctx is not None for tile in tiles], [False, False, True, False])
+        self.assertEqual(tiles[2].ctx.geometry, geometry)
+
+    def test_invalid(self):
+        ctx = AOI(bounds=(0, 0, 10, 6), bounds_crs="EPSG:32615", crs="EPSG:32615", resolution=1)
+        with self.assertRaises(ValueError):
+            windows(ctx, 0)
+        with self.assertRaises(ValueError):
+            windows(ctx.assign(crs="EPSG:4326"), 4)
+        with self.assertRaises(ValueError):
+            windows(AOI(bounds=(0, 0, 10, 6), bounds_crs="EPSG:32615", crs="EPSG:32615"), 4)
+        with self.assertRaises(ValueError):
+            windows(DLTile.__new__(DLTile), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -111,7 +111,8 @@ def do_setup():
     kwargs['extras_require'] = {
         "complete": [
             'blosc;platform_system!="Windows"',
-            "numpy>=1.10.0",
+            # np.isin and np.isnat, used by metadata.FeatureTable, need numpy 1.13
+            "numpy>=1.13.0",
             "matplotlib>=2.1.0",
         ],
     }